@@ -0,0 +1,265 @@
+# aggregates.py
+
+import sys
+import uuid
+from sqlalchemy import Column, Integer, Float, String, Index, event, inspect, select, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import engine, session, Base, Match, Game, GamePlayer
+
+# ----------------------- Aggregate Tables -----------------------
+
+# Every stat column of GamePlayer that is summed into the aggregate tables
+STAT_COLUMNS = [
+    'ct_kills', 'ct_assists', 'ct_deaths', 'ct_acs', 'ct_kast', 'ct_adr', 'ct_hs', 'ct_first_kills', 'ct_first_deaths',
+    't_kills', 't_assists', 't_deaths', 't_acs', 't_kast', 't_adr', 't_hs', 't_first_kills', 't_first_deaths',
+    'both_kills', 'both_assists', 'both_deaths', 'both_acs', 'both_kast', 'both_adr', 'both_hs',
+    'both_first_kills', 'both_first_deaths',
+]
+
+# Team aggregates only keep the stats that make sense summed across five players
+TEAM_STAT_COLUMNS = [
+    'ct_kills', 'ct_deaths', 't_kills', 't_deaths',
+    'both_kills', 'both_assists', 'both_deaths', 'both_acs', 'both_adr',
+    'both_first_kills', 'both_first_deaths',
+]
+
+# Rows whose match has no tour split are stored under split 0
+NO_SPLIT = 0
+
+# Side columns are only filled for games that reported side data, so they average over side_games
+SIDE_PREFIXES = ('ct_', 't_')
+
+
+class PlayerSplitStats(Base):
+    __tablename__ = 'player_split_stats'
+    player_id = Column(Integer, primary_key=True)
+    tour_split_id = Column(Integer, primary_key=True)
+    map_id = Column(Integer, primary_key=True)
+    agent_id = Column(Integer, primary_key=True)
+    games = Column(Integer, default=0)
+    side_games = Column(Integer, default=0)
+
+    # Sums of the matching GamePlayer columns
+    ct_kills = Column(Integer, default=0)
+    ct_assists = Column(Integer, default=0)
+    ct_deaths = Column(Integer, default=0)
+    ct_acs = Column(Float, default=0)
+    ct_kast = Column(Float, default=0)
+    ct_adr = Column(Float, default=0)
+    ct_hs = Column(Float, default=0)
+    ct_first_kills = Column(Integer, default=0)
+    ct_first_deaths = Column(Integer, default=0)
+
+    t_kills = Column(Integer, default=0)
+    t_assists = Column(Integer, default=0)
+    t_deaths = Column(Integer, default=0)
+    t_acs = Column(Float, default=0)
+    t_kast = Column(Float, default=0)
+    t_adr = Column(Float, default=0)
+    t_hs = Column(Float, default=0)
+    t_first_kills = Column(Integer, default=0)
+    t_first_deaths = Column(Integer, default=0)
+
+    both_kills = Column(Integer, default=0)
+    both_assists = Column(Integer, default=0)
+    both_deaths = Column(Integer, default=0)
+    both_acs = Column(Float, default=0)
+    both_kast = Column(Float, default=0)
+    both_adr = Column(Float, default=0)
+    both_hs = Column(Float, default=0)
+    both_first_kills = Column(Integer, default=0)
+    both_first_deaths = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('ix_player_split_stats_split', 'tour_split_id'),
+    )
+
+class TeamSplitStats(Base):
+    __tablename__ = 'team_split_stats'
+    team_id = Column(Integer, primary_key=True)
+    tour_split_id = Column(Integer, primary_key=True)
+    player_games = Column(Integer, default=0)
+    side_games = Column(Integer, default=0)
+
+    ct_kills = Column(Integer, default=0)
+    ct_deaths = Column(Integer, default=0)
+    t_kills = Column(Integer, default=0)
+    t_deaths = Column(Integer, default=0)
+    both_kills = Column(Integer, default=0)
+    both_assists = Column(Integer, default=0)
+    both_deaths = Column(Integer, default=0)
+    both_acs = Column(Float, default=0)
+    both_adr = Column(Float, default=0)
+    both_first_kills = Column(Integer, default=0)
+    both_first_deaths = Column(Integer, default=0)
+
+class DataVersion(Base):
+    # A token replaced by every commit that changes matches, games, game players or these aggregates, so a process
+    # caching query results (read_api.py) can tell when its results went stale
+    __tablename__ = 'data_versions'
+    name = Column(String(20), primary_key=True)
+    token = Column(String(32))
+
+DATA_VERSION = 'ingest'
+
+# ----------------------- Incremental Maintenance -----------------------
+
+def upsert_add(connection, table, keys, values):
+    # INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(table).values(**keys, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={col: table.c[col] + stmt.excluded[col] for col in values}
+    )
+    connection.execute(stmt)
+
+def bump_data_version(connection):
+    # In the caller's transaction, so the new token is only visible once its writes are
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    token = uuid.uuid4().hex
+    stmt = dialect.insert(DataVersion.__table__).values(name=DATA_VERSION, token=token)
+    connection.execute(stmt.on_conflict_do_update(index_elements=['name'], set_={'token': token}))
+
+def lookup_game(connection, game_id):
+    # (tour_split_id, map_id) of the match a game belongs to, or None
+    return connection.execute(
+        select(Match.tour_split_id, Game.map_id)
+        .join(Match, Match.match_id == Game.match_id)
+        .where(Game.game_id == game_id)
+    ).first()
+
+def apply_stats(connection, game_row, player_id, team_id, agent_id, side_data, stats, sign=1):
+    # Add (sign=1) or remove (sign=-1) one game_players row's contribution
+    tour_split_id = game_row.tour_split_id if game_row.tour_split_id is not None else NO_SPLIT
+    stats = {col: sign * (stats[col] or 0) for col in STAT_COLUMNS}
+
+    upsert_add(
+        connection,
+        PlayerSplitStats.__table__,
+        {"player_id": player_id, "tour_split_id": tour_split_id,
+         "map_id": game_row.map_id, "agent_id": agent_id},
+        {"games": sign, "side_games": sign if side_data else 0, **stats}
+    )
+    upsert_add(
+        connection,
+        TeamSplitStats.__table__,
+        {"team_id": team_id, "tour_split_id": tour_split_id},
+        {"player_games": sign, "side_games": sign if side_data else 0, **{col: stats[col] for col in TEAM_STAT_COLUMNS}}
+    )
+
+@event.listens_for(GamePlayer, 'after_insert')
+def apply_game_player(mapper, connection, target):
+    # Runs inside the flush that inserts the GamePlayer, so the aggregates
+    # commit (or roll back) together with the row itself
+    row = lookup_game(connection, target.game_id)
+    if row is None:
+        print(f"Skipping aggregates for game {target.game_id}: game or match not found.")
+        return
+
+    apply_stats(connection, row, target.player_id, target.team_id, target.agent, target.ct_and_t_data,
+                {col: getattr(target, col) for col in STAT_COLUMNS})
+
+@event.listens_for(GamePlayer, 'after_update')
+def update_game_player(mapper, connection, target):
+    # Re-scraped rows: take the old values out and put the new ones in, in the same flush
+    row = lookup_game(connection, target.game_id)
+    if row is None:
+        return
+    state = inspect(target)
+
+    def before(col):
+        history = state.attrs[col].history
+        return history.deleted[0] if history.deleted else getattr(target, col)
+
+    columns = STAT_COLUMNS + ['team_id', 'agent', 'ct_and_t_data']
+    if not any(state.attrs[col].history.has_changes() for col in columns):
+        return
+    apply_stats(connection, row, target.player_id, before('team_id'), before('agent'), before('ct_and_t_data'),
+                {col: before(col) for col in STAT_COLUMNS}, sign=-1)
+    apply_stats(connection, row, target.player_id, target.team_id, target.agent, target.ct_and_t_data,
+                {col: getattr(target, col) for col in STAT_COLUMNS})
+
+def rebuild_aggregates():
+    # Full recompute from game_players, for repairs after manual edits or schema changes
+    Base.metadata.create_all(engine)
+    split_id = func.coalesce(Match.tour_split_id, literal(NO_SPLIT))
+    joined = GamePlayer.__table__.join(Game, Game.game_id == GamePlayer.game_id).join(Match, Match.match_id == Game.match_id)
+
+    player_cols = ['player_id', 'tour_split_id', 'map_id', 'agent_id', 'games', 'side_games'] + STAT_COLUMNS
+    player_select = select(
+        GamePlayer.player_id, split_id, Game.map_id, GamePlayer.agent,
+        func.count(), func.sum(func.coalesce(GamePlayer.ct_and_t_data, False).cast(Integer)),
+        *[func.coalesce(func.sum(GamePlayer.__table__.c[col]), 0) for col in STAT_COLUMNS]
+    ).select_from(joined).group_by(GamePlayer.player_id, split_id, Game.map_id, GamePlayer.agent)
+
+    team_cols = ['team_id', 'tour_split_id', 'player_games', 'side_games'] + TEAM_STAT_COLUMNS
+    team_select = select(
+        GamePlayer.team_id, split_id, func.count(), func.sum(func.coalesce(GamePlayer.ct_and_t_data, False).cast(Integer)),
+        *[func.coalesce(func.sum(GamePlayer.__table__.c[col]), 0) for col in TEAM_STAT_COLUMNS]
+    ).select_from(joined).group_by(GamePlayer.team_id, split_id)
+
+    with engine.begin() as conn:
+        # Recreated rather than emptied, so tables from before a schema change (team side_games) pick up new columns
+        for model in (PlayerSplitStats, TeamSplitStats):
+            model.__table__.drop(conn, checkfirst=True)
+            model.__table__.create(conn)
+        conn.execute(PlayerSplitStats.__table__.insert().from_select(player_cols, player_select))
+        conn.execute(TeamSplitStats.__table__.insert().from_select(team_cols, team_select))
+        bump_data_version(conn)
+    print("Rebuilt player_split_stats and team_split_stats from game_players.")
+
+# ----------------------- Read Helpers -----------------------
+
+def _averages(totals, count_col, columns):
+    # Per-game averages; ct_/t_ columns over the games with side data only
+    count = totals[count_col] or 0
+    side_count = totals['side_games'] or 0
+    result = {count_col: count, 'side_games': side_count}
+    for col in columns:
+        games = side_count if col.startswith(SIDE_PREFIXES) else count
+        result[col] = (totals[col] or 0) / games if games else 0
+    return result
+
+def get_player_stats(player_id, tour_split_id=None, map_id=None, agent_id=None):
+    # Per-game averages for a player, optionally narrowed by split, map and agent
+    table = PlayerSplitStats.__table__
+    query = select(
+        func.sum(table.c.games).label('games'),
+        func.sum(table.c.side_games).label('side_games'),
+        *[func.sum(table.c[col]).label(col) for col in STAT_COLUMNS]
+    ).where(table.c.player_id == player_id)
+    if tour_split_id is not None:
+        query = query.where(table.c.tour_split_id == tour_split_id)
+    if map_id is not None:
+        query = query.where(table.c.map_id == map_id)
+    if agent_id is not None:
+        query = query.where(table.c.agent_id == agent_id)
+
+    totals = session.execute(query).mappings().first()
+    return _averages(totals, 'games', STAT_COLUMNS)
+
+def get_team_stats(team_id, tour_split_id=None):
+    table = TeamSplitStats.__table__
+    query = select(
+        func.sum(table.c.player_games).label('player_games'),
+        func.sum(table.c.side_games).label('side_games'),
+        *[func.sum(table.c[col]).label(col) for col in TEAM_STAT_COLUMNS]
+    ).where(table.c.team_id == team_id)
+    if tour_split_id is not None:
+        query = query.where(table.c.tour_split_id == tour_split_id)
+
+    totals = session.execute(query).mappings().first()
+    stats = _averages(totals, 'player_games', TEAM_STAT_COLUMNS)
+    deaths = totals['both_deaths'] or 0
+    stats['kd'] = (totals['both_kills'] or 0) / deaths if deaths else 0
+    return stats
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        rebuild_aggregates()
+    else:
+        print("Usage: python aggregates.py rebuild")
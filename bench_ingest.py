@@ -0,0 +1,178 @@
+# bench_ingest.py
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import tempfile
+import time
+
+import requests
+
+# ----------------------- Configuration -----------------------
+
+# tours x splits per tour x matches per split
+SCALES = {
+    'split': (1, 1, 50),
+    'tour': (1, 4, 50),
+    '10k': (2, 5, 1000),
+}
+
+# ----------------------- Page Source -----------------------
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _serve(port, site_kwargs, latency_ms):
+    # Runs in a child process so page rendering does not share the crawler's GIL or RSS
+    from http.server import ThreadingHTTPServer
+    from replay_server import SyntheticSite, ReplayConfig, ReplayStats, make_handler
+    config = ReplayConfig(site=SyntheticSite(**site_kwargs), latency_ms=latency_ms)
+    ThreadingHTTPServer(('127.0.0.1', port), make_handler(config, ReplayStats())).serve_forever()
+
+def start_page_source(site_kwargs, latency_ms=0.0):
+    port = _free_port()
+    process = multiprocessing.Process(target=_serve, args=(port, site_kwargs, latency_ms), daemon=True)
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/__stats', timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Replay server did not start.")
+
+# ----------------------- Counters -----------------------
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def attach_counters(engine):
+    from sqlalchemy import event
+    counts = {"round_trips": 0, "commits": 0}
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counts["round_trips"] += 1
+
+    @event.listens_for(engine, 'commit')
+    def count_commit(conn):
+        counts["commits"] += 1
+
+    return counts
+
+# ----------------------- Benchmark -----------------------
+
+def run_benchmark(tours, splits, matches, database_url=None, latency_ms=0.0, verbose=False, reset=True,
+                  destructive=False):
+    # Runs on a fresh SQLite file unless given a database, which is then reset and filled with synthetic matches
+    if database_url is not None and not destructive:
+        raise ValueError(f"Benchmarking on {database_url} empties it and ingests synthetic matches; "
+                         f"pass destructive=True (--destructive) if it is a scratch database.")
+    site_kwargs = {"tours": tours, "splits_per_tour": splits, "matches_per_split": matches}
+    process, base_url = start_page_source(site_kwargs, latency_ms)
+
+    scratch = None
+    if database_url is None:
+        scratch = tempfile.mkdtemp(prefix='bench_ingest_')
+        database_url = f"sqlite:///{scratch}/bench.db"
+
+    # tour_split_scrape and models read these at import time
+    os.environ['VLR_BASE_URL'] = base_url
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['MONGODB_URI'] = ''
+    os.environ['STAT_STORE_DIR'] = ''
+
+    try:
+        import tour_split_scrape
+        from sqlalchemy import func, select
+        from models import engine, session, Match, Game, GamePlayer
+
+        if reset and scratch is None:
+            # After the scraper import, so every table it registers (page_fingerprints included) is emptied;
+            # a leftover fingerprint would make the crawl skip everything it already saw
+            from cleanDB import reset_postgres
+            reset_postgres(engine)
+
+        counts = attach_counters(engine)
+        rss_before = peak_rss_mb()
+        tour_urls = [f"{base_url}/synthetic-tour-{tour}" for tour in range(tours)]
+
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                # The scraper prints several lines per row; the terminal would dominate the timing
+                stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+            for tour_url in tour_urls:
+                tour_split_scrape.scrape_tour_data(tour_url)
+        elapsed = time.perf_counter() - start
+
+        counters = dict(counts)
+        ingested = {model.__tablename__: session.execute(select(func.count()).select_from(model)).scalar()
+                    for model in (Match, Game, GamePlayer)}
+        http = requests.get(base_url + '/__stats').json()
+    finally:
+        process.terminate()
+        process.join()
+
+    matches_done = ingested['matches'] or 1
+    return {
+        "database": database_url.split(':', 1)[0],
+        "tours": tours, "splits_per_tour": splits, "matches_per_split": matches,
+        "seconds": round(elapsed, 3),
+        "matches": ingested['matches'], "games": ingested['games'], "game_players": ingested['game_players'],
+        "matches_per_sec": round(ingested['matches'] / elapsed, 2) if elapsed else None,
+        "round_trips_per_match": round(counters["round_trips"] / matches_done, 1),
+        "commits_per_match": round(counters["commits"] / matches_done, 1),
+        "http_requests_per_match": round(http["requests"] / matches_done, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_before_crawl_mb": round(rss_before, 1),
+    }
+
+def print_report(result):
+    print(f"Ingested {result['matches']} matches, {result['games']} games, {result['game_players']} game players "
+          f"into {result['database']} in {result['seconds']:.1f}s.")
+    print(f"  matches/sec:          {result['matches_per_sec']}")
+    print(f"  DB round trips/match: {result['round_trips_per_match']}")
+    print(f"  commits/match:        {result['commits_per_match']}")
+    print(f"  HTTP requests/match:  {result['http_requests_per_match']}")
+    print(f"  peak RSS:             {result['peak_rss_mb']} MB ({result['rss_before_crawl_mb']} MB before the crawl)")
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the tour -> split -> match -> game_players ingestion flow.")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='split')
+    parser.add_argument('--tours', type=int, default=None)
+    parser.add_argument('--splits', type=int, default=None, help="Splits per tour")
+    parser.add_argument('--matches', type=int, default=None, help="Matches per split")
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'),
+                        help="Scratch database to ingest into instead of a fresh SQLite file; needs --destructive, "
+                             "as it is reset first")
+    parser.add_argument('--destructive', action='store_true',
+                        help="Allow --database-url to point at a database whose rows may be deleted")
+    parser.add_argument('--no-reset', action='store_true', help="Do not truncate the benchmark database first")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated page latency")
+    parser.add_argument('--json', default=None, help="Also write the result to this file for run-to-run comparison")
+    parser.add_argument('--verbose', action='store_true', help="Keep the scraper's own output")
+    args = parser.parse_args()
+
+    if args.database_url and not args.destructive:
+        parser.error(f"--database-url empties the database and fills it with synthetic matches; "
+                     f"add --destructive if {args.database_url} is a scratch database")
+    tours, splits, matches = SCALES[args.scale]
+    result = run_benchmark(args.tours or tours, args.splits or splits, args.matches or matches,
+                           database_url=args.database_url, latency_ms=args.latency_ms,
+                           verbose=args.verbose, reset=not args.no_reset, destructive=args.destructive)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,219 @@
+# bench_writes.py
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+# ----------------------- Configuration -----------------------
+
+TEAMS = 64
+MAPS = 10
+AGENTS = 25
+
+# ----------------------- Data Generation -----------------------
+
+def generate_rows(matches, seed=0):
+    # The same Match/Game/GamePlayer rows are loaded by every strategy
+    from models import GamePlayer
+    rng = random.Random(seed)
+    stat_columns = [column.name for column in GamePlayer.__table__.columns
+                    if column.name.startswith(('ct_', 't_', 'both_')) and column.name != 'ct_and_t_data']
+
+    match_rows, game_rows, player_rows = [], [], []
+    for m in range(matches):
+        match_id = 100000 + m
+        team_ids = rng.sample(range(1, TEAMS + 1), 2)
+        match_rows.append({"match_id": match_id, "tour_split_id": 1 + m % 4, "team1_id": team_ids[0],
+                           "team2_id": team_ids[1], "date_played": date(2024, 1, 1) + timedelta(days=m % 300)})
+        for g in range(rng.randint(2, 3)):
+            game_id = match_id * 10 + g
+            game_rows.append({"game_id": game_id, "match_id": match_id, "map_id": rng.randint(1, MAPS)})
+            for team_id in team_ids:
+                for agent_id, i in zip(rng.sample(range(1, AGENTS + 1), 5), range(1, 6)):
+                    row = {"game_id": game_id, "player_id": team_id * 10 + i, "team_id": team_id,
+                           "agent": agent_id, "player_role": None, "ct_and_t_data": True}
+                    for column in stat_columns:
+                        row[column] = rng.randint(0, 300)
+                    player_rows.append(row)
+    return [("matches", match_rows), ("games", game_rows), ("game_players", player_rows)]
+
+# Emptied before the run: the reference tables are replaced by generated rows, the rest by every strategy in turn
+CLEARED_TABLES = ['players', 'teams', 'tour_splits', 'tours', 'maps', 'agents', 'matches', 'games', 'game_players',
+                  'player_split_stats', 'team_split_stats']
+# Cleared between strategies; the aggregates are rebuilt or maintained by each strategy like real ingestion
+WRITTEN_TABLES = ['game_players', 'games', 'matches', 'player_split_stats', 'team_split_stats']
+
+def seed_references(engine):
+    # Rows the foreign keys point at; loaded once and never timed
+    from models import Team, Player, Map, Agent, Tour, Tour_Split
+    with engine.begin() as conn:
+        for model in (Player, Team, Tour_Split, Tour, Map, Agent):
+            conn.execute(model.__table__.delete())
+        conn.execute(Map.__table__.insert(), [{"map_id": i, "map_name": f"Map {i}"} for i in range(1, MAPS + 1)])
+        conn.execute(Agent.__table__.insert(), [{"agent_id": i, "agent_name": f"Agent {i}"} for i in range(1, AGENTS + 1)])
+        conn.execute(Tour.__table__.insert(), [{"tour_id": 1, "name": "Benchmark Tour"}])
+        conn.execute(Tour_Split.__table__.insert(), [{"external_split_id": i, "tour_id": 1} for i in range(1, 5)])
+        conn.execute(Team.__table__.insert(), [{"team_id": i, "team_name": f"Team {i}"} for i in range(1, TEAMS + 1)])
+        conn.execute(Player.__table__.insert(), [{"player_id": t * 10 + i, "name": f"player{t * 10 + i}"}
+                                                 for t in range(1, TEAMS + 1) for i in range(1, 6)])
+
+def clear_rows(engine):
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.exec_driver_sql(f"TRUNCATE TABLE {', '.join(WRITTEN_TABLES)}")
+        else:
+            for table in WRITTEN_TABLES:
+                conn.exec_driver_sql(f"DELETE FROM {table}")
+
+# ----------------------- Write Strategies -----------------------
+
+def write_orm_per_row(engine, data):
+    # What insert_or_get_game / insert_or_get_game_player do today: look up, add, commit per object
+    from sqlalchemy.orm import sessionmaker
+    from models import Match, Game, GamePlayer
+    models = {"matches": Match, "games": Game, "game_players": GamePlayer}
+    session = sessionmaker(bind=engine)()
+    for table, rows in data:
+        model = models[table]
+        key_columns = [column.name for column in model.__table__.primary_key.columns]
+        for row in rows:
+            if session.query(model).filter_by(**{key: row[key] for key in key_columns}).first() is None:
+                session.add(model(**row))
+                session.commit()
+    session.close()
+
+def write_orm_batch(engine, data):
+    # Same ORM objects, flushed together by the unit of work in one transaction
+    from sqlalchemy.orm import sessionmaker
+    from models import Match, Game, GamePlayer
+    models = {"matches": Match, "games": Game, "game_players": GamePlayer}
+    session = sessionmaker(bind=engine)()
+    for table, rows in data:
+        session.add_all(models[table](**row) for row in rows)
+        session.flush()
+    session.commit()
+    session.close()
+
+def write_core_bulk(engine, data):
+    # executemany / multi-row VALUES through Core, one transaction
+    from models import Base
+    with engine.begin() as conn:
+        for table, rows in data:
+            conn.execute(Base.metadata.tables[table].insert(), rows)
+
+def write_copy(engine, data):
+    # COPY ... FROM STDIN with CSV buffers, one transaction (PostgreSQL only)
+    with engine.begin() as conn:
+        cursor = conn.connection.cursor()
+        for table, rows in data:
+            columns = list(rows[0])
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(['' if row[column] is None else row[column] for column in columns])
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+    # COPY goes through the DBAPI cursor directly, so the engine's statement counter never sees it
+    return len(data)
+
+STRATEGIES = {
+    'orm_per_row': write_orm_per_row,
+    'orm_batch': write_orm_batch,
+    'core_bulk': write_core_bulk,
+    'copy': write_copy,
+}
+
+# The ORM strategies pay for aggregates.py's after_insert upserts per row, as ingestion does. Core and COPY
+# bypass those listeners, so their time includes the rebuild_aggregates() that brings the aggregates up to date.
+REBUILDS_AGGREGATES = {'core_bulk', 'copy'}
+
+def available_strategies(engine):
+    return [name for name in STRATEGIES if name != 'copy' or engine.dialect.name == 'postgresql']
+
+# ----------------------- Benchmark -----------------------
+
+def run_benchmark(matches, strategies=None, database_url=None, seed=0, destructive=False):
+    # Runs on a fresh SQLite file unless given a database, whose CLEARED_TABLES are then lost
+    if database_url is not None and not destructive:
+        raise ValueError(f"Benchmarking on {database_url} deletes its {', '.join(CLEARED_TABLES)}; "
+                         f"pass destructive=True (--destructive) if it is a scratch database.")
+    if database_url is None:
+        database_url = f"sqlite:///{tempfile.mkdtemp(prefix='bench_writes_')}/bench.db"
+    os.environ['DATABASE_URL'] = database_url
+
+    from sqlalchemy import func, select, text
+    from models import engine, Base
+    from bench_ingest import attach_counters
+    # Registers the GamePlayer listeners that keep player_split_stats and team_split_stats current
+    import aggregates
+
+    Base.metadata.create_all(engine)
+    clear_rows(engine)
+    seed_references(engine)
+    data = generate_rows(matches, seed)
+    total_rows = sum(len(rows) for _, rows in data)
+    counts = attach_counters(engine)
+
+    results = []
+    for name in strategies or available_strategies(engine):
+        clear_rows(engine)
+        counts.update(round_trips=0, commits=0)
+        start = time.perf_counter()
+        uncounted = STRATEGIES[name](engine, data) or 0
+        if name in REBUILDS_AGGREGATES:
+            with contextlib.redirect_stdout(io.StringIO()):
+                aggregates.rebuild_aggregates()
+        elapsed = time.perf_counter() - start
+        transactions, round_trips = counts["commits"], counts["round_trips"] + uncounted
+
+        # Every strategy must leave exactly the same rows behind, aggregates included
+        with engine.connect() as conn:
+            written = sum(conn.execute(select(func.count()).select_from(text(table))).scalar() for table, _ in data)
+            aggregated = conn.execute(select(func.sum(aggregates.PlayerSplitStats.games))).scalar() or 0
+        if written != total_rows:
+            raise RuntimeError(f"{name} wrote {written} rows, expected {total_rows}.")
+        if aggregated != len(data[-1][1]):
+            raise RuntimeError(f"{name} aggregated {aggregated} game players, expected {len(data[-1][1])}.")
+        results.append({"strategy": name, "rows": total_rows, "seconds": round(elapsed, 3),
+                        "rows_per_sec": round(total_rows / elapsed), "transactions": transactions,
+                        "round_trips": round_trips,
+                        "aggregates": 'rebuild' if name in REBUILDS_AGGREGATES else 'per row'})
+    clear_rows(engine)
+    return engine.dialect.name, results
+
+def print_report(dialect, results):
+    print(f"Write strategies on {dialect}, {results[0]['rows']} rows each:")
+    print(f"  {'strategy':<12} {'rows/s':>10} {'seconds':>9} {'transactions':>13} {'round trips':>12} {'aggregates':>11}")
+    for result in results:
+        print(f"  {result['strategy']:<12} {result['rows_per_sec']:>10} {result['seconds']:>9.2f} "
+              f"{result['transactions']:>13} {result['round_trips']:>12} {result['aggregates']:>11}")
+    print("  Every time includes aggregate maintenance: per-row upserts for the ORM, a full rebuild for the rest "
+          "(which grows with the whole table, not just the new rows).")
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare write strategies for Match/Game/GamePlayer rows.")
+    parser.add_argument('--matches', type=int, default=500, help="Generated matches (about 25 game players each)")
+    parser.add_argument('--strategy', action='append', choices=sorted(STRATEGIES),
+                        help="Strategy to run; repeat for several (default: all available)")
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'),
+                        help=f"Scratch database to benchmark on instead of a fresh SQLite file; needs --destructive, "
+                             f"as its {', '.join(CLEARED_TABLES)} are deleted")
+    parser.add_argument('--destructive', action='store_true',
+                        help="Allow --database-url to point at a database whose rows may be deleted")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database_url and not args.destructive:
+        parser.error(f"--database-url deletes every row of {', '.join(CLEARED_TABLES)}; "
+                     f"add --destructive if {args.database_url} is a scratch database")
+    dialect, results = run_benchmark(args.matches, args.strategy, args.database_url, args.seed, args.destructive)
+    print_report(dialect, results)
@@ -1,25 +1,120 @@
 import os
-from sqlalchemy import create_engine
+import shutil
+import argparse
+import time
+from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.engine import make_url
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# PostgreSQL cleanup
-DATABASE_URL = os.getenv('DATABASE_URL')
-engine = create_engine(DATABASE_URL)
-with engine.connect() as conn:
-    conn.execute("TRUNCATE TABLE players, teams RESTART IDENTITY CASCADE;")
-    print("PostgreSQL tables truncated.")
+from models import Base
+# Imported for their tables, so Base.metadata covers everything ingestion writes, including the crawl state
+import aggregates
+import team_comps
+import fingerprints
+import live_matches
+from mongo_sink import MONGODB_DB, COLLECTION_INDEXES, ensure_indexes
+# The distributed crawl queue has its own metadata, and may have its own database
+from work_queue import QueueBase, QUEUE_DATABASE_URL
 
-# MongoDB cleanup
+DATABASE_URL = os.getenv('DATABASE_URL')
 MONGODB_URI = os.getenv('MONGODB_URI')
-mongo_client = MongoClient(MONGODB_URI)
-mongo_db = mongo_client['valorantdb']
-mongo_db.matches.delete_many({})
-mongo_db.maps.delete_many({})
-print("MongoDB collections cleared.")
-
-# Close connections
-mongo_client.close()
-engine.dispose()
+
+# Seeded by tour_split_scrape.py; kept unless --all is given
+REFERENCE_TABLES = {'maps', 'agents', 'parent_regions', 'player_roles'}
+
+# ----------------------- PostgreSQL -----------------------
+
+def reset_postgres(engine, include_reference=False, metadatas=(Base.metadata, QueueBase.metadata)):
+    existing = set(inspect(engine).get_table_names())
+    tables = [table.name for metadata in metadatas for table in metadata.sorted_tables
+              if table.name in existing and (include_reference or table.name not in REFERENCE_TABLES)]
+    if not tables:
+        print("No PostgreSQL tables to truncate.")
+        return
+
+    # One statement, one transaction: either every table is emptied or none is
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text(f"TRUNCATE TABLE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+        else:
+            for table in reversed(tables):
+                conn.execute(text(f"DELETE FROM {table}"))
+        # A running read_api.py drops the results it cached from the old rows
+        if aggregates.DataVersion.__tablename__ in tables:
+            aggregates.bump_data_version(conn)
+    print(f"PostgreSQL tables truncated: {', '.join(tables)}.")
+
+def _maintenance_engine(url):
+    return create_engine(url.set(database='postgres'), isolation_level='AUTOCOMMIT')
+
+def _clone_database(url, source, target):
+    # CREATE DATABASE ... TEMPLATE copies files directly, which is far faster than a dump/restore
+    admin = _maintenance_engine(url)
+    with admin.connect() as conn:
+        for database in (source, target):
+            conn.execute(text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                              "WHERE datname = :name AND pid <> pg_backend_pid()"), {"name": database})
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{target}"'))
+        conn.execute(text(f'CREATE DATABASE "{target}" TEMPLATE "{source}"'))
+    admin.dispose()
+
+def snapshot_name(url, name):
+    return f"{url.database}_snap_{name}"
+
+def snapshot_postgres(name):
+    url = make_url(DATABASE_URL)
+    start = time.perf_counter()
+    if url.get_backend_name() == 'sqlite':
+        shutil.copyfile(url.database, f"{url.database}.{name}.snap")
+    else:
+        _clone_database(url, url.database, snapshot_name(url, name))
+    print(f"Snapshot '{name}' taken in {time.perf_counter() - start:.2f}s.")
+
+def restore_postgres(name):
+    url = make_url(DATABASE_URL)
+    start = time.perf_counter()
+    if url.get_backend_name() == 'sqlite':
+        shutil.copyfile(f"{url.database}.{name}.snap", url.database)
+    else:
+        _clone_database(url, snapshot_name(url, name), url.database)
+    print(f"Snapshot '{name}' restored in {time.perf_counter() - start:.2f}s.")
+
+# ----------------------- MongoDB -----------------------
+
+def reset_mongo():
+    # Dropping a collection is a single metadata operation, unlike delete_many over every document
+    mongo_client = MongoClient(MONGODB_URI)
+    mongo_db = mongo_client[MONGODB_DB]
+    for collection_name in set(mongo_db.list_collection_names()) | set(COLLECTION_INDEXES):
+        mongo_db.drop_collection(collection_name)
+    ensure_indexes(mongo_db)
+    print("MongoDB collections dropped and indexes recreated.")
+    mongo_client.close()
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reset, snapshot or restore the scraper databases.")
+    parser.add_argument('command', nargs='?', default='reset', choices=['reset', 'snapshot', 'restore'])
+    parser.add_argument('name', nargs='?', default='seeded', help="Snapshot name")
+    parser.add_argument('--all', action='store_true', help="Also truncate the seeded reference tables")
+    parser.add_argument('--skip-mongo', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'reset':
+        engine = create_engine(DATABASE_URL)
+        reset_postgres(engine, include_reference=args.all)
+        engine.dispose()
+        if QUEUE_DATABASE_URL and QUEUE_DATABASE_URL != DATABASE_URL:
+            queue_engine = create_engine(QUEUE_DATABASE_URL)
+            reset_postgres(queue_engine, metadatas=(QueueBase.metadata,))
+            queue_engine.dispose()
+        if MONGODB_URI and not args.skip_mongo:
+            reset_mongo()
+    elif args.command == 'snapshot':
+        snapshot_postgres(args.name)
+    else:
+        restore_postgres(args.name)
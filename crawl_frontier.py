@@ -0,0 +1,186 @@
+# crawl_frontier.py
+
+import hashlib
+import heapq
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ----------------------- Priorities -----------------------
+
+# Lower is fetched sooner; equal priorities keep the order URLs were discovered in
+PRIORITY_LIVE = 0
+PRIORITY_DISCOVERY = 10
+PRIORITY_RECENT = 20
+PRIORITY_BACKFILL = 100
+
+# ----------------------- Seen URLs -----------------------
+
+class SeenSet:
+    # Exact de-duplication; one Python string per URL
+
+    def __init__(self):
+        self.urls = set()
+
+    def add(self, url):
+        # True when the URL had not been seen yet
+        if url in self.urls:
+            return False
+        self.urls.add(url)
+        return True
+
+    def __len__(self):
+        return len(self.urls)
+
+class BloomFilter:
+    # Fixed-size de-duplication for very large runs. A false positive skips a URL that was never fetched,
+    # so keep error_rate small; a million URLs at 1e-6 take about 3.4 MB.
+
+    def __init__(self, capacity, error_rate=1e-6):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, url):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, url):
+        positions = self._positions(url)
+        if all(self.array[p >> 3] & (1 << (p & 7)) for p in positions):
+            return False
+        for p in positions:
+            self.array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+        return True
+
+    def __len__(self):
+        return self.count
+
+# ----------------------- Frontier -----------------------
+
+class CrawlItem:
+    def __init__(self, url, kind, priority, args, parent):
+        self.url = url
+        self.kind = kind
+        self.priority = priority
+        self.args = args
+        self.parent = parent
+
+class Frontier:
+    # Priority queue of URLs still to fetch; every URL is admitted at most once per run
+
+    def __init__(self, seen=None):
+        self.seen = seen if seen is not None else SeenSet()
+        self.lock = threading.Lock()
+        self.heap = []
+        self.sequence = 0
+        self.pushed = 0
+        self.duplicates = 0
+        self.max_size = 0
+
+    def push(self, url, kind, priority, *args, parent=None):
+        # False when the URL was already queued or fetched in this run
+        with self.lock:
+            if not self.seen.add(url):
+                self.duplicates += 1
+                return False
+            heapq.heappush(self.heap, (priority, self.sequence, CrawlItem(url, kind, priority, args, parent)))
+            self.sequence += 1
+            self.pushed += 1
+            self.max_size = max(self.max_size, len(self.heap))
+            if parent is not None:
+                parent.add()
+            return True
+
+    def pop(self):
+        with self.lock:
+            return heapq.heappop(self.heap)[2] if self.heap else None
+
+    def __len__(self):
+        with self.lock:
+            return len(self.heap)
+
+    def snapshot(self):
+        with self.lock:
+            return {"queued": len(self.heap), "pushed": self.pushed, "duplicates": self.duplicates,
+                    "max_queued": self.max_size, "seen": len(self.seen)}
+
+class Pending:
+    # Outstanding work queued from one page. The page's fingerprint is only saved (on_complete) once
+    # everything queued from it has been ingested, as the recursive crawl does, so a failure is retried next run.
+
+    def __init__(self, on_complete=None, parent=None, saves=None):
+        # The handler that creates it holds one count until it has queued its children
+        self.count = 1
+        self.failed = False
+        self.on_complete = on_complete
+        self.parent = parent
+        # What on_complete saves, as data, for queues that complete the page in another process (work_queue.py)
+        self.saves = saves
+
+    def add(self):
+        self.count += 1
+
+    def done(self, ok=True):
+        self.failed = self.failed or not ok
+        self.count -= 1
+        if self.count == 0:
+            if not self.failed and self.on_complete is not None:
+                self.on_complete()
+            if self.parent is not None:
+                self.parent.done(not self.failed)
+
+# ----------------------- Crawler -----------------------
+
+class Crawler:
+    # Workers only fetch; handlers run on the calling thread in priority order, since the ORM session is
+    # not thread-safe. handler(frontier, item, response) may push more URLs and may return the Pending
+    # it created for them.
+
+    def __init__(self, frontier, fetch, handlers, workers=4):
+        self.frontier = frontier
+        self.fetch = fetch
+        self.handlers = handlers
+        self.workers = workers
+        self.fetched = {}
+        self.failed = 0
+
+    def _finish(self, item, result, ok):
+        if isinstance(result, Pending):
+            result.done(ok)
+        elif item.parent is not None:
+            item.parent.done(ok)
+
+    def run(self):
+        start = time.perf_counter()
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(self.frontier) or in_flight:
+                # Keep every worker busy with the most urgent URLs
+                while len(in_flight) < self.workers:
+                    item = self.frontier.pop()
+                    if item is None:
+                        break
+                    in_flight[executor.submit(self.fetch, item.url)] = item
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: in_flight[f].priority):
+                    item = in_flight.pop(future)
+                    self.fetched[item.kind] = self.fetched.get(item.kind, 0) + 1
+                    result, ok = None, True
+                    try:
+                        result = self.handlers[item.kind](self.frontier, item, future.result())
+                    except Exception as e:
+                        ok = False
+                        self.failed += 1
+                        print(f"Error crawling {item.url}: {e}")
+                    self._finish(item, result, ok)
+        elapsed = time.perf_counter() - start
+        stats = self.frontier.snapshot()
+        print(f"Crawled {sum(self.fetched.values())} pages ({', '.join(f'{n} {kind}' for kind, n in self.fetched.items())}) "
+              f"in {elapsed:.1f}s with {self.workers} workers; {stats['duplicates']} duplicate URLs skipped, "
+              f"{self.failed} failed.")
+        return {"seconds": round(elapsed, 3), "fetched": dict(self.fetched), "failed": self.failed, **stats}
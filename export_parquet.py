@@ -0,0 +1,212 @@
+# export_parquet.py
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, func, Integer, Float, Numeric, String, Date, Boolean
+
+from models import (engine, Parent_Region, Region, Team, Player, Map, Agent, Tour, Tour_Split,
+                    Match, Game, PlayerRole, GamePlayer)
+
+# ----------------------- Configuration -----------------------
+
+EXPORT_DIR = os.getenv('PARQUET_EXPORT_DIR', 'exports/parquet')
+MANIFEST_FILE = '_manifest.json'
+
+# Rows fetched from the server-side cursor and written per row group
+CHUNK_SIZE = 50000
+
+REFERENCE_TABLES = [Parent_Region, Region, Team, Player, Map, Agent, Tour, Tour_Split, PlayerRole]
+PARTITIONED_TABLES = [Match, Game, GamePlayer]
+
+# ----------------------- Helpers -----------------------
+
+def arrow_type(column_type):
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    # Float subclasses Numeric; exact Numeric columns (prize pools) come back as Decimal
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, Numeric):
+        return pa.decimal128(column_type.precision or 38, column_type.scale or 0)
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, String):
+        return pa.string()
+    raise ValueError(f"No Arrow type for column type {column_type!r}")
+
+def arrow_schema(model):
+    return pa.schema([pa.field(col.name, arrow_type(col.type)) for col in model.__table__.columns])
+
+def rows_to_table(rows, schema):
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.Table.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema
+    )
+
+def partitioned_query(model, columns=None):
+    # Fact rows with the tour/split they belong to, or `columns` over the same joins
+    tour_split_id = func.coalesce(Match.tour_split_id, 0)
+    tour_id = func.coalesce(Tour_Split.tour_id, 0)
+    query = select(*(columns or [tour_id, tour_split_id, *model.__table__.columns]))
+    if model is GamePlayer:
+        query = query.select_from(GamePlayer).join(Game, Game.game_id == GamePlayer.game_id).join(Match, Match.match_id == Game.match_id)
+    elif model is Game:
+        query = query.select_from(Game).join(Match, Match.match_id == Game.match_id)
+    else:
+        query = query.select_from(Match)
+    query = query.outerjoin(Tour_Split, Tour_Split.external_split_id == Match.tour_split_id)
+    return query, tour_id, tour_split_id
+
+def row_checksum(row):
+    # 64-bit hash of one row's values; summed per split, so row order does not matter
+    return int.from_bytes(hashlib.blake2b(repr(tuple(row)).encode(), digest_size=8).digest(), 'big')
+
+def split_states(conn, model):
+    # {split id: [rows, content checksum]}; a split whose state differs from the manifest's is exported again,
+    # including when re-scrapes rewrote its rows in place. Taken before the export, so rows changed meanwhile
+    # make the next incremental run export the split again.
+    query, _, _ = partitioned_query(model)
+    states = {}
+    result = conn.execution_options(stream_results=True, yield_per=CHUNK_SIZE).execute(query)
+    for chunk in result.partitions():
+        for row in chunk:
+            state = states.setdefault(row[1], [0, 0])
+            state[0] += 1
+            state[1] = (state[1] + row_checksum(row[2:])) % 2 ** 64
+    # Hex, so the manifest's JSON never holds integers other tools would round
+    return {split_id: [rows, f"{checksum:016x}"] for split_id, (rows, checksum) in states.items()}
+
+def remove_partitions(export_dir, model, split_ids):
+    table_dir = os.path.join(export_dir, model.__tablename__)
+    if not os.path.isdir(table_dir):
+        return
+    for tour_dir in os.listdir(table_dir):
+        for split_id in split_ids:
+            shutil.rmtree(os.path.join(table_dir, tour_dir, f"tour_split_id={split_id}"), ignore_errors=True)
+
+def load_manifest(export_dir):
+    path = os.path.join(export_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"splits": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(export_dir, manifest):
+    path = os.path.join(export_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+# ----------------------- Export Functions -----------------------
+
+def export_reference_table(conn, model, export_dir):
+    table_dir = os.path.join(export_dir, model.__tablename__)
+    os.makedirs(table_dir, exist_ok=True)
+    schema = arrow_schema(model)
+    path = os.path.join(table_dir, 'part-0.parquet')
+
+    rows_written = 0
+    result = conn.execution_options(stream_results=True, yield_per=CHUNK_SIZE).execute(select(*model.__table__.columns))
+    with pq.ParquetWriter(path + '.tmp', schema) as writer:
+        for chunk in result.partitions():
+            writer.write_table(rows_to_table(chunk, schema))
+            rows_written += len(chunk)
+    os.replace(path + '.tmp', path)
+    print(f"Exported {rows_written} rows from {model.__tablename__}.")
+
+def export_partitioned_table(conn, model, export_dir, splits=None):
+    # Every split, or only `splits`, whose partitions are replaced whole
+    table_dir = os.path.join(export_dir, model.__tablename__)
+    schema = arrow_schema(model)
+    query, tour_id, tour_split_id = partitioned_query(model)
+    if splits is not None:
+        if not splits:
+            print(f"No changed splits in {model.__tablename__}.")
+            return {}
+        query = query.where(tour_split_id.in_(list(splits)))
+    query = query.order_by(tour_split_id)
+
+    writer = None
+    current = None
+    exported = {}
+
+    def close_writer():
+        if writer is not None:
+            writer.close()
+            os.replace(current_path + '.tmp', current_path)
+
+    result = conn.execution_options(stream_results=True, yield_per=CHUNK_SIZE).execute(query)
+    for chunk in result.partitions():
+        # Slice the chunk at partition boundaries; only one writer is ever open
+        start = 0
+        while start < len(chunk):
+            key = (chunk[start][0], chunk[start][1])
+            end = start
+            while end < len(chunk) and (chunk[end][0], chunk[end][1]) == key:
+                end += 1
+
+            if key != current:
+                close_writer()
+                current = key
+                partition_dir = os.path.join(table_dir, f"tour_id={key[0]}", f"tour_split_id={key[1]}")
+                os.makedirs(partition_dir, exist_ok=True)
+                current_path = os.path.join(partition_dir, 'part-0.parquet')
+                writer = pq.ParquetWriter(current_path + '.tmp', schema)
+
+            writer.write_table(rows_to_table([row[2:] for row in chunk[start:end]], schema))
+            exported[key[1]] = exported.get(key[1], 0) + (end - start)
+            start = end
+    close_writer()
+
+    print(f"Exported {sum(exported.values())} rows from {model.__tablename__} across {len(exported)} splits.")
+    return exported
+
+def export_all(export_dir=EXPORT_DIR, incremental=False):
+    start = time.perf_counter()
+    manifest = load_manifest(export_dir) if incremental else {"splits": {}}
+    if not incremental:
+        for model in PARTITIONED_TABLES:
+            shutil.rmtree(os.path.join(export_dir, model.__tablename__), ignore_errors=True)
+    os.makedirs(export_dir, exist_ok=True)
+
+    with engine.connect() as conn:
+        for model in REFERENCE_TABLES:
+            export_reference_table(conn, model, export_dir)
+
+        for model in PARTITIONED_TABLES:
+            states = split_states(conn, model)
+            if incremental:
+                # JSON keys are strings; a manifest from before split states were kept re-exports everything
+                done = manifest["splits"].get(model.__tablename__)
+                done = {int(split_id): state for split_id, state in done.items()} if isinstance(done, dict) else {}
+                changed = sorted(split_id for split_id, state in states.items() if done.get(split_id) != state)
+                remove_partitions(export_dir, model, changed + [split_id for split_id in done if split_id not in states])
+                export_partitioned_table(conn, model, export_dir, splits=changed)
+            else:
+                export_partitioned_table(conn, model, export_dir)
+            manifest["splits"][model.__tablename__] = {str(split_id): state for split_id, state in states.items()}
+
+    save_manifest(export_dir, manifest)
+    print(f"Parquet export finished in {time.perf_counter() - start:.1f}s ({export_dir}).")
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the ingested dataset to partitioned Parquet.")
+    parser.add_argument('--out', default=EXPORT_DIR, help="Output directory")
+    parser.add_argument('--incremental', action='store_true', help="Only export splits whose rows changed since the manifest")
+    parser.add_argument('--upload', action='store_true', help="Upload the export to the S3 archive (ARCHIVE_BUCKET)")
+    args = parser.parse_args()
+    export_all(args.out, incremental=args.incremental)
+    if args.upload:
+        from s3_archive import S3PageArchive
+        S3PageArchive.from_env().upload_files(args.out, 'parquet/')
@@ -0,0 +1,122 @@
+# fingerprints.py
+
+import os
+import re
+import hashlib
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import session, Base
+from match_pages import _find, _iter_tags, _close
+
+# ----------------------- Configuration -----------------------
+
+# SKIP_UNCHANGED=0 re-crawls everything, e.g. after a parser fix
+ENABLED = os.getenv('SKIP_UNCHANGED', '1') != '0'
+
+# Removed before hashing: scripts, styles, comments, ad slots and relative times ("2h 10m")
+VOLATILE_RE = re.compile(
+    r'<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->|<ins\b.*?</ins>'
+    r'|<div class="[^"]*\b(?:ml-eta|wf-ad)\b[^"]*"[^>]*>.*?</div>',
+    re.S | re.I
+)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# ----------------------- Fingerprint Table -----------------------
+
+class PageFingerprint(Base):
+    __tablename__ = 'page_fingerprints'
+    url = Column(String(500), primary_key=True)
+    # 'page' for tour/split/match-list pages; 'header' or a game id for match pages
+    block = Column(String(50), primary_key=True)
+    fingerprint = Column(String(64))
+    updated_at = Column(DateTime)
+
+# ----------------------- Hashing -----------------------
+
+def _digest(parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(WHITESPACE_RE.sub(' ', VOLATILE_RE.sub('', part)).strip().encode('utf-8'))
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+def _decode(page):
+    return page.decode('utf-8', errors='replace') if isinstance(page, bytes) else page
+
+def _region(page, tag, cls, start=0, end=None):
+    end = len(page) if end is None else end
+    found = _find(page, tag, start, end, cls=cls)
+    if found is None:
+        return ''
+    return page[found[0]:_close(page, tag, found[1], end)[1]]
+
+def _regions(page, tag, cls):
+    end = len(page)
+    return [page[found[0]:_close(page, tag, found[1], end)[1]] for found in _iter_tags(page, tag, 0, end, cls=cls)]
+
+def tour_fingerprint(page):
+    # The event cards, including their status
+    return _digest([_region(_decode(page), 'div', 'events-container')])
+
+def split_fingerprint(page):
+    page = _decode(page)
+    return _digest([_region(page, 'div', 'wf-nav'), _region(page, 'div', 'event-header'),
+                    _region(page, 'div', 'event-teams-container')])
+
+def match_list_fingerprint(page):
+    # Every match row with its score and status
+    return _digest(_regions(_decode(page), 'a', 'wf-module-item'))
+
+def match_fingerprints(page):
+    # {'header': ..., game_id: ...}: one fingerprint per vm-stats-game block so only changed maps are re-ingested
+    page = _decode(page)
+    prints = {"header": _digest([_region(page, 'div', 'match-header')])}
+    end = len(page)
+    for found in _iter_tags(page, 'div', 0, end, cls='vm-stats-game'):
+        game_id = found[2].get('data-game-id')
+        if game_id and game_id != 'all':
+            prints[game_id] = _digest([page[found[0]:_close(page, 'div', found[1], end)[1]]])
+    return prints
+
+def split_matches_link(page):
+    # The Matches tab href, read without building a tree when the split page itself is unchanged
+    page = _decode(page)
+    nav_items = list(_iter_tags(page, 'a', 0, len(page), cls='wf-nav-item'))
+    return nav_items[1][2].get('href') if len(nav_items) > 1 else None
+
+# ----------------------- Crawl State -----------------------
+
+def stored(url, session=session):
+    rows = session.execute(select(PageFingerprint.block, PageFingerprint.fingerprint)
+                           .where(PageFingerprint.url == url)).all()
+    return dict(rows)
+
+def changed_blocks(url, prints, session=session):
+    # Blocks whose fingerprint differs from the last saved crawl (everything, when disabled)
+    if not ENABLED:
+        return set(prints)
+    previous = stored(url, session)
+    return {block for block, fingerprint in prints.items() if previous.get(block) != fingerprint}
+
+def unchanged(url, fingerprint, block='page', session=session):
+    return ENABLED and stored(url, session).get(block) == fingerprint
+
+def save(url, prints, session=session):
+    # Called once a page's downstream work has succeeded, so a failed crawl is retried next run
+    if isinstance(prints, str):
+        prints = {"page": prints}
+    now = datetime.utcnow()
+    rows = [{"url": url, "block": block, "fingerprint": fingerprint, "updated_at": now}
+            for block, fingerprint in prints.items()]
+    if not rows:
+        return
+    dialect = postgresql if session.bind.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(PageFingerprint.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['url', 'block'],
+        set_={"fingerprint": stmt.excluded.fingerprint, "updated_at": stmt.excluded.updated_at}
+    )
+    session.execute(stmt)
+    session.commit()
@@ -0,0 +1,186 @@
+# live_matches.py
+
+import argparse
+import sys
+import time
+import requests
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
+
+from models import engine, session, Base
+import match_pages
+
+# ----------------------- Configuration -----------------------
+
+# Seconds between polls of a live match; unchanged responses double it up to MAX_INTERVAL
+LIVE_INTERVAL = 30
+MAX_INTERVAL = 300
+# Matches that have not started yet
+UPCOMING_INTERVAL = 600
+# Failed polls in a row (errors and non-304 error responses) before a match stops being polled
+MAX_FAILURES = 10
+
+FINAL_STATUS = 'final'
+LIVE_STATUS = 'live'
+
+# ----------------------- Tracking Table -----------------------
+
+class LiveMatch(Base):
+    __tablename__ = 'live_matches'
+    match_id = Column(Integer, primary_key=True)
+    url = Column(String(500))
+    tour_split_id = Column(Integer)
+    status = Column(String(50))
+    # Validators from the last 200 response, sent back as If-None-Match / If-Modified-Since
+    etag = Column(String(200))
+    last_modified = Column(String(100))
+    interval = Column(Integer, default=LIVE_INTERVAL)
+    next_poll = Column(DateTime)
+    polls = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+    finished = Column(Boolean, default=False)
+
+def interval_for(status):
+    return LIVE_INTERVAL if status == LIVE_STATUS else UPCOMING_INTERVAL
+
+def track(match_id, url, tour_split_id, status, session=session):
+    # Called by scrape_game_data for every match whose header is not final yet
+    live = session.get(LiveMatch, match_id)
+    if live is None:
+        if status == FINAL_STATUS:
+            return
+        live = LiveMatch(match_id=match_id, url=url, tour_split_id=tour_split_id, status=status,
+                         interval=interval_for(status), polls=0, finished=False,
+                         next_poll=datetime.utcnow() + timedelta(seconds=interval_for(status)))
+        session.add(live)
+        print(f"Tracking {status} match {match_id}.")
+    else:
+        live.status = status
+        live.finished = status == FINAL_STATUS
+    session.commit()
+
+# ----------------------- Polling -----------------------
+
+def poll_match(live, fetch, base_url, scrape_game_data):
+    # fetch is tour_split_scrape.fetch: the shared rate limit, page archive and replay archive apply to polls too
+    headers = {}
+    if live.etag:
+        headers['If-None-Match'] = live.etag
+    if live.last_modified:
+        headers['If-Modified-Since'] = live.last_modified
+    try:
+        response = fetch(base_url + live.url, headers=headers)
+    except requests.HTTPError as e:
+        # Server errors fail the poll; a throttled one waits as asked below
+        if e.response is None or e.response.status_code != 429:
+            raise
+        response = e.response
+    live.polls = (live.polls or 0) + 1
+
+    if response.status_code == 304:
+        # Nothing new: back off until the page changes again
+        live.failures = 0
+        live.interval = min(MAX_INTERVAL, (live.interval or LIVE_INTERVAL) * 2)
+    elif response.status_code == 200:
+        live.etag = response.headers.get('ETag')
+        live.last_modified = response.headers.get('Last-Modified')
+        status = match_pages.match_status(response.content)
+        # Changed vm-stats-game blocks are updated in place; unchanged ones are skipped by their fingerprints
+        scrape_game_data(live.url, live.tour_split_id, content=response.content)
+        # Memory-bounded mode may have recycled the session during the scrape
+        if live not in session:
+            live = session.merge(live)
+        live.status = status
+        live.finished = status == FINAL_STATUS
+        live.interval = interval_for(status)
+        live.failures = 0
+        if live.finished:
+            print(f"Match {live.match_id} is final after {live.polls} polls.")
+    elif response.status_code == 429:
+        # Throttled: respect Retry-After when given, otherwise back off
+        retry_after = response.headers.get('Retry-After')
+        live.interval = int(retry_after) if retry_after and retry_after.isdigit() else \
+            min(MAX_INTERVAL, (live.interval or LIVE_INTERVAL) * 2)
+        print(f"Polling match {live.match_id} was throttled; retrying in {live.interval}s.")
+    else:
+        record_failure(live, f"HTTP {response.status_code}")
+
+    live.next_poll = datetime.utcnow() + timedelta(seconds=live.interval)
+    session.commit()
+    return response.status_code
+
+def record_failure(live, error):
+    # Back off as for a 304, and stop polling a match that keeps failing
+    live.failures = (live.failures or 0) + 1
+    live.interval = min(MAX_INTERVAL, (live.interval or LIVE_INTERVAL) * 2)
+    live.next_poll = datetime.utcnow() + timedelta(seconds=live.interval)
+    if live.failures >= MAX_FAILURES:
+        live.finished = True
+        print(f"Giving up on match {live.match_id} after {live.failures} failed polls: {error}")
+    else:
+        print(f"Polling match {live.match_id} failed ({error}); retrying in {live.interval}s.")
+
+def poll_due(fetch, base_url, scrape_game_data, session=session):
+    # Poll every unfinished match whose next poll time has passed; returns the number polled
+    due = session.query(LiveMatch).filter(
+        LiveMatch.finished.is_(False), LiveMatch.next_poll <= datetime.utcnow()
+    ).order_by(LiveMatch.next_poll).all()
+    for live in due:
+        try:
+            poll_match(live, fetch, base_url, scrape_game_data)
+        except Exception as e:
+            # Without a new next_poll the match would be due again at once, every loop
+            session.rollback()
+            if live not in session:
+                live = session.merge(live)
+            record_failure(live, e)
+            session.commit()
+    return len(due)
+
+def seconds_until_next_poll(session=session):
+    live = session.query(LiveMatch).filter(LiveMatch.finished.is_(False)).order_by(LiveMatch.next_poll).first()
+    if live is None:
+        return None
+    return max(0.0, (live.next_poll - datetime.utcnow()).total_seconds())
+
+def run(once=False):
+    # Imported here: tour_split_scrape imports this module to register live matches
+    from tour_split_scrape import base_url, scrape_game_data, fetch, close_archives
+    import read_api
+    # Re-scraped live games replace cached results in a running read_api.py (a no-op if already attached)
+    read_api.attach_to_ingestion(session)
+
+    try:
+        while True:
+            polled = poll_due(fetch, base_url, scrape_game_data)
+            wait = seconds_until_next_poll()
+            if once or wait is None:
+                print(f"Polled {polled} matches; {'nothing left to track' if wait is None else 'done'}.")
+                return
+            time.sleep(min(max(wait, 1.0), LIVE_INTERVAL))
+    finally:
+        close_archives()
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    # tour_split_scrape imports this module; let it reuse this copy instead of defining live_matches twice
+    sys.modules.setdefault('live_matches', sys.modules[__name__])
+
+    parser = argparse.ArgumentParser(description="Poll live matches until they are final, updating stats in place.")
+    parser.add_argument('--once', action='store_true', help="Poll the matches that are due and exit")
+    parser.add_argument('--track', default=None, help="Start tracking a match by its path, e.g. /12345/team-a-vs-team-b")
+    parser.add_argument('--split', type=int, default=None, help="Tour split of the --track match")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    if args.track:
+        match_id = int(args.track.strip('/').split('/')[0])
+        live = session.get(LiveMatch, match_id)
+        if live is None:
+            session.add(LiveMatch(match_id=match_id, url=args.track, tour_split_id=args.split, status=LIVE_STATUS,
+                                  interval=LIVE_INTERVAL, polls=0, finished=False, next_poll=datetime.utcnow()))
+        else:
+            live.finished, live.next_poll = False, datetime.utcnow()
+        session.commit()
+    run(once=args.once)
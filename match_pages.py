@@ -0,0 +1,383 @@
+# match_pages.py
+
+import argparse
+import html as html_lib
+import os
+import re
+import sys
+import time
+from bs4 import BeautifulSoup
+
+from stat_tables import TD_STAT_INDEX, SIDE_CLASSES, extract_stat_table, build_stat_table, _stat_value
+
+# ----------------------- Configuration -----------------------
+
+# 'dom' builds a BeautifulSoup tree; 'lexer' scans the raw page with compiled patterns
+MATCH_PARSER = os.getenv('MATCH_PARSER', 'dom')
+
+OVERVIEW_TABLE_CLASS = 'wf-table-inset mod-overview'
+
+def empty_record():
+    return {
+        "event_link": None, "event_name": None, "date_played": None, "patch": None,
+        "team_links": [None, None], "team_names": [None, None], "scores": [None, None],
+        "status": None, "games": [],
+    }
+
+def _score(text):
+    try:
+        return int(text.strip())
+    except ValueError:
+        return None
+
+def _is_score_span(classes):
+    # match-header-vs-score-winner / -loser / -colon; the live badge is a span too
+    return any(cls.startswith('match-header-vs-score-') for cls in classes)
+
+def normalize_map_name(map_name):
+    return ''.join(str(map_name).split()).replace("PICK", "")
+
+# ----------------------- DOM Path -----------------------
+
+def parse_game_scores(game_div):
+    # Rounds won by the left and right team of a vm-stats-game block
+    header = game_div.find('div', class_='vm-stats-game-header')
+    scores = header.find_all('div', class_='score') if header else []
+    if len(scores) < 2:
+        return [None, None]
+    try:
+        return [int(score.text.strip()) for score in scores[:2]]
+    except ValueError:
+        return [None, None]
+
+def parse_match_dom(page):
+    soup = BeautifulSoup(page, 'html.parser')
+    record = empty_record()
+
+    match_header_super = soup.find('div', class_='match-header-super')
+    if match_header_super:
+        event_a = match_header_super.find('a', class_='match-header-event')
+        record["event_link"] = event_a.get('href') if event_a else None
+        date_div = match_header_super.find('div', {'data-utc-ts': True})
+        record["date_played"] = date_div['data-utc-ts'] if date_div else None
+        tournament_div = match_header_super.find('div', style='font-weight: 700;')
+        record["event_name"] = tournament_div.text.strip() if tournament_div else None
+        patch_div = match_header_super.find('div', style='font-style: italic;')
+        record["patch"] = patch_div.text.strip() if patch_div else None
+
+    match_header_vs = soup.find('div', class_='match-header-vs')
+    if match_header_vs:
+        for i, cls in enumerate(('match-header-link-name mod-1', 'match-header-link-name mod-2')):
+            team_div = match_header_vs.find('div', class_=cls)
+            if not team_div:
+                continue
+            name_div = team_div.find('div', class_='wf-title-med')
+            record["team_names"][i] = name_div.text.strip() if name_div else None
+            team_a = team_div.find_parent('a')
+            record["team_links"][i] = team_a.get('href') if team_a else None
+        scores_div = match_header_vs.find('div', class_='match-header-vs-score')
+        scores = scores_div.find_all('span') if scores_div else []
+        scores = [span for span in scores if _is_score_span(span.get('class') or ())] or scores
+        if scores:
+            record["scores"] = [_score(scores[0].text), _score(scores[-1].text)]
+        # 'final', 'live', or the time until an upcoming match starts
+        note_div = scores_div.find('div', class_='match-header-vs-note') if scores_div else None
+        record["status"] = note_div.text.strip().lower() if note_div else None
+
+    for game_div in soup.find_all('div', class_='vm-stats-game'):
+        game_id = game_div.get('data-game-id')
+        if game_id == 'all':
+            continue
+        map_name_div = game_div.find('div', class_='map')
+        map_name_span = map_name_div.find('span') if map_name_div else None
+        map_name = map_name_span.text.strip() if map_name_span else None
+        record["games"].append({
+            "game_id": game_id,
+            "map": normalize_map_name(map_name) if map_name else "Unknown",
+            "scores": parse_game_scores(game_div),
+            "tables": [extract_stat_table(table) for table in game_div.find_all('table', class_=OVERVIEW_TABLE_CLASS)],
+        })
+    return record
+
+# ----------------------- Lexer Path -----------------------
+
+_TAG_PATTERNS = {}
+ATTR_RE = re.compile(r'''([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+ANY_TAG_RE = re.compile(r'<!--.*?-->|<[^>]*>', re.S)
+COMMENT_RE = re.compile(r'<!--.*?(?:-->|$)', re.S)
+
+def _source(page):
+    # Page text with comments removed, so tags inside them are never matched; BeautifulSoup's text skips them too
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+    return COMMENT_RE.sub('', page) if '<!--' in page else page
+
+def _tag_re(tag):
+    # Opening and closing tags of one element name; group 1 is '/' for a close, group 2 the attributes
+    pattern = _TAG_PATTERNS.get(tag)
+    if pattern is None:
+        pattern = _TAG_PATTERNS[tag] = re.compile(r'<(/?)%s\b((?:"[^"]*"|\'[^\']*\'|[^>"\'])*)>' % tag, re.I)
+    return pattern
+
+def _attrs(raw):
+    attrs = {}
+    for match in ATTR_RE.finditer(raw):
+        name = match.group(1).lower()
+        if name in attrs:
+            continue
+        value = match.group(2)
+        if value is None:
+            value = match.group(3) if match.group(3) is not None else (match.group(4) or '')
+        attrs[name] = html_lib.unescape(value) if '&' in value else value
+    return attrs
+
+def _has_class(attrs, cls):
+    classes = attrs.get('class')
+    if classes is None:
+        return False
+    tokens = classes.split()
+    # A class string with spaces matches the whole attribute, as in BeautifulSoup
+    return ' '.join(tokens) == cls if ' ' in cls else cls in tokens
+
+def _iter_tags(page, tag, start, end, cls=None, attr=None, value=None):
+    # (open start, open end, attrs) of each <tag> in [start, end) matching the class/attribute filter
+    for match in _tag_re(tag).finditer(page, start, end):
+        if match.group(1):
+            continue
+        attrs = _attrs(match.group(2))
+        if cls is not None and not _has_class(attrs, cls):
+            continue
+        if attr is not None and (attr not in attrs or (value is not None and attrs[attr] != value)):
+            continue
+        yield match.start(), match.end(), attrs
+
+def _find(page, tag, start, end, cls=None, attr=None, value=None):
+    return next(_iter_tags(page, tag, start, end, cls, attr, value), None)
+
+def _close(page, tag, open_end, end):
+    # (inner end, element end) of the element whose opening tag ends at open_end, counting nested <tag>s
+    depth = 1
+    for match in _tag_re(tag).finditer(page, open_end, end):
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return match.start(), match.end()
+        elif not match.group(2).rstrip().endswith('/'):
+            depth += 1
+    return end, end
+
+def _text(page, start, end):
+    text = ANY_TAG_RE.sub('', page[start:end])
+    return html_lib.unescape(text) if '&' in text else text
+
+def _element_text(page, tag, found, end):
+    inner_end, _ = _close(page, tag, found[1], end)
+    return _text(page, found[1], inner_end)
+
+def _lex_stat_table(page, start, end):
+    body = _find(page, 'tbody', start, end)
+    if body is not None:
+        start, end = body[1], _close(page, 'tbody', body[1], end)[0]
+    rows = []
+    for tr in _iter_tags(page, 'tr', start, end):
+        tr_end = _close(page, 'tr', tr[1], end)[0]
+        row = [None, None, None, {}]
+        rows.append(row)
+        cells = row[3]
+        for td_index, td in enumerate(_iter_tags(page, 'td', tr[1], tr_end)):
+            td_end = _close(page, 'td', td[1], tr_end)[0]
+            if td_index == 0:
+                link = _find(page, 'a', td[1], td_end)
+                row[0] = link[2].get('href') if link else None
+                name_div = _find(page, 'div', td[1], td_end, cls='text-of')
+                row[1] = _element_text(page, 'div', name_div, td_end).strip() if name_div else None
+            elif td_index == 1:
+                img = _find(page, 'img', td[1], td_end)
+                row[2] = img[2].get('title') if img else None
+            else:
+                stat = TD_STAT_INDEX.get(td_index)
+                if stat is None:
+                    continue
+                for span in _iter_tags(page, 'span', td[1], td_end):
+                    for cls in span[2].get('class', '').split():
+                        side = SIDE_CLASSES.get(cls)
+                        if side is not None and (stat, side) not in cells:
+                            cells[stat, side] = _stat_value(_element_text(page, 'span', span, td_end))
+    return build_stat_table(rows)
+
+def _lex_game_scores(page, start, end):
+    header = _find(page, 'div', start, end, cls='vm-stats-game-header')
+    if header is None:
+        return [None, None]
+    header_end = _close(page, 'div', header[1], end)[0]
+    scores = [_element_text(page, 'div', found, header_end)
+              for found in _iter_tags(page, 'div', header[1], header_end, cls='score')][:2]
+    if len(scores) < 2:
+        return [None, None]
+    try:
+        return [int(score.strip()) for score in scores]
+    except ValueError:
+        return [None, None]
+
+def parse_match_lexer(page):
+    # Same record as parse_match_dom, from compiled patterns over the raw page (no tree is built)
+    page = _source(page)
+    end = len(page)
+    record = empty_record()
+
+    header = _find(page, 'div', 0, end, cls='match-header-super')
+    if header is not None:
+        header_end = _close(page, 'div', header[1], end)[0]
+        event_a = _find(page, 'a', header[1], header_end, cls='match-header-event')
+        record["event_link"] = event_a[2].get('href') if event_a else None
+        date_div = _find(page, 'div', header[1], header_end, attr='data-utc-ts')
+        record["date_played"] = date_div[2]['data-utc-ts'] if date_div else None
+        tournament_div = _find(page, 'div', header[1], header_end, attr='style', value='font-weight: 700;')
+        record["event_name"] = _element_text(page, 'div', tournament_div, header_end).strip() if tournament_div else None
+        patch_div = _find(page, 'div', header[1], header_end, attr='style', value='font-style: italic;')
+        record["patch"] = _element_text(page, 'div', patch_div, header_end).strip() if patch_div else None
+
+    vs = _find(page, 'div', 0, end, cls='match-header-vs')
+    if vs is not None:
+        vs_end = _close(page, 'div', vs[1], end)[0]
+        for i, cls in enumerate(('match-header-link-name mod-1', 'match-header-link-name mod-2')):
+            team_div = _find(page, 'div', vs[1], vs_end, cls=cls)
+            if team_div is None:
+                continue
+            team_end = _close(page, 'div', team_div[1], vs_end)[0]
+            name_div = _find(page, 'div', team_div[1], team_end, cls='wf-title-med')
+            record["team_names"][i] = _element_text(page, 'div', name_div, team_end).strip() if name_div else None
+            # The enclosing <a>: the last one opened in the header before the team div and not yet closed
+            parent = None
+            for link in _iter_tags(page, 'a', vs[1], team_div[0]):
+                if _close(page, 'a', link[1], vs_end)[1] > team_div[0]:
+                    parent = link
+            record["team_links"][i] = parent[2].get('href') if parent else None
+        scores_div = _find(page, 'div', vs[1], vs_end, cls='match-header-vs-score')
+        if scores_div is not None:
+            scores_end = _close(page, 'div', scores_div[1], vs_end)[0]
+            spans = list(_iter_tags(page, 'span', scores_div[1], scores_end))
+            spans = [span for span in spans if _is_score_span(span[2].get('class', '').split())] or spans
+            if spans:
+                record["scores"] = [_score(_element_text(page, 'span', spans[0], scores_end)),
+                                    _score(_element_text(page, 'span', spans[-1], scores_end))]
+            note_div = _find(page, 'div', scores_div[1], scores_end, cls='match-header-vs-note')
+            record["status"] = _element_text(page, 'div', note_div, scores_end).strip().lower() if note_div else None
+
+    position = 0
+    while True:
+        game = _find(page, 'div', position, end, cls='vm-stats-game')
+        if game is None:
+            break
+        game_end = _close(page, 'div', game[1], end)[0]
+        position = game[1]
+        game_id = game[2].get('data-game-id')
+        if game_id == 'all':
+            continue
+
+        map_name = None
+        map_div = _find(page, 'div', game[1], game_end, cls='map')
+        if map_div is not None:
+            map_end = _close(page, 'div', map_div[1], game_end)[0]
+            map_span = _find(page, 'span', map_div[1], map_end)
+            map_name = _element_text(page, 'span', map_span, map_end).strip() if map_span else None
+
+        tables = []
+        for table in _iter_tags(page, 'table', game[1], game_end, cls=OVERVIEW_TABLE_CLASS):
+            table_end = _close(page, 'table', table[1], game_end)[0]
+            tables.append(_lex_stat_table(page, table[1], table_end))
+
+        record["games"].append({
+            "game_id": game_id,
+            "map": normalize_map_name(map_name) if map_name else "Unknown",
+            "scores": _lex_game_scores(page, game[1], game_end),
+            "tables": tables,
+        })
+    return record
+
+def match_status(page):
+    # Just the header status ('final', 'live', ...), for pollers that decide before parsing the whole page
+    page = _source(page)
+    end = len(page)
+    scores_div = _find(page, 'div', 0, end, cls='match-header-vs-score')
+    if scores_div is None:
+        return None
+    scores_end = _close(page, 'div', scores_div[1], end)[0]
+    note_div = _find(page, 'div', scores_div[1], scores_end, cls='match-header-vs-note')
+    return _element_text(page, 'div', note_div, scores_end).strip().lower() if note_div else None
+
+def parse_match(page, parser=None):
+    return (parse_match_lexer if (parser or MATCH_PARSER) == 'lexer' else parse_match_dom)(page)
+
+# ----------------------- Differential Check -----------------------
+
+def record_json(record):
+    # Plain lists instead of StatTables, for comparison and MongoDB
+    def table_json(table):
+        return {"player_ids": table.player_ids.tolist(), "player_hrefs": table.player_hrefs,
+                "player_names": table.player_names, "agents": table.agents,
+                "values": table.values.tolist(), "side_data": table.side_data.tolist()}
+    result = dict(record)
+    result["games"] = [dict(game, tables=[table_json(table) for table in game["tables"]]) for game in record["games"]]
+    return result
+
+def diff_records(a, b, path=''):
+    # Paths at which two record_json results differ
+    if isinstance(a, dict) and isinstance(b, dict):
+        diffs = []
+        for key in sorted(set(a) | set(b)):
+            diffs += diff_records(a.get(key), b.get(key), f"{path}.{key}")
+        return diffs
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        diffs = []
+        for i, (x, y) in enumerate(zip(a, b)):
+            diffs += diff_records(x, y, f"{path}[{i}]")
+        return diffs
+    return [] if a == b else [f"{path}: {a!r} != {b!r}"]
+
+def page_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith('.html'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the lexer against the DOM parser on match pages and time both.")
+    parser.add_argument('paths', nargs='*', default=['test.html'], help="Match pages or directories of recorded pages")
+    parser.add_argument('--synthetic', type=int, default=0, help="Also check this many replay_server match pages")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing repetitions per page")
+    args = parser.parse_args()
+
+    pages = []
+    for path in page_files(args.paths):
+        with open(path, 'rb') as f:
+            pages.append((path, f.read()))
+    if args.synthetic:
+        from replay_server import SyntheticSite
+        site = SyntheticSite(matches_per_split=max(1, args.synthetic))
+        pages += [(f"synthetic/{10000000 + m}", site.match_page(10000000 + m).encode('utf-8')) for m in range(args.synthetic)]
+
+    mismatches = 0
+    for name, page in pages:
+        diffs = diff_records(record_json(parse_match_dom(page)), record_json(parse_match_lexer(page)))
+        if diffs:
+            mismatches += 1
+            print(f"{name}: {len(diffs)} differences, first: {diffs[:3]}")
+    print(f"{len(pages) - mismatches}/{len(pages)} pages identical between the DOM and lexer paths.")
+
+    timings = {}
+    for label, parse in (("DOM", parse_match_dom), ("Lexer", parse_match_lexer)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, page in pages:
+                parse(page)
+        timings[label] = (time.perf_counter() - start) / (args.repeat * len(pages))
+        print(f"{label}: {timings[label] * 1000:.2f}ms per page")
+    print(f"Speedup: {timings['DOM'] / timings['Lexer']:.1f}x")
+    sys.exit(1 if mismatches else 0)
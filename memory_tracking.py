@@ -0,0 +1,97 @@
+# memory_tracking.py
+
+import gc
+import os
+import resource
+import tracemalloc
+
+# ----------------------- RSS -----------------------
+
+def current_rss_mb():
+    # Resident set size now (Linux /proc), falling back to the peak elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# ----------------------- Session Recycling -----------------------
+
+class SessionRecycler:
+    # Memory-bounded mode: every `batch` matches the session's identity map is emptied, so objects
+    # added earlier in the run can be freed, and parse-tree cycles are collected
+
+    def __init__(self, session, batch=50, enabled=False):
+        self.session = session
+        self.batch = batch
+        self.enabled = enabled
+        self.count = 0
+
+    def match_done(self):
+        if not self.enabled:
+            return
+        self.count += 1
+        if self.count % self.batch == 0:
+            self.session.expunge_all()
+            gc.collect()
+            print(f"Recycled the session after {self.count} matches; RSS {current_rss_mb():.0f} MB.")
+
+def release(soup):
+    # Break a BeautifulSoup tree's parent/child cycles now instead of at the next cyclic GC
+    if soup is not None:
+        soup.decompose()
+
+# ----------------------- Allocation Tracking -----------------------
+
+class MemoryObserver:
+    # Stage observer (stages.py): tracemalloc peak and retained bytes per stage, inclusive of nested stages
+
+    def __init__(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = tracemalloc.take_snapshot()
+        # [name, traced at entry, highest peak seen inside]
+        self.stack = []
+        # name -> [calls, max peak, summed peak, summed retained]
+        self.stats = {}
+        self.peak = 0
+
+    def _peak(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        return current, peak
+
+    def enter(self, name):
+        current, peak = self._peak()
+        if self.stack:
+            self.stack[-1][2] = max(self.stack[-1][2], peak)
+        tracemalloc.reset_peak()
+        self.stack.append([name, current, current])
+
+    def exit(self, name):
+        _, start, inner_peak = self.stack.pop()
+        current, peak = self._peak()
+        peak = max(peak, inner_peak)
+        stats = self.stats.setdefault(name, [0, 0, 0, 0])
+        stats[0] += 1
+        stats[1] = max(stats[1], peak - start)
+        stats[2] += peak - start
+        stats[3] += current - start
+        if self.stack:
+            self.stack[-1][2] = max(self.stack[-1][2], peak)
+
+    def report(self, top=10):
+        print("Memory by stage (tracemalloc, nested stages included):")
+        print(f"  {'stage':<14} {'calls':>7} {'mean peak KB':>13} {'max peak KB':>12} {'retained KB':>12}")
+        for name, (calls, max_peak, peak_sum, retained) in self.stats.items():
+            print(f"  {name:<14} {calls:>7} {peak_sum / calls / 1024:>13.1f} {max_peak / 1024:>12.1f} {retained / 1024:>12.1f}")
+        current, _ = self._peak()
+        print(f"Traced now {current / 1024 / 1024:.1f} MB, traced peak {self.peak / 1024 / 1024:.1f} MB, "
+              f"peak RSS {peak_rss_mb():.0f} MB.")
+        print("Largest allocation sites still held since tracking started:")
+        for stat in tracemalloc.take_snapshot().compare_to(self.baseline, 'lineno')[:top]:
+            print(f"  {stat}")
@@ -0,0 +1,87 @@
+# mongo_sink.py
+
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReplaceOne, ASCENDING
+from pymongo.errors import BulkWriteError
+
+# ----------------------- Configuration -----------------------
+
+# Load environment variables from a .env file
+load_dotenv()
+
+MONGODB_URI = os.getenv('MONGODB_URI')
+MONGODB_DB = 'valorantdb'
+
+# Indexes every collection written through a sink should have, keyed by collection name
+COLLECTION_INDEXES = {
+    'games': [([('game_id', ASCENDING)], {"unique": True, "name": 'game_id_unique'})],
+}
+
+# ----------------------- Helpers -----------------------
+
+def ensure_indexes(db):
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        for keys, options in indexes:
+            db[collection_name].create_index(keys, **options)
+
+# ----------------------- Sink -----------------------
+
+class MongoSink:
+    # Buffers documents and writes them with one unordered bulk upsert per batch
+
+    def __init__(self, collection, key='game_id', batch_size=100):
+        self.collection = collection
+        self.key = key
+        self.batch_size = batch_size
+        self.buffer = {}
+        self.written = 0
+        self.batches = 0
+        self.known = None
+        collection.create_index([(key, ASCENDING)], unique=True, name=f"{key}_unique")
+
+    @classmethod
+    def from_uri(cls, uri=MONGODB_URI, collection_name='games', **kwargs):
+        client = MongoClient(uri)
+        sink = cls(client[MONGODB_DB][collection_name], **kwargs)
+        sink.client = client
+        return sink
+
+    def seen(self, key_value):
+        # Existing keys are loaded once with a covered index scan instead of one find_one per document
+        if self.known is None:
+            cursor = self.collection.find({}, {self.key: 1, "_id": 0}).hint(f"{self.key}_unique")
+            self.known = {doc[self.key] for doc in cursor}
+        return key_value in self.known or key_value in self.buffer
+
+    def add(self, document):
+        # Later documents with the same key replace earlier ones still in the buffer
+        self.buffer[document[self.key]] = document
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return 0
+        operations = [ReplaceOne({self.key: key_value}, document, upsert=True)
+                      for key_value, document in self.buffer.items()]
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            count = result.upserted_count + result.modified_count
+        except BulkWriteError as e:
+            # Unordered: every operation that could succeed did; report the rest
+            count = e.details.get('nUpserted', 0) + e.details.get('nModified', 0)
+            print(f"MongoDB bulk write had {len(e.details.get('writeErrors', []))} errors: {e.details.get('writeErrors', [])[:3]}")
+        if self.known is not None:
+            self.known.update(self.buffer)
+        self.written += count
+        self.batches += 1
+        print(f"Wrote {len(operations)} documents to MongoDB in one batch.")
+        self.buffer.clear()
+        return count
+
+    def close(self):
+        self.flush()
+        client = getattr(self, 'client', None)
+        if client is not None:
+            client.close()
@@ -0,0 +1,229 @@
+# page_archive.py
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+# ----------------------- Configuration -----------------------
+
+# Load environment variables from a .env file
+load_dotenv()
+
+# Append every fetched page here; REPLAY_ARCHIVE_DIR serves fetches from an archive instead of the network
+PAGE_ARCHIVE_DIR = os.getenv('PAGE_ARCHIVE_DIR')
+REPLAY_ARCHIVE_DIR = os.getenv('REPLAY_ARCHIVE_DIR')
+
+# A new archive file is started past this size
+FILE_BYTES = int(float(os.getenv('PAGE_ARCHIVE_FILE_MB', '1024')) * 1024 * 1024)
+INDEX_FILE = 'index.jsonl'
+
+# ----------------------- Records -----------------------
+
+def archive_key(url):
+    # Pages are looked up by path and query, so an archive made against replay_server.py or vlr.gg replays either way
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else '')
+
+def encode_record(url, body, fetched_at):
+    # One WARC 1.0 resource record per gzip member
+    header = (f"WARC/1.0\r\nWARC-Type: resource\r\nWARC-Target-URI: {url}\r\nWARC-Date: {fetched_at}\r\n"
+              f"Content-Type: text/html\r\nContent-Length: {len(body)}\r\n\r\n").encode('utf-8')
+    return gzip.compress(header + body + b"\r\n\r\n", compresslevel=6)
+
+def decode_record(member):
+    # -> (headers dict, body)
+    data = gzip.decompress(member)
+    head, _, rest = data.partition(b"\r\n\r\n")
+    headers = dict(line.split(': ', 1) for line in head.decode('utf-8').split("\r\n")[1:])
+    return headers, rest[:int(headers['Content-Length'])]
+
+class ArchivedResponse:
+    # The parts of requests.Response the scrapers read
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+# ----------------------- Archive -----------------------
+
+class PageArchive:
+    # Append-only *.warc.gz files plus index.jsonl: key, url, file, offset, length, fetched_at per record
+
+    def __init__(self, archive_dir, file_bytes=FILE_BYTES):
+        self.archive_dir = archive_dir
+        self.file_bytes = file_bytes
+        os.makedirs(archive_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.index = None
+        self.out = None
+        self.index_out = None
+        self.pages = 0
+        self.stored_bytes = 0
+
+    def load_index(self):
+        # key -> latest entry; later lines win, so a re-fetched page replaces the older copy
+        if self.index is None:
+            index = {}
+            path = os.path.join(self.archive_dir, INDEX_FILE)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            index[entry["key"]] = entry
+            self.index = index
+        return self.index
+
+    def _open_file(self):
+        name = f"pages-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.warc.gz"
+        self.out = open(os.path.join(self.archive_dir, name), 'ab')
+        if self.index_out is None:
+            self.index_out = open(os.path.join(self.archive_dir, INDEX_FILE), 'a', encoding='utf-8')
+
+    def add(self, url, body, fetched_at=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        fetched_at = fetched_at or datetime.now(timezone.utc).isoformat()
+        member = encode_record(url, body, fetched_at)
+        with self.lock:
+            if self.out is None or self.out.tell() >= self.file_bytes:
+                if self.out is not None:
+                    self.out.close()
+                self._open_file()
+            offset = self.out.tell()
+            self.out.write(member)
+            self.out.flush()
+            entry = {"key": archive_key(url), "url": url, "file": os.path.basename(self.out.name),
+                     "offset": offset, "length": len(member), "fetched_at": fetched_at}
+            # The index line goes after its record, so an entry never points past the end of a file
+            self.index_out.write(json.dumps(entry) + '\n')
+            self.index_out.flush()
+            if self.index is not None:
+                self.index[entry["key"]] = entry
+            self.pages += 1
+            self.stored_bytes += len(member)
+
+    def close(self):
+        with self.lock:
+            for f in (self.out, self.index_out):
+                if f is not None:
+                    f.close()
+            self.out = self.index_out = None
+
+    def read_entry(self, entry):
+        with open(os.path.join(self.archive_dir, entry["file"]), 'rb') as f:
+            f.seek(entry["offset"])
+            return decode_record(f.read(entry["length"]))[1]
+
+    def get(self, url):
+        # One seek and one member decompressed, whatever the size of the archive
+        entry = self.load_index().get(archive_key(url))
+        return self.read_entry(entry) if entry else None
+
+    def fetch(self, url):
+        # Stand-in for requests.get when re-ingesting from the archive
+        body = self.get(url)
+        return ArchivedResponse(url, body) if body is not None else ArchivedResponse(url, b'', 404)
+
+    def iter_pages(self, prefix=None):
+        # (key, body) for the latest copy of every page, reading each file front to back once
+        entries = sorted(self.load_index().values(), key=lambda entry: (entry["file"], entry["offset"]))
+        current_name, current = None, None
+        try:
+            for entry in entries:
+                if prefix is not None and not entry["key"].startswith(prefix):
+                    continue
+                if entry["file"] != current_name:
+                    if current is not None:
+                        current.close()
+                    current_name = entry["file"]
+                    current = open(os.path.join(self.archive_dir, current_name), 'rb')
+                current.seek(entry["offset"])
+                yield entry["key"], decode_record(current.read(entry["length"]))[1]
+        finally:
+            if current is not None:
+                current.close()
+
+# ----------------------- Replay -----------------------
+
+def is_match_key(key):
+    # /<match_id>/<slug>
+    first = key.strip('/').split('/')[0]
+    return first.isdigit()
+
+def replay_parsers(archive_dir, parser='lexer'):
+    # Parse every archived match page, e.g. to check a parser change against the whole crawl
+    import match_pages
+    archive = PageArchive(archive_dir)
+    start = time.perf_counter()
+    pages = games = players = size = 0
+    for key, body in archive.iter_pages():
+        if not is_match_key(key):
+            continue
+        record = match_pages.parse_match(body, parser)
+        pages += 1
+        size += len(body)
+        games += len(record["games"])
+        players += sum(len(table) for game in record["games"] for table in game["tables"])
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {pages} match pages ({size / 1024 / 1024:.1f} MB, {games} games, {players} player rows) "
+          f"in {elapsed:.1f}s: {pages / elapsed if elapsed else 0:.0f} pages/s.")
+    return pages
+
+def reingest(archive_dir, tour_urls=None):
+    # Runs the full scraper with fetch() served from the archive; nothing is requested from the site
+    import tour_split_scrape
+    import fingerprints
+    tour_split_scrape.replay_archive = PageArchive(archive_dir)
+    # Every archived page is parsed again, even where the stored fingerprints match
+    skip_unchanged, fingerprints.ENABLED = fingerprints.ENABLED, False
+    start = time.perf_counter()
+    try:
+        for tour_url in tour_urls or tour_split_scrape.all_tours:
+            tour_split_scrape.scrape_tour_data(tour_url)
+        print(f"Re-ingested from {archive_dir} in {time.perf_counter() - start:.1f}s.")
+    finally:
+        # As at the end of a crawl: buffered MongoDB documents are written and archive files closed
+        if tour_split_scrape.games_sink is not None:
+            tour_split_scrape.games_sink.close()
+        tour_split_scrape.close_archives()
+        tour_split_scrape.replay_archive = None
+        fingerprints.ENABLED = skip_unchanged
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read, replay or re-ingest the local page archive.")
+    parser.add_argument('command', choices=['get', 'list', 'replay', 'reingest'])
+    parser.add_argument('target', nargs='*', help="URL for get; tour URLs for reingest")
+    parser.add_argument('--dir', default=PAGE_ARCHIVE_DIR or 'archive')
+    parser.add_argument('--parser', default='lexer', choices=['dom', 'lexer'])
+    args = parser.parse_args()
+
+    if args.command == 'get':
+        page = PageArchive(args.dir).get(args.target[0])
+        if page is None:
+            print(f"{args.target[0]} is not in the archive.")
+            sys.exit(1)
+        sys.stdout.buffer.write(page)
+    elif args.command == 'list':
+        index = PageArchive(args.dir).load_index()
+        for key, entry in sorted(index.items()):
+            print(f"{entry['fetched_at']}  {key}  {entry['file']}@{entry['offset']}+{entry['length']}")
+        print(f"{len(index)} pages.")
+    elif args.command == 'replay':
+        replay_parsers(args.dir, args.parser)
+    else:
+        reingest(args.dir, args.target)
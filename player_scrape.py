@@ -11,6 +11,9 @@ import time
 from pymongo import MongoClient
 from datetime import datetime
 import pdb
+import argparse
+import profiling
+from stages import stages
 
 # ----------------------- Configuration -----------------------
 
@@ -122,6 +125,7 @@ def get_region(region_name):
         print(f"Team {team_name} (ID: {team_id}) already exists in PostgreSQL.")
     return team_id
 
+@stages.track('player')
 def scrape_player_page(player_url):
     player_id = extract_player_id_from_url(player_url)
     if not player_id:
@@ -188,6 +192,11 @@ def scrape_data():
 # ----------------------- Main Execution -----------------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the players of one event into the database.")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    profiler = profiling.from_args(args, 'player_scrape')
+
     try:
         scrape_data()
     except Exception as e:
@@ -197,6 +206,8 @@ if __name__ == "__main__":
         session.close()
         # Close MongoDB connection
         mongo_client.close()
+        if profiler is not None:
+            profiler.stop()
 
 
 
@@ -0,0 +1,168 @@
+# profiling.py
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import time
+from datetime import datetime
+
+from stages import stages
+
+# ----------------------- Configuration -----------------------
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+# Always listed in the summary when they ran, whichever entry point called them
+WATCHED_FUNCTIONS = [
+    'scrape_game_data', 'get_team', 'scrape_player_page', 'parse_match', 'extract_stat_table',
+    'parse_sides_stat', 'parse_stat', 'insert_or_get_game', 'insert_or_get_game_player', 'fetch',
+]
+TOP_FUNCTIONS = 20
+
+# ----------------------- Stage Timing -----------------------
+
+class TimingObserver:
+    # Stage observer (stages.py): wall-clock time per stage, inclusive and excluding nested stages
+
+    def __init__(self):
+        # [name, start, time spent in nested stages]
+        self.stack = []
+        # name -> [calls, inclusive seconds, exclusive seconds]
+        self.stats = {}
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        _, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        stats = self.stats.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - nested
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+# ----------------------- Run Profiler -----------------------
+
+class RunProfiler:
+    # cProfile of the main thread plus stage timings; writes <path>.prof (pstats) and <path>.json (summary)
+
+    def __init__(self, entry_point, path=None):
+        self.entry_point = entry_point
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = path or os.path.join(PROFILE_DIR, f"{entry_point}-{stamp}")
+        self.profile = cProfile.Profile()
+        self.timing = None
+        self.started_at = None
+        self.start_time = None
+
+    def start(self):
+        self.timing = stages.add(TimingObserver())
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.start_time = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def stop(self):
+        self.profile.disable()
+        wall = time.perf_counter() - self.start_time
+        stages.observers.remove(self.timing)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.profile.dump_stats(self.path + '.prof')
+        summary = self.summary(wall)
+        with open(self.path + '.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        print_summary(summary)
+        print(f"Profile written to {self.path}.prof (pstats/snakeviz) and {self.path}.json "
+              f"(python profiling.py compare OLD.json NEW.json).")
+        return summary
+
+    def summary(self, wall):
+        stats = pstats.Stats(self.profile).stats
+        functions = {}
+        top = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.items():
+            if name in WATCHED_FUNCTIONS:
+                entry = functions.setdefault(name, {"calls": 0, "tottime": 0.0, "cumtime": 0.0})
+                entry["calls"] += calls
+                entry["tottime"] += tottime
+                # Recursive or same-named functions in several modules can double count cumulative time
+                entry["cumtime"] = max(entry["cumtime"], cumtime)
+            top.append({"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls,
+                        "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+        top.sort(key=lambda entry: entry["tottime"], reverse=True)
+        return {
+            "entry_point": self.entry_point,
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 3),
+            "stages": {name: {"calls": calls, "seconds": round(inclusive, 4), "self_seconds": round(exclusive, 4)}
+                       for name, (calls, inclusive, exclusive) in self.timing.stats.items()},
+            "functions": {name: {key: round(value, 4) if isinstance(value, float) else value
+                                 for key, value in entry.items()}
+                          for name, entry in sorted(functions.items(), key=lambda item: -item[1]["cumtime"])},
+            "top": top[:TOP_FUNCTIONS],
+        }
+
+# ----------------------- Entry Point Hooks -----------------------
+
+def add_argument(parser):
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PATH',
+                        help=f"Profile the run; writes PATH.prof and PATH.json (default: {PROFILE_DIR}/<script>-<time>)")
+
+def from_args(args, entry_point):
+    # A started RunProfiler when --profile was given, else None
+    if args.profile is None:
+        return None
+    return RunProfiler(entry_point, args.profile or None).start()
+
+# ----------------------- Reports -----------------------
+
+def print_summary(summary):
+    wall = summary["wall_seconds"]
+    print(f"Profile of {summary['entry_point']} ({summary['started_at']}): {wall:.1f}s wall clock.")
+    if summary["stages"]:
+        print(f"  {'stage':<14} {'calls':>7} {'seconds':>9} {'self':>9} {'% wall':>7}")
+        for name, stage in summary["stages"].items():
+            print(f"  {name:<14} {stage['calls']:>7} {stage['seconds']:>9.2f} {stage['self_seconds']:>9.2f} "
+                  f"{100 * stage['seconds'] / wall if wall else 0:>6.1f}%")
+    print(f"  {'function':<28} {'calls':>8} {'own s':>9} {'cumulative s':>13}")
+    for name, entry in summary["functions"].items():
+        print(f"  {name:<28} {entry['calls']:>8} {entry['tottime']:>9.3f} {entry['cumtime']:>13.3f}")
+    print("  Most own time:")
+    for entry in summary["top"][:10]:
+        print(f"    {entry['tottime']:>8.3f}s {entry['calls']:>9}  {entry['function']}")
+
+def compare(old, new):
+    print(f"{old['entry_point']} {old['started_at']} -> {new['entry_point']} {new['started_at']}")
+    print(f"  {'':<28} {'old s':>9} {'new s':>9} {'change':>8}")
+
+    def line(label, before, after):
+        change = f"{100 * (after - before) / before:+.0f}%" if before else 'new'
+        print(f"  {label:<28} {before:>9.3f} {after:>9.3f} {change:>8}")
+
+    line('wall clock', old["wall_seconds"], new["wall_seconds"])
+    for name in dict.fromkeys(list(old["stages"]) + list(new["stages"])):
+        line(f"stage {name}", old["stages"].get(name, {}).get("seconds", 0), new["stages"].get(name, {}).get("seconds", 0))
+    for name in dict.fromkeys(list(old["functions"]) + list(new["functions"])):
+        line(name, old["functions"].get(name, {}).get("cumtime", 0), new["functions"].get(name, {}).get("cumtime", 0))
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or compare profiles written by --profile.")
+    parser.add_argument('command', choices=['show', 'compare'])
+    parser.add_argument('files', nargs='+', help="Summary .json files (compare: OLD NEW)")
+    args = parser.parse_args()
+
+    summaries = []
+    for path in args.files:
+        with open(path) as f:
+            summaries.append(json.load(f))
+    if args.command == 'show':
+        for summary in summaries:
+            print_summary(summary)
+    else:
+        compare(summaries[0], summaries[1])
@@ -0,0 +1,410 @@
+# read_api.py
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from sqlalchemy import create_engine, select, func, bindparam, and_, or_, event
+
+from models import DATABASE_URL, Base, Player, Region, Team, Map, Match, Game, GamePlayer
+from aggregates import (PlayerSplitStats, TeamSplitStats, DataVersion, DATA_VERSION, STAT_COLUMNS, TEAM_STAT_COLUMNS,
+                        _averages, bump_data_version)
+from fingerprints import PageFingerprint
+
+# ----------------------- Configuration -----------------------
+
+POOL_SIZE = int(os.getenv('API_POOL_SIZE', '10'))
+CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', '4096'))
+# Seconds a cached result may be served without being recomputed
+CACHE_TTL = float(os.getenv('API_CACHE_TTL', '300'))
+# How often (at most) the ingestion version is checked; repeated calls in between never touch the database
+VERSION_CHECK_SECONDS = float(os.getenv('API_VERSION_CHECK_SECONDS', '1'))
+# Latency samples kept per route for the percentiles
+LATENCY_SAMPLES = 10000
+
+# Query string filters and group-bys, mapped to aggregate table columns
+PLAYER_FILTERS = {'split': 'tour_split_id', 'map': 'map_id', 'agent': 'agent_id'}
+TEAM_FILTERS = {'split': 'tour_split_id'}
+
+# ----------------------- Result Cache -----------------------
+
+class ResultCache:
+    # LRU with a TTL; cleared as a whole when ingestion writes new data
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def snapshot(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                    "invalidations": self.invalidations}
+
+class IngestWatcher:
+    # Clears the cache when another process has changed the data: the data version token moves with every commit
+    # from an attached session, rebuild_aggregates and cleanDB resets, and the latest fingerprint with every page
+    # any scraper stores.
+
+    def __init__(self, engine, cache, interval=VERSION_CHECK_SECONDS):
+        self.engine = engine
+        self.cache = cache
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.last_check = 0.0
+        self.version = None
+
+    def check(self):
+        now = time.monotonic()
+        if now - self.last_check < self.interval or not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.last_check = now
+            with self.engine.connect() as conn:
+                version = (conn.execute(select(DataVersion.token).where(DataVersion.name == DATA_VERSION)).scalar(),
+                           conn.execute(select(func.max(PageFingerprint.updated_at))).scalar())
+            if self.version is not None and version != self.version:
+                self.cache.clear()
+            self.version = version
+        finally:
+            self.lock.release()
+
+def attach_to_ingestion(session, cache=None):
+    # Ingestion side: the first flush of a transaction that writes matches, games or game players also replaces the
+    # data version token, so every ReadService watching the database drops its cache once the transaction commits.
+    # A cache in the same process is cleared on commit directly.
+    if cache is None and session.info.get('bumps_data_version'):
+        return
+    bumps = not session.info.get('bumps_data_version')
+    session.info['bumps_data_version'] = True
+    written = []
+
+    @event.listens_for(session, 'before_flush')
+    def collect(session, flush_context, instances):
+        if not written and any(isinstance(obj, (Match, Game, GamePlayer))
+                               for obj in session.new | session.dirty | session.deleted):
+            written.append(False)
+
+    @event.listens_for(session, 'after_flush')
+    def bump(session, flush_context):
+        if bumps and written and not written[0]:
+            bump_data_version(session.connection())
+            written[0] = True
+
+    @event.listens_for(session, 'after_commit')
+    def invalidate(session):
+        if written:
+            written.clear()
+            if cache is not None:
+                cache.clear()
+
+    @event.listens_for(session, 'after_rollback')
+    def discard(session):
+        written.clear()
+
+# ----------------------- Latency Metrics -----------------------
+
+class LatencyMetrics:
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.lock = threading.Lock()
+        self.samples = samples
+        self.routes = {}
+        self.counts = {}
+
+    def record(self, route, seconds):
+        with self.lock:
+            if route not in self.routes:
+                self.routes[route] = deque(maxlen=self.samples)
+                self.counts[route] = 0
+            self.routes[route].append(seconds * 1000)
+            self.counts[route] += 1
+
+    def snapshot(self):
+        with self.lock:
+            routes = {route: np.array(samples) for route, samples in self.routes.items()}
+            counts = dict(self.counts)
+        return {route: {"requests": counts[route],
+                        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+                        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+                        "max_ms": round(float(samples.max()), 3)}
+                for route, samples in routes.items()}
+
+# ----------------------- Queries -----------------------
+
+# Built once with bind parameters, so each request reuses the compiled statement
+PLAYER_PROFILE = (
+    select(Player.player_id, Player.name, Player.real_name, Player.pp_url, Region.region_name)
+    .outerjoin(Region, Region.region_id == Player.region_id)
+    .where(Player.player_id == bindparam('player_id'))
+)
+PLAYER_TEAMS = (
+    select(GamePlayer.team_id, Team.team_name, func.count().label('games'))
+    .outerjoin(Team, Team.team_id == GamePlayer.team_id)
+    .where(GamePlayer.player_id == bindparam('player_id'))
+    .group_by(GamePlayer.team_id, Team.team_name)
+    .order_by(func.count().desc())
+)
+HEAD_TO_HEAD_MATCHES = (
+    select(Match.match_id, Match.date_played, Match.tour_split_id, Match.team1_id, Match.team2_id)
+    .where(or_(and_(Match.team1_id == bindparam('team_a'), Match.team2_id == bindparam('team_b')),
+               and_(Match.team1_id == bindparam('team_b'), Match.team2_id == bindparam('team_a'))))
+    .order_by(Match.date_played.desc(), Match.match_id.desc())
+)
+HEAD_TO_HEAD_GAMES = (
+    select(Game.match_id, Game.game_id, Map.map_name, GamePlayer.team_id,
+           func.sum(GamePlayer.both_kills).label('kills'), func.sum(GamePlayer.both_deaths).label('deaths'))
+    .outerjoin(Map, Map.map_id == Game.map_id)
+    .join(GamePlayer, GamePlayer.game_id == Game.game_id)
+    .where(Game.match_id.in_(bindparam('match_ids', expanding=True)))
+    .group_by(Game.match_id, Game.game_id, Map.map_name, GamePlayer.team_id)
+    .order_by(Game.game_id)
+)
+
+@lru_cache(maxsize=None)
+def stats_query(model, key_column, count_column, columns, filters, group_by):
+    # One statement per (filters, group_by) shape, so optional filters stay plain equality on indexed columns
+    table = model.__table__
+    group = [table.c[group_by].label(group_by)] if group_by else []
+    query = select(
+        *group,
+        func.sum(table.c[count_column]).label(count_column),
+        func.sum(table.c.side_games).label('side_games'),
+        *[func.sum(table.c[col]).label(col) for col in columns]
+    ).where(table.c[key_column] == bindparam('key'))
+    for name, column in filters:
+        query = query.where(table.c[column] == bindparam(name))
+    if group:
+        query = query.group_by(*group).order_by(*group)
+    return query
+
+class BadRequest(Exception):
+    pass
+
+def _filters(params, allowed):
+    values = {}
+    for name, column in allowed.items():
+        if name in params:
+            try:
+                values[name] = int(params[name])
+            except ValueError:
+                raise BadRequest(f"{name} must be an integer")
+    return values
+
+def _group_by(params, allowed):
+    by = params.get('by')
+    if by is not None and by not in allowed:
+        raise BadRequest(f"by must be one of {', '.join(allowed)}")
+    return allowed[by] if by else None
+
+def _stats_rows(conn, query, params, count_column, columns, group_by):
+    # Per-game averages, as aggregates.get_player_stats / get_team_stats return them
+    rows = conn.execute(query, params).mappings().all()
+    return [{**({group_by: row[group_by]} if group_by else {}), **_averages(row, count_column, columns)}
+            for row in rows]
+
+def player_profile(conn, player_id, params):
+    profile = conn.execute(PLAYER_PROFILE, {"player_id": player_id}).mappings().first()
+    if profile is None:
+        return None
+    teams = conn.execute(PLAYER_TEAMS, {"player_id": player_id}).mappings().all()
+    return {**profile, "teams": [dict(team) for team in teams], "games": sum(team["games"] for team in teams)}
+
+def player_stats(conn, player_id, params):
+    filters = _filters(params, PLAYER_FILTERS)
+    group_by = _group_by(params, PLAYER_FILTERS)
+    query = stats_query(PlayerSplitStats, 'player_id', 'games', tuple(STAT_COLUMNS),
+                        tuple((name, PLAYER_FILTERS[name]) for name in sorted(filters)), group_by)
+    rows = _stats_rows(conn, query, {"key": player_id, **filters}, 'games', STAT_COLUMNS, group_by)
+    if not filters and not sum(row['games'] for row in rows):
+        # No games at all: an unknown player, not one with zero averages
+        return None
+    if group_by:
+        return {"player_id": player_id, "filters": filters, "by": params['by'], "groups": rows}
+    return {"player_id": player_id, "filters": filters, **rows[0]}
+
+def team_stats(conn, team_id, params):
+    filters = _filters(params, TEAM_FILTERS)
+    group_by = _group_by(params, TEAM_FILTERS)
+    query = stats_query(TeamSplitStats, 'team_id', 'player_games', tuple(TEAM_STAT_COLUMNS),
+                        tuple((name, TEAM_FILTERS[name]) for name in sorted(filters)), group_by)
+    rows = _stats_rows(conn, query, {"key": team_id, **filters}, 'player_games', TEAM_STAT_COLUMNS, group_by)
+    if not filters and not sum(row['player_games'] for row in rows):
+        return None
+    for row in rows:
+        # Same K/D as aggregates.get_team_stats: both averages share the player_games denominator
+        row['kd'] = row['both_kills'] / row['both_deaths'] if row['both_deaths'] else 0
+    if group_by:
+        return {"team_id": team_id, "filters": filters, "by": params['by'], "groups": rows}
+    return {"team_id": team_id, "filters": filters, **rows[0]}
+
+def head_to_head(conn, team_a, team_b, params):
+    matches = conn.execute(HEAD_TO_HEAD_MATCHES, {"team_a": team_a, "team_b": team_b}).mappings().all()
+    if 'split' in params:
+        split = _filters(params, TEAM_FILTERS)['split']
+        matches = [match for match in matches if match['tour_split_id'] == split]
+    games = {}
+    if matches:
+        for row in conn.execute(HEAD_TO_HEAD_GAMES, {"match_ids": [match['match_id'] for match in matches]}).mappings():
+            game = games.setdefault(row['match_id'], {}).setdefault(
+                row['game_id'], {"game_id": row['game_id'], "map": row['map_name'], "teams": {}})
+            game["teams"][row['team_id']] = {"kills": row['kills'] or 0, "deaths": row['deaths'] or 0}
+
+    totals = {team_a: {"kills": 0, "deaths": 0}, team_b: {"kills": 0, "deaths": 0}}
+    result = []
+    for match in matches:
+        match_games = list(games.get(match['match_id'], {}).values())
+        for game in match_games:
+            for team_id, stats in game["teams"].items():
+                if team_id in totals:
+                    totals[team_id]["kills"] += stats["kills"]
+                    totals[team_id]["deaths"] += stats["deaths"]
+        result.append({**match, "games": match_games})
+    return {"teams": [team_a, team_b], "matches": len(result), "games": sum(len(m["games"]) for m in result),
+            "totals": totals, "history": result}
+
+# Path pattern -> (route name, handler); captured ids are passed as ints
+ROUTES = [
+    (re.compile(r'^/players/(\d+)$'), 'player_profile', player_profile),
+    (re.compile(r'^/players/(\d+)/stats$'), 'player_stats', player_stats),
+    (re.compile(r'^/teams/(\d+)/stats$'), 'team_stats', team_stats),
+    (re.compile(r'^/head-to-head/(\d+)/(\d+)$'), 'head_to_head', head_to_head),
+]
+
+# ----------------------- Service -----------------------
+
+class ReadService:
+
+    def __init__(self, database_url=DATABASE_URL, pool_size=POOL_SIZE, cache_size=CACHE_SIZE, ttl=CACHE_TTL,
+                 version_check=VERSION_CHECK_SECONDS, engine=None):
+        # Its own pool, sized for the server's worker threads
+        self.engine = engine or create_engine(database_url, pool_size=pool_size, max_overflow=pool_size,
+                                              pool_pre_ping=True)
+        self.cache = ResultCache(cache_size, ttl)
+        self.watcher = IngestWatcher(self.engine, self.cache, version_check)
+        self.metrics = LatencyMetrics()
+
+    def query(self, path, params):
+        # Returns (status, result dict)
+        for pattern, route, handler in ROUTES:
+            found = pattern.match(path)
+            if found is None:
+                continue
+            start = time.perf_counter()
+            self.watcher.check()
+            key = (path, tuple(sorted(params.items())))
+            result = self.cache.get(key)
+            status = 200
+            if result is None:
+                try:
+                    with self.engine.connect() as conn:
+                        result = handler(conn, *[int(group) for group in found.groups()], params)
+                except BadRequest as e:
+                    return 400, {"error": str(e)}
+                if result is None:
+                    status, result = 404, {"error": "not found"}
+                else:
+                    self.cache.put(key, result)
+            self.metrics.record(route, time.perf_counter() - start)
+            return status, result
+        return 404, {"error": "unknown endpoint"}
+
+    def snapshot(self):
+        return {"latency": self.metrics.snapshot(), "cache": self.cache.snapshot(),
+                "pool": self.engine.pool.status()}
+
+def make_handler(service):
+    class ReadHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, result):
+            data = json.dumps(result, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/__metrics':
+                self._send(200, service.snapshot())
+                return
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                status, result = service.query(url.path, params)
+            except Exception as e:
+                print(f"Error serving {self.path}: {e}")
+                status, result = 500, {"error": "internal error"}
+            self._send(status, result)
+
+    return ReadHandler
+
+def start_server(service, host='127.0.0.1', port=0):
+    # Serve in a background thread; returns (server, base_url)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve player, team and head-to-head stats over HTTP as JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help="Cached results (LRU)")
+    parser.add_argument('--ttl', type=float, default=CACHE_TTL, help="Seconds a cached result stays valid")
+    args = parser.parse_args()
+
+    service = ReadService(pool_size=args.pool_size, cache_size=args.cache_size, ttl=args.ttl)
+    Base.metadata.create_all(service.engine)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving stats on http://{args.host}:{args.port} "
+          "(/players/<id>, /players/<id>/stats, /teams/<id>/stats, /head-to-head/<a>/<b>, /__metrics).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        print(json.dumps(service.snapshot()["latency"], indent=2))
@@ -0,0 +1,421 @@
+# replay_server.py
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# ----------------------- Configuration -----------------------
+
+MAPS = ["Ascent", "Bind", "Haven", "Split", "Icebox", "Breeze", "Fracture", "Pearl", "Lotus", "Sunset"]
+
+AGENTS = ["Brimstone", "Viper", "Omen", "Killjoy", "Cypher", "Sova", "Sage", "Phoenix", "Jett", "Reyna",
+          "Raze", "Breach", "Skye", "Yoru", "Astra", "Kayo", "Chamber", "Neon", "Fade", "Harbor",
+          "Gekko", "Deadlock", "Iso", "Clove", "Vyse"]
+
+PARENT_REGIONS = ["Americas", "EMEA", "Pacific", "China"]
+COUNTRIES = ["United States", "Brazil", "Spain", "Turkey", "Japan", "Korea", "China", "France"]
+
+# The real tour paths map onto the first synthetic tours so tour_split_scrape.all_tours works unchanged
+TOUR_ALIASES = {"vct-2024": 0, "gc-2024": 1, "vcl-2024": 2}
+
+# ----------------------- Synthetic Site -----------------------
+
+class SyntheticSite:
+    # Deterministic vlr.gg-shaped pages rendered on request, so 10k matches need no disk
+
+    def __init__(self, tours=3, splits_per_tour=4, matches_per_split=50, teams_per_split=8,
+                 team_pool=64, games_per_match=(2, 3), seed=0):
+        self.tours = tours
+        self.splits_per_tour = splits_per_tour
+        self.matches_per_split = matches_per_split
+        self.teams_per_split = teams_per_split
+        self.team_pool = team_pool
+        self.games_per_match = games_per_match
+        self.seed = seed
+
+    @property
+    def total_matches(self):
+        return self.tours * self.splits_per_tour * self.matches_per_split
+
+    def _rng(self, kind, key):
+        return random.Random(f"{self.seed}:{kind}:{key}")
+
+    def split_id(self, tour, split):
+        return 1000 + tour * 100 + split
+
+    def split_teams(self, split_id):
+        return self._rng("split-teams", split_id).sample(range(1, self.team_pool + 1), self.teams_per_split)
+
+    def tour_urls(self, base_url):
+        return [f"{base_url}/synthetic-tour-{tour}" for tour in range(self.tours)]
+
+    # ----------------------- Routing -----------------------
+
+    def render(self, path):
+        parts = path.strip('/').split('/')
+        try:
+            if len(parts) == 1 and parts[0] in TOUR_ALIASES and TOUR_ALIASES[parts[0]] < self.tours:
+                return self.tour_page(TOUR_ALIASES[parts[0]])
+            if len(parts) == 1 and parts[0].startswith('synthetic-tour-'):
+                return self.tour_page(int(parts[0].rsplit('-', 1)[1]))
+            if parts[0] == 'event' and parts[1] == 'matches':
+                return self.matches_page(int(parts[2]))
+            if parts[0] == 'event':
+                return self.split_page(int(parts[1]))
+            if parts[0] == 'team':
+                return self.team_page(int(parts[1]))
+            if parts[0] == 'player':
+                return self.player_page(int(parts[1]))
+            if parts[0].isdigit():
+                return self.match_page(int(parts[0]))
+        except (ValueError, IndexError):
+            return None
+        return None
+
+    def _valid_split(self, split_id):
+        tour, split = divmod(split_id - 1000, 100)
+        return 0 <= tour < self.tours and 0 <= split < self.splits_per_tour
+
+    # ----------------------- Pages -----------------------
+
+    def tour_page(self, tour):
+        if not 0 <= tour < self.tours:
+            return None
+        items = ''.join(
+            f'<a class="wf-card mod-flex event-item" href="/event/{self.split_id(tour, split)}/synthetic-{tour}-{split}">'
+            f'<div class="event-item-title">Synthetic Split {split}</div>'
+            f'<div class="event-item-desc-item-status mod-completed">completed</div></a>\n'
+            for split in range(self.splits_per_tour)
+        )
+        return (f'<html><body><div class="event-header"><div class="wf-title">Synthetic Tour {tour}</div></div>\n'
+                f'<div class="events-container"><div class="events-container-col"></div>\n'
+                f'<div class="events-container-col">\n{items}</div></div></body></html>')
+
+    def split_page(self, split_id):
+        if not self._valid_split(split_id):
+            return None
+        tour, split = divmod(split_id - 1000, 100)
+        region = PARENT_REGIONS[split % len(PARENT_REGIONS)]
+        teams = ''.join(
+            f'<div class="wf-card event-team"><a class="event-team-name" href="/team/{team_id}/team-{team_id}">Team {team_id}</a></div>\n'
+            for team_id in self.split_teams(split_id)
+        )
+        return (f'<html><body><div class="wf-nav">'
+                f'<a class="wf-nav-item" href="/event/{split_id}/synthetic-{tour}-{split}">Overview</a>'
+                f'<a class="wf-nav-item" href="/event/matches/{split_id}/synthetic-{tour}-{split}">Matches</a></div>\n'
+                f'<div class="event-header"><h1 class="wf-title">Synthetic Tour {tour} {region} Split {split}</h1>\n'
+                f'<div class="event-desc-item"><div class="event-desc-item-label">Dates</div><div class="event-desc-item-value">Feb {1 + split} - 25, 2024</div></div>\n'
+                f'<div class="event-desc-item"><div class="event-desc-item-label">Prize pool</div><div class="event-desc-item-value">$250,000 USD</div></div>\n'
+                f'<div class="event-desc-item"><div class="event-desc-item-label">Location</div><div class="event-desc-item-value">{region}</div></div>\n'
+                f'</div>\n<div class="event-teams-container">\n{teams}</div></body></html>')
+
+    def matches_page(self, split_id):
+        if not self._valid_split(split_id):
+            return None
+        links = ''.join(
+            f'<a class="wf-module-item match-item" href="/{split_id * 10000 + m}/synthetic-match-{m}">Match {m}'
+            + ('<div class="ml-status">LIVE</div>' if self.match_status(split_id * 10000 + m) == 'live' else '')
+            + '</a>\n'
+            for m in range(self.matches_per_split)
+        )
+        return f'<html><body><div class="wf-card">\n{links}</div></body></html>'
+
+    def team_page(self, team_id):
+        if not 1 <= team_id <= self.team_pool:
+            return None
+        country = COUNTRIES[team_id % len(COUNTRIES)]
+        return (f'<html><body><div class="wf-avatar"><img src="//owcdn.net/img/team{team_id}.png"></div>\n'
+                f'<div class="team-header"><h1 class="wf-title">Team {team_id}</h1>'
+                f'<div class="team-header-country">{country}</div></div></body></html>')
+
+    def player_page(self, player_id):
+        team_id = player_id // 10
+        if not 1 <= team_id <= self.team_pool:
+            return None
+        country = COUNTRIES[player_id % len(COUNTRIES)]
+        return (f'<html><body><div class="player-header"><img src="//owcdn.net/img/player{player_id}.png">\n'
+                f'<h1 class="wf-title">player{player_id}</h1><h2 class="player-real-name">Player {player_id}</h2>\n'
+                f'<div class="ge-text-light">{country}</div></div></body></html>')
+
+    def _stat_cell(self, both, t, ct, suffix='', extra_class=''):
+        return (f'<td class="mod-stat{extra_class}"><span class="stats-sq">'
+                f'<span class="side mod-side mod-both">{both}{suffix}</span>\n'
+                f'<span class="side mod-side mod-t">{t}{suffix}</span>\n'
+                f'<span class="side mod-side mod-ct">{ct}{suffix}</span></span></td>\n')
+
+    def _player_row(self, rng, player_id, agent):
+        t_k, ct_k = rng.randint(3, 16), rng.randint(3, 16)
+        t_d, ct_d = rng.randint(3, 14), rng.randint(3, 14)
+        t_a, ct_a = rng.randint(0, 8), rng.randint(0, 8)
+        t_acs, ct_acs = rng.randint(100, 350), rng.randint(100, 350)
+        t_kast, ct_kast = rng.randint(50, 90), rng.randint(50, 90)
+        t_adr, ct_adr = rng.randint(80, 220), rng.randint(80, 220)
+        t_hs, ct_hs = rng.randint(10, 45), rng.randint(10, 45)
+        t_fk, ct_fk = rng.randint(0, 5), rng.randint(0, 5)
+        t_fd, ct_fd = rng.randint(0, 5), rng.randint(0, 5)
+        cells = [
+            self._stat_cell(round(rng.uniform(0.6, 1.6), 2), round(rng.uniform(0.6, 1.6), 2), round(rng.uniform(0.6, 1.6), 2)),
+            self._stat_cell((t_acs + ct_acs) // 2, t_acs, ct_acs),
+            self._stat_cell(t_k + ct_k, t_k, ct_k, extra_class=' mod-vlr-kills'),
+            self._stat_cell(t_d + ct_d, t_d, ct_d, extra_class=' mod-vlr-deaths'),
+            self._stat_cell(t_a + ct_a, t_a, ct_a, extra_class=' mod-vlr-assists'),
+            self._stat_cell(t_k + ct_k - t_d - ct_d, t_k - t_d, ct_k - ct_d, extra_class=' mod-kd-diff'),
+            self._stat_cell((t_kast + ct_kast) // 2, t_kast, ct_kast, suffix='%'),
+            self._stat_cell((t_adr + ct_adr) // 2, t_adr, ct_adr),
+            self._stat_cell((t_hs + ct_hs) // 2, t_hs, ct_hs, suffix='%'),
+            self._stat_cell(t_fk + ct_fk, t_fk, ct_fk, extra_class=' mod-fb'),
+            self._stat_cell(t_fd + ct_fd, t_fd, ct_fd, extra_class=' mod-fd'),
+            self._stat_cell(t_fk + ct_fk - t_fd - ct_fd, t_fk - t_fd, ct_fk - ct_fd, extra_class=' mod-fk-diff'),
+        ]
+        return (f'<tr><td class="mod-player"><div><a href="/player/{player_id}/player{player_id}">'
+                f'<div class="text-of">player{player_id}</div><div class="ge-text-light">T{player_id // 10}</div></a></div></td>\n'
+                f'<td class="mod-agents"><div><span class="stats-sq mod-agent small">'
+                f'<img src="/img/vlr/game/agents/{agent.lower()}.png" alt="{agent.lower()}" title="{agent}"></span></div></td>\n'
+                + ''.join(cells) + '</tr>\n')
+
+    def _game_block(self, rng, game_id, map_name, team_ids, scores):
+        header = (f'<div class="vm-stats-game-header">'
+                  f'<div class="team"><div class="score {"mod-win" if scores[0] > scores[1] else ""}">{scores[0]}</div>'
+                  f'<div><div class="team-name">Team {team_ids[0]}</div></div></div>\n'
+                  f'<div class="map"><div><span style="position: relative;">{map_name}</span></div></div>\n'
+                  f'<div class="team mod-right"><div><div class="team-name">Team {team_ids[1]}</div></div>'
+                  f'<div class="score {"mod-win" if scores[1] > scores[0] else ""}">{scores[1]}</div></div></div>\n')
+        tables = ''
+        for team_id in team_ids:
+            agents = rng.sample(AGENTS, 5)
+            rows = ''.join(self._player_row(rng, team_id * 10 + i, agent) for i, agent in enumerate(agents, 1))
+            tables += (f'<table class="wf-table-inset mod-overview"><thead><tr><th></th></tr></thead>\n'
+                       f'<tbody>\n{rows}</tbody></table>\n')
+        return f'<div class="vm-stats-game " data-game-id="{game_id}">\n{header}{tables}</div>\n'
+
+    def match_status(self, match_id):
+        # Every synthetic match is finished; override to serve live ones
+        return 'final'
+
+    def match_page(self, match_id):
+        split_id = match_id // 10000
+        if not self._valid_split(split_id) or match_id % 10000 >= self.matches_per_split:
+            return None
+        rng = self._rng("match", match_id)
+        team_ids = rng.sample(self.split_teams(split_id), 2)
+        played = datetime(2024, 2, 1, tzinfo=timezone.utc) + timedelta(hours=match_id % 10000)
+
+        games = ''
+        wins = [0, 0]
+        for g in range(rng.randint(*self.games_per_match)):
+            winner = rng.randint(0, 1)
+            scores = [13, rng.randint(3, 11)] if winner == 0 else [rng.randint(3, 11), 13]
+            wins[winner] += 1
+            games += self._game_block(rng, match_id * 10 + g, rng.choice(MAPS), team_ids, scores)
+
+        return (f'<html><body><div class="match-header">\n'
+                f'<div class="match-header-super"><a class="match-header-event" href="/event/{split_id}/synthetic">'
+                f'<div><div style="font-weight: 700;">Synthetic Split {split_id}</div></div></a>\n'
+                f'<div class="match-header-date"><div class="moment-tz-convert" data-utc-ts="{played:%Y-%m-%d %H:%M:%S}">{played:%A, %B %d}</div>'
+                f'<div style="font-style: italic;">Patch 8.11</div></div></div>\n'
+                f'<div class="match-header-vs">'
+                f'<a class="match-header-link" href="/team/{team_ids[0]}/team-{team_ids[0]}"><div class="match-header-link-name mod-1">'
+                f'<div class="wf-title-med">Team {team_ids[0]}</div></div></a>\n'
+                f'<div class="match-header-vs-score"><div class="match-header-vs-note">{self.match_status(match_id)}</div>'
+                f'<div class="js-spoiler"><span class="match-header-vs-score-winner">{wins[0]}</span>'
+                f'<span class="match-header-vs-score-colon">:</span><span class="match-header-vs-score-loser">{wins[1]}</span></div></div>\n'
+                f'<a class="match-header-link" href="/team/{team_ids[1]}/team-{team_ids[1]}"><div class="match-header-link-name mod-2">'
+                f'<div class="wf-title-med">Team {team_ids[1]}</div></div></a></div></div>\n'
+                f'<div class="vm-stats"><div class="vm-stats-game " data-game-id="all"></div>\n{games}</div>'
+                f'</body></html>')
+
+# ----------------------- Recorded Pages -----------------------
+
+def recorded_path(pages_dir, path):
+    # /event/2004/champions -> <pages_dir>/event/2004/champions/index.html
+    return os.path.join(pages_dir, *[part for part in path.strip('/').split('/') if part not in ('', '.', '..')], 'index.html')
+
+def record_pages(urls, pages_dir, delay=1.0):
+    # Fetch real pages once so later load tests can replay them offline
+    import requests
+    for url in urls:
+        response = requests.get(url)
+        path = recorded_path(pages_dir, urlparse(url).path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"Recorded {url} ({len(response.content)} bytes).")
+        time.sleep(delay)
+
+def dump_site(site, pages_dir):
+    # Write every synthetic page to disk, e.g. to serve them from another machine
+    paths = [f"/synthetic-tour-{tour}" for tour in range(site.tours)]
+    for tour in range(site.tours):
+        for split in range(site.splits_per_tour):
+            split_id = site.split_id(tour, split)
+            paths += [f"/event/{split_id}/s", f"/event/matches/{split_id}/s"]
+            paths += [f"/{split_id * 10000 + m}/m" for m in range(site.matches_per_split)]
+    paths += [f"/team/{team_id}/t" for team_id in range(1, site.team_pool + 1)]
+    paths += [f"/player/{team_id * 10 + i}/p" for team_id in range(1, site.team_pool + 1) for i in range(1, 6)]
+    for path in paths:
+        target = recorded_path(pages_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w') as f:
+            f.write(site.render(path))
+    print(f"Wrote {len(paths)} pages to {pages_dir}.")
+
+# ----------------------- Server -----------------------
+
+class ReplayConfig:
+    def __init__(self, pages_dir=None, site=None, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, throttle_rate=0.0, max_rps=None, retry_after=1):
+        self.pages_dir = pages_dir
+        self.site = site
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+
+class ReplayStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.statuses = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "bytes": self.bytes, "statuses": dict(self.statuses),
+                    "max_in_flight": self.max_in_flight}
+
+def make_handler(config, stats):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+            data = body.encode('utf-8') if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            with stats.lock:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+                stats.bytes += len(data)
+
+        def _over_rate(self):
+            if not config.max_rps:
+                return False
+            with stats.lock:
+                now = time.monotonic()
+                if now - stats.window_start >= 1.0:
+                    stats.window_start, stats.window_count = now, 0
+                stats.window_count += 1
+                return stats.window_count > config.max_rps
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/__stats':
+                self._send(200, json.dumps(stats.snapshot()), 'application/json')
+                return
+
+            with stats.lock:
+                stats.requests += 1
+                stats.in_flight += 1
+                stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            try:
+                delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+                if delay > 0:
+                    time.sleep(delay / 1000)
+
+                if self._over_rate() or random.random() < config.throttle_rate:
+                    self._send(429, 'Too Many Requests', headers={'Retry-After': str(config.retry_after)})
+                    return
+                if random.random() < config.error_rate:
+                    self._send(500, 'Internal Server Error')
+                    return
+
+                body = None
+                if config.pages_dir:
+                    recorded = recorded_path(config.pages_dir, path)
+                    if os.path.exists(recorded):
+                        with open(recorded, 'rb') as f:
+                            body = f.read()
+                if body is None and config.site is not None:
+                    body = config.site.render(path)
+                if body is None:
+                    self._send(404, 'Not Found')
+                    return
+                data = body.encode('utf-8') if isinstance(body, str) else body
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    # Conditional GET for an unchanged page: headers only
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    with stats.lock:
+                        stats.statuses[304] = stats.statuses.get(304, 0) + 1
+                else:
+                    self._send(200, data, headers={'ETag': etag})
+            finally:
+                with stats.lock:
+                    stats.in_flight -= 1
+
+    return ReplayHandler
+
+def start_server(config, host='127.0.0.1', port=0):
+    # Serve in a background thread; returns (server, base_url, stats)
+    stats = ReplayStats()
+    server = ThreadingHTTPServer((host, port), make_handler(config, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}", stats
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic vlr.gg pages for load tests.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', default=None, help="Directory of recorded pages (path/index.html)")
+    parser.add_argument('--tours', type=int, default=3)
+    parser.add_argument('--splits', type=int, default=4, help="Splits per tour")
+    parser.add_argument('--matches', type=int, default=50, help="Matches per split")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--max-rps', type=float, default=None, help="Answer 429 above this many requests per second")
+    parser.add_argument('--dump', default=None, help="Write the synthetic site to this directory and exit")
+    parser.add_argument('--record', nargs='*', default=None, help="Fetch these URLs into --pages and exit")
+    args = parser.parse_args()
+
+    site = SyntheticSite(tours=args.tours, splits_per_tour=args.splits, matches_per_split=args.matches, seed=args.seed)
+    if args.record is not None:
+        record_pages(args.record, args.pages or 'recorded_pages')
+    elif args.dump:
+        dump_site(site, args.dump)
+    else:
+        config = ReplayConfig(pages_dir=args.pages, site=site, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              error_rate=args.error_rate, throttle_rate=args.throttle_rate, max_rps=args.max_rps)
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(config, ReplayStats()))
+        print(f"Serving {site.total_matches} synthetic matches on http://127.0.0.1:{args.port} "
+              f"(set VLR_BASE_URL to point the scrapers here).")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
@@ -0,0 +1,192 @@
+# roster_optimizer.py
+
+import argparse
+import heapq
+import time
+import numpy as np
+from sqlalchemy import select, or_
+
+from models import session, Player, Region, Tour, Tour_Split, Match, Game, GamePlayer
+from similarity import load_profiles, FEATURES, ROLES
+
+# ----------------------- Scoring -----------------------
+
+# Weights over per-game z-scores; deaths and first deaths count against a player
+SCORE_WEIGHTS = {
+    'both_acs': 1.0,
+    'both_kast': 0.6,
+    'both_adr': 0.6,
+    'both_first_kills': 0.4,
+    'both_first_deaths': -0.4,
+    'both_deaths': -0.5,
+    'both_kills': 0.5,
+}
+
+ROSTER_SLOTS = ROLES + ['Flex']
+
+class PlayerPool:
+    # Flat arrays describing every candidate, ranked by score (index 0 is the best player)
+
+    def __init__(self, ids, scores, roles, regions, game_changers):
+        order = np.argsort(-np.asarray(scores, dtype=np.float64), kind='stable')
+        self.ids = np.asarray(ids)[order]
+        self.scores = np.asarray(scores, dtype=np.float64)[order]
+        self.roles = np.asarray(roles)[order]
+        self.regions = np.asarray(regions)[order]
+        self.game_changers = np.asarray(game_changers, dtype=bool)[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+def game_changers_player_ids():
+    # Players who appeared in any Game Changers tour
+    query = (
+        select(GamePlayer.player_id).distinct()
+        .join(Game, Game.game_id == GamePlayer.game_id)
+        .join(Match, Match.match_id == Game.match_id)
+        .join(Tour_Split, Tour_Split.external_split_id == Match.tour_split_id)
+        .join(Tour, Tour.tour_id == Tour_Split.tour_id)
+        .where(or_(Tour.name.ilike('%game changers%'), Tour.link.ilike('%/gc-%')))
+    )
+    return {row[0] for row in session.execute(query)}
+
+def load_player_pool(min_games=10, tour_split_ids=None):
+    ids, games, raw = load_profiles(tour_split_ids=tour_split_ids)
+    eligible = games >= min_games
+    ids, raw = ids[eligible], raw[eligible]
+
+    columns = [FEATURES.index(name) for name in SCORE_WEIGHTS]
+    values = raw[:, columns]
+    std = values.std(axis=0) if len(values) else np.ones(len(columns))
+    std[std == 0] = 1
+    z = (values - values.mean(axis=0)) / std if len(values) else values
+    scores = z @ np.array(list(SCORE_WEIGHTS.values()))
+
+    role_shares = raw[:, len(FEATURES) - len(ROLES):]
+    roles = [ROLES[i] for i in np.argmax(role_shares, axis=1)] if len(raw) else []
+
+    region_rows = session.execute(
+        select(Player.player_id, Region.region_name).outerjoin(Region, Region.region_id == Player.region_id)
+    ).all()
+    region_by_player = dict(region_rows)
+    regions = [region_by_player.get(int(player_id)) or 'Unknown' for player_id in ids]
+
+    gc = game_changers_player_ids()
+    return PlayerPool(ids, scores, roles, regions, [int(player_id) in gc for player_id in ids])
+
+# ----------------------- Search -----------------------
+
+def optimize_rosters(pool, k=10, max_per_region=None, min_game_changers=0, candidates_per_role=40, exclude=()):
+    # Depth-first branch and bound over the slots Duelist, Initiator, Controller, Sentinel, Flex.
+    # Each role bucket is pruned to its top candidates plus its best Game Changers players, and a
+    # branch is cut once its optimistic bound cannot beat the k-th best roster found so far.
+    # The bound is exact, but the bucket pruning is not: when max_per_region rules out most of a role's
+    # top candidates, the best rosters can need players ranked below candidates_per_role and are then
+    # missed. candidates_per_role=len(pool) searches every player and always returns the optimum.
+    excluded = set(exclude)
+    buckets = []
+    for slot in ROSTER_SLOTS:
+        members = [i for i in range(len(pool)) if (slot == 'Flex' or pool.roles[i] == slot) and int(pool.ids[i]) not in excluded]
+        top = members[:candidates_per_role]
+        if min_game_changers:
+            top += [i for i in members if pool.game_changers[i] and i not in top][:candidates_per_role]
+            top.sort()
+        buckets.append(top)
+
+    if any(not bucket for bucket in buckets):
+        return [], {"nodes": 0, "pruned": 0}
+
+    # best_remaining[s] = optimistic score of filling slots s.. with each bucket's best player
+    best = [pool.scores[bucket[0]] for bucket in buckets]
+    best_remaining = np.concatenate((np.cumsum(best[::-1])[::-1], [0.0]))
+
+    results = []
+    chosen = []
+    region_counts = {}
+    stats = {"nodes": 0, "pruned": 0}
+
+    def search(slot, total, game_changers):
+        stats["nodes"] += 1
+        if game_changers + len(buckets) - slot < min_game_changers:
+            return
+        if slot == len(buckets):
+            entry = (total, tuple(sorted(int(pool.ids[i]) for i in chosen)))
+            if len(results) < k:
+                heapq.heappush(results, entry)
+            elif entry > results[0]:
+                heapq.heapreplace(results, entry)
+            return
+
+        for i in buckets[slot]:
+            # Buckets are sorted by score, so once the bound fails every later candidate fails too
+            if len(results) == k and total + pool.scores[i] + best_remaining[slot + 1] <= results[0][0]:
+                stats["pruned"] += 1
+                break
+            if i in chosen:
+                continue
+            if ROSTER_SLOTS[slot] == 'Flex':
+                # The flex player must rank below the player in their own role slot,
+                # otherwise the same five would be found twice with the two swapped
+                if i < chosen[ROLES.index(pool.roles[i])]:
+                    continue
+            region = pool.regions[i]
+            if max_per_region is not None and region_counts.get(region, 0) >= max_per_region:
+                continue
+
+            chosen.append(i)
+            region_counts[region] = region_counts.get(region, 0) + 1
+            search(slot + 1, total + pool.scores[i], game_changers + int(pool.game_changers[i]))
+            region_counts[region] -= 1
+            chosen.pop()
+
+    search(0, 0.0, 0)
+    rosters = sorted(results, reverse=True)
+    return [{"score": total, "player_ids": list(player_ids)} for total, player_ids in rosters], stats
+
+# ----------------------- Benchmark -----------------------
+
+def synthetic_pool(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return PlayerPool(
+        ids=np.arange(1, size + 1),
+        scores=rng.normal(size=size),
+        roles=rng.choice(ROLES, size=size),
+        regions=rng.choice(['Americas', 'EMEA', 'Pacific', 'China'], size=size),
+        game_changers=rng.random(size) < 0.15,
+    )
+
+def benchmark(pool, repeats=5, **constraints):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rosters, stats = optimize_rosters(pool, **constraints)
+        timings.append(time.perf_counter() - start)
+    print(f"Pool of {len(pool)} players, constraints {constraints}:")
+    print(f"  best {min(timings) * 1000:.1f}ms, median {np.median(timings) * 1000:.1f}ms, "
+          f"{stats['nodes']} nodes visited, {stats['pruned']} prunes")
+    return rosters
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search for the strongest five-player rosters.")
+    parser.add_argument('-k', type=int, default=10, help="Number of rosters to return")
+    parser.add_argument('--max-per-region', type=int, default=None)
+    parser.add_argument('--min-game-changers', type=int, default=0)
+    parser.add_argument('--min-games', type=int, default=10)
+    parser.add_argument('--bench', action='store_true', help="Time the search over the full player pool")
+    parser.add_argument('--synthetic', type=int, default=None, help="Benchmark against N random players instead of the database")
+    args = parser.parse_args()
+
+    constraints = {"k": args.k, "max_per_region": args.max_per_region, "min_game_changers": args.min_game_changers}
+    pool = synthetic_pool(args.synthetic) if args.synthetic else load_player_pool(min_games=args.min_games)
+
+    if args.bench or args.synthetic:
+        benchmark(pool, **constraints)
+        benchmark(pool, k=args.k, max_per_region=2, min_game_changers=1)
+    else:
+        names = dict(session.query(Player.player_id, Player.name).all())
+        rosters, _ = optimize_rosters(pool, **constraints)
+        for rank, roster in enumerate(rosters, 1):
+            players = ', '.join(names.get(player_id, str(player_id)) for player_id in roster["player_ids"])
+            print(f"{rank}. {roster['score']:.2f}  {players}")
@@ -0,0 +1,223 @@
+# s3_archive.py
+
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import boto3
+from boto3.s3.transfer import TransferConfig
+from dotenv import load_dotenv
+
+# ----------------------- Configuration -----------------------
+
+# Load environment variables from a .env file
+load_dotenv()
+
+# Archiving is on when a bucket is set; S3_ENDPOINT_URL points it at MinIO or another S3-compatible store
+ARCHIVE_BUCKET = os.getenv('ARCHIVE_BUCKET')
+ARCHIVE_PREFIX = os.getenv('ARCHIVE_PREFIX', 'vlr/')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+
+# Pages are gathered into batch objects of about this size before upload
+BATCH_BYTES = int(float(os.getenv('ARCHIVE_BATCH_MB', '64')) * 1024 * 1024)
+# Multipart part size and parts uploaded in parallel per object
+PART_BYTES = int(float(os.getenv('ARCHIVE_PART_MB', '8')) * 1024 * 1024)
+CONCURRENCY = int(os.getenv('ARCHIVE_CONCURRENCY', '8'))
+# Batches uploading at once; adding more pages waits beyond this, which bounds memory
+UPLOAD_WORKERS = 2
+
+# ----------------------- Archive -----------------------
+
+class S3PageArchive:
+    # Batch objects are concatenated gzip members, one per page, so a single page is one ranged GET.
+    # Each batch gets a JSON-lines manifest (url, key, offset, length, fetched_at) written after it.
+
+    def __init__(self, client, bucket, prefix=ARCHIVE_PREFIX, batch_bytes=BATCH_BYTES, part_bytes=PART_BYTES,
+                 concurrency=CONCURRENCY):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.batch_bytes = batch_bytes
+        self.transfer_config = TransferConfig(multipart_threshold=part_bytes, multipart_chunksize=part_bytes,
+                                              max_concurrency=concurrency, use_threads=True)
+        self.executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+        self.pending = []
+        # lock guards the open batch and the counters; submit_lock the uploads in flight, and is held while waiting
+        self.lock = threading.Lock()
+        self.submit_lock = threading.Lock()
+        self.run_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.sequence = 0
+        self.buffer = io.BytesIO()
+        self.entries = []
+        self.pages = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.batches = 0
+        self.upload_seconds = 0.0
+        # Batches whose upload failed: key, pages, urls and error
+        self.failed = []
+
+    @classmethod
+    def from_env(cls, bucket=ARCHIVE_BUCKET, **kwargs):
+        client = boto3.client('s3', endpoint_url=S3_ENDPOINT_URL)
+        return cls(client, bucket, **kwargs)
+
+    def batch_key(self, sequence):
+        return f"{self.prefix}pages/batches/{self.run_id}-{sequence:05d}.gz"
+
+    def manifest_key(self, sequence):
+        return f"{self.prefix}pages/manifests/{self.run_id}-{sequence:05d}.jsonl"
+
+    def add(self, url, body, fetched_at=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        member = gzip.compress(body, compresslevel=6)
+        with self.lock:
+            offset = self.buffer.tell()
+            self.buffer.write(member)
+            self.entries.append({"url": url, "offset": offset, "length": len(member),
+                                 "fetched_at": fetched_at or datetime.now(timezone.utc).isoformat()})
+            self.pages += 1
+            self.raw_bytes += len(body)
+            self.stored_bytes += len(member)
+            # Taken in the same critical section, so a full batch is handed to exactly one thread
+            batch = self._take_batch() if self.buffer.tell() >= self.batch_bytes else None
+        if batch is not None:
+            self._submit(batch)
+
+    def flush(self):
+        with self.lock:
+            batch = self._take_batch()
+        if batch is not None:
+            self._submit(batch)
+
+    def _take_batch(self):
+        # Caller holds self.lock; (buffer, entries, sequence) of the open batch, or None when it is empty
+        if not self.entries:
+            return None
+        batch = (self.buffer, self.entries, self.sequence)
+        self.buffer, self.entries = io.BytesIO(), []
+        self.sequence += 1
+        return batch
+
+    def _submit(self, batch):
+        # Backpressure: at most UPLOAD_WORKERS batches held in memory while uploading
+        with self.submit_lock:
+            while len(self.pending) >= UPLOAD_WORKERS:
+                self.pending.pop(0).result()
+            self.pending.append(self.executor.submit(self._upload_batch, *batch))
+
+    def _upload_batch(self, buffer, entries, sequence):
+        start = time.perf_counter()
+        key = self.batch_key(sequence)
+        size = buffer.tell()
+        buffer.seek(0)
+        try:
+            # Multipart with parallel parts above PART_BYTES, a single PUT below
+            self.client.upload_fileobj(buffer, self.bucket, key, Config=self.transfer_config,
+                                       ExtraArgs={"ContentType": 'application/gzip'})
+            # Written only after the batch is stored, so every manifest line points at a complete object
+            lines = ''.join(json.dumps({**entry, "key": key}) + '\n' for entry in entries)
+            self.client.put_object(Bucket=self.bucket, Key=self.manifest_key(sequence), Body=lines.encode('utf-8'),
+                                   ContentType='application/x-ndjson')
+        except Exception as e:
+            # Logged and recorded instead of raised: the error would otherwise surface in whichever fetch()
+            # happened to wait on this upload. The pages stay in the database and the local archive.
+            print(f"Archiving {len(entries)} pages to s3://{self.bucket}/{key} failed: {e}")
+            with self.lock:
+                self.failed.append({"key": key, "pages": len(entries), "urls": [entry["url"] for entry in entries],
+                                    "error": str(e)})
+            return
+        with self.lock:
+            self.batches += 1
+            self.upload_seconds += time.perf_counter() - start
+        print(f"Archived {len(entries)} pages ({size / 1024 / 1024:.1f} MB) to s3://{self.bucket}/{key}.")
+
+    def close(self):
+        self.flush()
+        with self.submit_lock:
+            for future in self.pending:
+                future.result()
+            self.pending.clear()
+        self.executor.shutdown()
+        if self.failed:
+            print(f"{len(self.failed)} archive batches ({sum(batch['pages'] for batch in self.failed)} pages) "
+                  f"failed to upload.")
+
+    def snapshot(self):
+        with self.lock:
+            return {"pages": self.pages, "raw_bytes": self.raw_bytes, "stored_bytes": self.stored_bytes,
+                    "batches": self.batches, "failed_batches": len(self.failed),
+                    "upload_seconds": round(self.upload_seconds, 3)}
+
+    # ----------------------- Retrieval -----------------------
+
+    def load_manifest(self):
+        # url -> latest entry across every batch manifest
+        manifest = {}
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}pages/manifests/"):
+            for obj in page.get('Contents', []):
+                body = self.client.get_object(Bucket=self.bucket, Key=obj['Key'])['Body'].read()
+                for line in body.decode('utf-8').splitlines():
+                    entry = json.loads(line)
+                    if entry["url"] not in manifest or entry["fetched_at"] >= manifest[entry["url"]]["fetched_at"]:
+                        manifest[entry["url"]] = entry
+        return manifest
+
+    def read_entry(self, entry):
+        end = entry["offset"] + entry["length"] - 1
+        body = self.client.get_object(Bucket=self.bucket, Key=entry["key"], Range=f"bytes={entry['offset']}-{end}")
+        return gzip.decompress(body['Body'].read())
+
+    def get(self, url, manifest=None):
+        entry = (manifest if manifest is not None else self.load_manifest()).get(url)
+        return self.read_entry(entry) if entry else None
+
+    # ----------------------- Exports -----------------------
+
+    def upload_files(self, local_dir, key_prefix='parquet/'):
+        # Every file under local_dir (e.g. the Parquet export), several files at a time, each multipart when large
+        paths = [os.path.join(root, name) for root, _, names in os.walk(local_dir) for name in names]
+
+        def upload(path):
+            key = self.prefix + key_prefix + os.path.relpath(path, local_dir).replace(os.sep, '/')
+            self.client.upload_file(path, self.bucket, key, Config=self.transfer_config)
+            return os.path.getsize(path)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            size = sum(executor.map(upload, paths))
+        print(f"Uploaded {len(paths)} files ({size / 1024 / 1024:.1f} MB) to s3://{self.bucket}/{self.prefix}{key_prefix} "
+              f"in {time.perf_counter() - start:.1f}s.")
+        return len(paths)
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read archived pages or upload exports to the S3 archive.")
+    parser.add_argument('command', choices=['get', 'list', 'upload'])
+    parser.add_argument('target', nargs='?', help="URL for get, directory for upload")
+    parser.add_argument('--bucket', default=ARCHIVE_BUCKET)
+    args = parser.parse_args()
+
+    archive = S3PageArchive.from_env(args.bucket)
+    if args.command == 'get':
+        page = archive.get(args.target)
+        if page is None:
+            print(f"{args.target} is not in the archive.")
+            sys.exit(1)
+        sys.stdout.buffer.write(page)
+    elif args.command == 'list':
+        manifest = archive.load_manifest()
+        for url, entry in sorted(manifest.items()):
+            print(f"{entry['fetched_at']}  {url}  {entry['key']}@{entry['offset']}+{entry['length']}")
+        print(f"{len(manifest)} pages.")
+    else:
+        archive.upload_files(args.target or 'exports/parquet')
@@ -8,25 +8,28 @@ from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
 import os
 import time
-from pymongo import MongoClient
+from mongo_sink import MongoSink
 from datetime import datetime
 import pdb
+import argparse
+import profiling
+from stages import stages
 
 # ----------------------- Configuration -----------------------
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Base URL of the website
-base_url = 'https://www.vlr.gg'
+# Base URL of the website; point VLR_BASE_URL at replay_server.py for offline runs
+base_url = os.getenv('VLR_BASE_URL', 'https://www.vlr.gg')
 
 # PostgreSQL connection string
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-# # MongoDB connection string
-# MONGODB_URI = os.getenv('MONGODB_URI')
+# MongoDB connection string; when set, scraped games are also written to MongoDB
+MONGODB_URI = os.getenv('MONGODB_URI')
 
-tour_url = 'https://www.vlr.gg/vct-2024'
+tour_url = base_url + '/vct-2024'
 
 # ----------------------- Relational Database Setup (PostgreSQL) -----------------------
 
@@ -123,10 +126,10 @@ Base.metadata.create_all(engine)
 
 # ----------------------- NoSQL Database Setup (MongoDB) -----------------------
 
-# Create MongoDB client and access database and collections
-mongo_client = MongoClient(MONGODB_URI)
-mongo_db = mongo_client['valorantdb']  # You can name the database as you prefer
-games_collection = mongo_db['games']
+# Buffered sink over the games collection; documents are written in unordered batches
+games_sink = None
+if MONGODB_URI:
+    games_sink = MongoSink.from_uri(MONGODB_URI, 'games', key='game_id')
 
 # ----------------------- Helper Functions -----------------------
 
@@ -169,6 +172,7 @@ def get_region(region_name):
         session.commit()
     return region.region_id
 
+@stages.track('team')
 def get_team(team_link):
     # Extract the team ID from the link
     team_id = int(team_link.split('/')[2])
@@ -195,13 +199,13 @@ def get_team(team_link):
         print(f"Team {team_name} (ID: {team_id}) already exists in PostgreSQL.")
     return team_id
 
+@stages.track('match')
 def scrape_game_data(game_url):
     # Extract match_id from URL
     match_id = int(game_url.split('/')[1])
     
     # Check if the match already exists in MongoDB
-    existing_game = games_collection.find_one({'game_id': f'game_{match_id}'})
-    if existing_game:
+    if games_sink is not None and games_sink.seen(f'game_{match_id}'):
         print(f"Game with game_id game_{match_id} already exists in MongoDB.")
         return
 
@@ -368,13 +372,15 @@ def scrape_game_data(game_url):
         # Since we process only one game_div, break after first iteration
         break
 
-    # Insert game data into MongoDB
-    games_collection.insert_one(game_data)
-    print(f"Inserted game data for match {match_id} into MongoDB.")
+    # Queue game data for the next MongoDB batch
+    if games_sink is not None:
+        games_sink.add(game_data)
+        print(f"Queued game data for match {match_id} for MongoDB.")
 
     # Delay to be respectful to the website's server
     time.sleep(1)
 
+@stages.track('player')
 def scrape_player_page(player_url):
     player_id = extract_player_id_from_url(player_url)
     if not player_id:
@@ -450,6 +456,11 @@ def scrape_data():
 # ----------------------- Main Execution -----------------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the players of one event into the database.")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    profiler = profiling.from_args(args, 'scrape')
+
     try:
         scrape_data()
     except Exception as e:
@@ -457,8 +468,11 @@ if __name__ == "__main__":
     finally:
         # Close the session when done
         session.close()
-        # Close MongoDB connection
-        mongo_client.close()
+        # Write any buffered documents and close the MongoDB connection
+        if games_sink is not None:
+            games_sink.close()
+        if profiler is not None:
+            profiler.stop()
 
 
 
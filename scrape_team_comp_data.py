@@ -1,6 +1,5 @@
 # scrape.py
 
-import requests
 from bs4 import BeautifulSoup
 from sqlalchemy import create_engine,PrimaryKeyConstraint, Column, String, Integer, Float, Date, Boolean, ForeignKey,Numeric
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
@@ -20,162 +19,102 @@ import re
 # Load environment variables from a .env file
 load_dotenv()
 
-# Base URL of the website
-base_url = 'https://www.vlr.gg'
-
 # PostgreSQL connection string
 DATABASE_URL = os.getenv('DATABASE_URL')
 
 # MongoDB connection string
 # MONGODB_URI = os.getenv('MONGODB_URI')
 
-all_tours = ['https://www.vlr.gg/vct-2024','https://www.vlr.gg/gc-2024',
-'https://www.vlr.gg/vcl-2024',
-]
+# Same site, tours and fetch() as tour_split_scrape.py: the host rate limit, page archives and the
+# 429/5xx errors apply here too
+from tour_split_scrape import base_url, all_tours, fetch, close_archives
 
 # ----------------------- Relational Database Setup (PostgreSQL) -----------------------
 
-# Create engine and session for PostgreSQL
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
-
-# Define models according to your schema
-
-class Parent_Region(Base):
-    __tablename__ = 'parent_regions'
-    parent_region_id = Column(Integer, primary_key=True)
-    parent_region_name = Column(String(100))
-
-class Region(Base):
-    __tablename__ = 'regions'
-    region_id = Column(Integer, primary_key=True)
-    region_name = Column(String(100))
-
-class Team(Base):
-    __tablename__ = 'teams'
-    team_id = Column(Integer, primary_key=True)
-    team_name = Column(String(100))
-    region_id = Column(Integer, ForeignKey('regions.region_id'))
-    team_img_url =  Column(String(100))
-    active = Column(Boolean, default=True)
-
-    region = relationship('Region')
-    
-class Player(Base):
-    __tablename__ = 'players'
-    player_id = Column(Integer, primary_key=True)
-    name = Column(String(100))
-    real_name = Column(String(100))
-    pp_url =  Column(String(300))
-    region_id = Column(Integer, ForeignKey('regions.region_id'))
-    
-class Map(Base):
-    __tablename__ = 'maps'
-    map_id = Column(Integer, primary_key=True)
-    map_name = Column(String(100))
-    active = Column(Boolean, default=True)
-    
-class Agent(Base):
-    __tablename__ = 'agents'
-    agent_id = Column(Integer, primary_key=True)
-    agent_name = Column(String(50))
-    
-class Tour(Base):
-    __tablename__ = 'tours'
-    tour_id = Column(Integer, primary_key=True)
-    name = Column(String(1000))
-    link = Column(String(1000))
-    
-class Tour_Split(Base):
-    __tablename__ = 'tour_splits'
-    external_split_id = Column(Integer, primary_key=True)
-    tour_id = Column(Integer, ForeignKey('tours.tour_id'))
-    parent_region_id = Column(Integer, ForeignKey('parent_regions.parent_region_id'))
-    name = Column(String(1000))
-    link = Column(String(1000))
-    start_date = Column(Date)  # Correct Date type
-    end_date = Column(Date)    # Correct Date type
-    prize_pool = Column(Numeric(precision=10, scale=2))  # Correct Numeric type for money
-    location = Column(String(500))
-
-class Match(Base):
-    __tablename__ = 'matches'
-    match_id = Column(Integer, primary_key=True)
-    tour_split_id = Column(Integer, ForeignKey('tour_splits.external_split_id'))
-    team1_id = Column(Integer, ForeignKey('teams.team_id'))
-    team2_id = Column(Integer, ForeignKey('teams.team_id'))
-    date_played = Column(Date)
-    
-class Game(Base):
-    __tablename__ = 'games'
-    game_id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.match_id'))
-    map_id = Column(Integer, ForeignKey('maps.map_id'))
-
-class PlayerRole(Base):
-    __tablename__ = 'player_roles'
-    role_id = Column(Integer, primary_key=True)
-    role_name = Column(String(100))
-    
-class GamePlayer(Base):
-    __tablename__ = 'game_players'
-    game_id = Column(Integer, ForeignKey('games.game_id'))
-    player_id = Column(Integer, ForeignKey('players.player_id'))
-    team_id = Column(Integer, ForeignKey('teams.team_id'))
-    agent = Column(Integer, ForeignKey('agents.agent_id'))
-    player_role = Column(Integer, ForeignKey('player_roles.role_id'))
-    ct_and_t_data = Column(Boolean)
-    
-    # CT-side statistics
-    ct_kills = Column(Integer)
-    ct_assists = Column(Integer)
-    ct_deaths = Column(Integer)
-    ct_acs = Column(Float)
-    ct_kast = Column(Float)
-    ct_adr = Column(Float)
-    ct_hs = Column(Float)
-    ct_first_kills = Column(Integer)
-    ct_first_deaths = Column(Integer)
-
-    # T-side statistics
-    t_kills = Column(Integer)
-    t_assists = Column(Integer)
-    t_deaths = Column(Integer)
-    t_acs = Column(Float)
-    t_kast = Column(Float)
-    t_adr = Column(Float)
-    t_hs = Column(Float)
-    t_first_kills = Column(Integer)
-    t_first_deaths = Column(Integer)
-    
-    # both statistics
-    both_kills = Column(Integer)
-    both_assists = Column(Integer)
-    both_deaths = Column(Integer)
-    both_acs = Column(Float)
-    both_kast = Column(Float)
-    both_adr = Column(Float)
-    both_hs = Column(Float)
-    both_first_kills = Column(Integer)
-    both_first_deaths = Column(Integer)
-    
-    __table_args__ = (
-        PrimaryKeyConstraint('game_id', 'player_id'),
-    )
+from models import engine, session, Base, Agent, Map
+from team_comps import TeamGameComp, record_team_comp, parse_game_scores
 
 # Create tables in the database
 Base.metadata.create_all(engine)
 
-def scrape_tour_data(tour_url):
-    response = requests.get(tour_url)
+# ----------------------- Helper Functions -----------------------
+
+def load_lookups():
+    # Name -> id for agents and maps, as seeded by tour_split_scrape.py
+    agent_ids = {name: agent_id for agent_id, name in session.query(Agent.agent_id, Agent.agent_name).order_by(Agent.agent_id.desc())}
+    map_ids = {name: map_id for map_id, name in session.query(Map.map_id, Map.map_name).order_by(Map.map_id.desc())}
+    return agent_ids, map_ids
+
+# ----------------------- Scraping Functions -----------------------
+
+def scrape_match_comps(match_link, tour_split_id, agent_ids, map_ids):
+    match_id = int(match_link.split('/')[1])
+    response = fetch(base_url + match_link)
     soup = BeautifulSoup(response.content, 'html.parser')
 
+    match_header_vs = soup.find('div', class_='match-header-vs')
+    team1_div = match_header_vs.find('div', class_='match-header-link-name mod-1')
+    team2_div = match_header_vs.find('div', class_='match-header-link-name mod-2')
+    team_ids = [int(team1_div.find_parent('a')['href'].split('/')[2]),
+                int(team2_div.find_parent('a')['href'].split('/')[2])]
+
+    for game_div in soup.find_all('div', class_='vm-stats-game'):
+        game_id = game_div.get('data-game-id')
+        if game_id == 'all':
+            continue
+        game_id = int(game_id)
+        if session.get(TeamGameComp, (game_id, team_ids[0])) and session.get(TeamGameComp, (game_id, team_ids[1])):
+            print(f"Compositions for game {game_id} already recorded.")
+            continue
+
+        map_name_div = game_div.find('div', class_='map')
+        map_name_span = map_name_div.find('span') if map_name_div else None
+        map_name = ''.join(map_name_span.text.split()).replace("PICK", "") if map_name_span else "Unknown"
+        map_id = map_ids.get(map_name, map_ids.get("Unknown"))
+        scores = parse_game_scores(game_div)
+
+        for idx, table in enumerate(game_div.find_all('table', class_='wf-table-inset mod-overview')[:2]):
+            agents = []
+            tbody = table.find('tbody')
+            for row in tbody.find_all('tr') if tbody else []:
+                agents_td = row.find('td', class_='mod-agents')
+                img = agents_td.find('img') if agents_td else None
+                agents.append(agent_ids.get(img['title']) if img else None)
+            record_team_comp(game_id, team_ids[idx], match_id, map_id, tour_split_id, agents,
+                             rounds_won=scores[idx], rounds_lost=scores[1 - idx])
+        # Both teams of a game in one transaction
+        session.commit()
+        print(f"Recorded compositions for game {game_id} of match {match_id}.")
+
+def scrape_split_comps(split_url, agent_ids, map_ids):
+    response = fetch(split_url)
+    soup = BeautifulSoup(response.content, 'html.parser')
+    nav_items = soup.find('div', class_='wf-nav').find_all('a', class_='wf-nav-item')
+
+    path_parts = urlparse(split_url).path.strip('/').split('/')
+    tour_split_id = int(path_parts[1]) if len(path_parts) > 1 else None
+
+    matches_response = fetch(base_url + nav_items[1]['href'])
+    matches_soup = BeautifulSoup(matches_response.content, 'html.parser')
+    for match in matches_soup.find_all('a', class_='wf-module-item'):
+        try:
+            scrape_match_comps(match['href'], tour_split_id, agent_ids, map_ids)
+        except Exception as e:
+            session.rollback()
+            print(f"Error scraping compositions for {match['href']}: {e}")
+
+def scrape_tour_data(tour_url, agent_ids, map_ids):
+    response = fetch(tour_url)
+    soup = BeautifulSoup(response.content, 'html.parser')
+
+    event_divs = soup.find_all('div', class_='events-container-col')
+    events = event_divs[1].find_all('a', class_='wf-card mod-flex event-item')
+
     for row in events:
         try:
             print("HREF",row['href'])
             split_link = base_url + row['href']
+            scrape_split_comps(split_link, agent_ids, map_ids)
         except Exception as e:
             print(e)
 
@@ -183,12 +122,12 @@ def scrape_tour_data(tour_url):
 
 if __name__ == "__main__":
     try:
+        agent_ids, map_ids = load_lookups()
         for tour_url in all_tours:
-            scrape_tour_data(tour_url)
+            scrape_tour_data(tour_url, agent_ids, map_ids)
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
         # Close the session when done
         session.close()
-        # Close MongoDB connection
-        # mongo_client.close()
+        close_archives()
@@ -0,0 +1,192 @@
+# similarity.py
+
+import os
+import sys
+import time
+import numpy as np
+from sqlalchemy import event, select, func
+
+from models import session as default_session, Agent, Player, GamePlayer
+from aggregates import PlayerSplitStats
+
+# ----------------------- Configuration -----------------------
+
+# SIMILARITY_LIVE=1: tour_split_scrape.py keeps live_index in memory and refreshes it as games commit
+SIMILARITY_LIVE = os.getenv('SIMILARITY_LIVE') == '1'
+live_index = None
+
+# ----------------------- Feature Layout -----------------------
+
+ROLES = ['Duelist', 'Initiator', 'Controller', 'Sentinel']
+
+# Per-game averages over all games
+BOTH_FEATURES = ['both_acs', 'both_kills', 'both_deaths', 'both_assists', 'both_kast',
+                 'both_adr', 'both_hs', 'both_first_kills', 'both_first_deaths']
+# Per-game averages over games that reported side data only
+SIDE_FEATURES = ['ct_acs', 't_acs', 'ct_kills', 't_kills', 'ct_first_kills', 't_first_kills']
+
+FEATURES = BOTH_FEATURES + SIDE_FEATURES + [f"role_{role.lower()}" for role in ROLES]
+
+# ----------------------- Feature Extraction -----------------------
+
+def load_profiles(session=None, player_ids=None, tour_split_ids=None):
+    # Raw (unnormalized) feature vectors from player_split_stats, one row per player
+    session = session or default_session
+    table = PlayerSplitStats.__table__
+    query = select(
+        table.c.player_id, Agent.role,
+        func.sum(table.c.games), func.sum(table.c.side_games),
+        *[func.sum(table.c[col]) for col in BOTH_FEATURES + SIDE_FEATURES]
+    ).outerjoin(Agent, Agent.agent_id == table.c.agent_id).group_by(table.c.player_id, Agent.role)
+    if player_ids is not None:
+        query = query.where(table.c.player_id.in_(list(player_ids)))
+    if tour_split_ids is not None:
+        query = query.where(table.c.tour_split_id.in_(list(tour_split_ids)))
+    rows = session.execute(query).all()
+
+    ids = np.array(sorted({row[0] for row in rows}), dtype=np.int64)
+    n_both, n_side = len(BOTH_FEATURES), len(SIDE_FEATURES)
+    games = np.zeros(len(ids))
+    side_games = np.zeros(len(ids))
+    both_sums = np.zeros((len(ids), n_both))
+    side_sums = np.zeros((len(ids), n_side))
+    role_games = np.zeros((len(ids), len(ROLES)))
+
+    for row in rows:
+        i = np.searchsorted(ids, row[0])
+        games[i] += row[2] or 0
+        side_games[i] += row[3] or 0
+        both_sums[i] += [v or 0 for v in row[4:4 + n_both]]
+        side_sums[i] += [v or 0 for v in row[4 + n_both:]]
+        if row[1] in ROLES:
+            role_games[i, ROLES.index(row[1])] += row[2] or 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        both = np.nan_to_num(both_sums / games[:, None])
+        side = np.nan_to_num(side_sums / side_games[:, None])
+        roles = np.nan_to_num(role_games / games[:, None])
+    return ids, games, np.hstack([both, side, roles])
+
+# ----------------------- Nearest-Neighbour Index -----------------------
+
+class SimilarityIndex:
+    # Exact cosine similarity over z-scored profiles; a query is one matrix-vector product
+
+    def __init__(self, min_games=5, weights=None):
+        self.min_games = min_games
+        self.weights = np.ones(len(FEATURES)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.ids = np.array([], dtype=np.int64)
+        self.games = np.array([])
+        self.raw = np.zeros((0, len(FEATURES)))
+        self.vectors = np.zeros((0, len(FEATURES)), dtype=np.float32)
+        self.mean = np.zeros(len(FEATURES))
+        self.std = np.ones(len(FEATURES))
+        self.tour_split_ids = None
+
+    def build(self, session=None, tour_split_ids=None):
+        start = time.perf_counter()
+        self.tour_split_ids = tour_split_ids
+        self.ids, self.games, self.raw = load_profiles(session, tour_split_ids=tour_split_ids)
+        eligible = self.raw[self.games >= self.min_games]
+        if len(eligible):
+            self.mean = eligible.mean(axis=0)
+            self.std = eligible.std(axis=0)
+            self.std[self.std == 0] = 1
+        self.vectors = self._normalize(self.raw)
+        print(f"Built similarity index for {len(self.ids)} players in {(time.perf_counter() - start) * 1000:.1f}ms.")
+        return self
+
+    def _normalize(self, raw):
+        # Normalization stats are frozen at build time so incremental updates stay comparable
+        z = (raw - self.mean) / self.std * self.weights
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (z / norms).astype(np.float32)
+
+    def update_players(self, player_ids, session=None):
+        # Recompute the profiles of players whose aggregates changed, inserting new players in order
+        ids, games, raw = load_profiles(session, player_ids=player_ids, tour_split_ids=self.tour_split_ids)
+        vectors = self._normalize(raw)
+        for player_id, player_games, player_raw, vector in zip(ids, games, raw, vectors):
+            i = np.searchsorted(self.ids, player_id)
+            if i < len(self.ids) and self.ids[i] == player_id:
+                self.games[i], self.raw[i], self.vectors[i] = player_games, player_raw, vector
+            else:
+                self.ids = np.insert(self.ids, i, player_id)
+                self.games = np.insert(self.games, i, player_games)
+                self.raw = np.insert(self.raw, i, player_raw, axis=0)
+                self.vectors = np.insert(self.vectors, i, vector, axis=0)
+
+    def vector(self, player_id):
+        i = np.searchsorted(self.ids, player_id)
+        if i >= len(self.ids) or self.ids[i] != player_id:
+            raise KeyError(f"Player {player_id} is not in the similarity index.")
+        return self.vectors[i]
+
+    def _top_k(self, scores, candidates, k):
+        scores = np.where(candidates, scores, -np.inf)
+        k = min(k, int(np.count_nonzero(candidates)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+    def role_mask(self, role, min_share=0.5):
+        column = FEATURES.index(f"role_{role.lower()}")
+        return self.raw[:, column] >= min_share
+
+    def similar(self, player_id, k=10, role=None, exclude=()):
+        # "Find players like X": top-k by cosine similarity, excluding X itself
+        scores = self.vectors @ self.vector(player_id)
+        candidates = (self.games >= self.min_games) & (self.ids != player_id)
+        if role is not None:
+            candidates &= self.role_mask(role)
+        if exclude:
+            candidates &= ~np.isin(self.ids, list(exclude))
+        return self._top_k(scores, candidates, k)
+
+    def replacements(self, player_id, role=None, k=10, exclude=()):
+        # "Best replacement for role Y": similar players who mainly play that role,
+        # defaulting to the role the player being replaced plays most
+        if role is None:
+            self.vector(player_id)
+            i = np.searchsorted(self.ids, player_id)
+            role_shares = self.raw[i, len(BOTH_FEATURES) + len(SIDE_FEATURES):]
+            role = ROLES[int(np.argmax(role_shares))]
+        return self.similar(player_id, k=k, role=role, exclude=exclude)
+
+def attach_to_ingestion(session, index):
+    # Refresh the profiles of every player touched by a committed transaction, new or re-scraped
+    touched = set()
+
+    @event.listens_for(GamePlayer, 'after_insert')
+    @event.listens_for(GamePlayer, 'after_update')
+    def collect(mapper, connection, target):
+        touched.add(target.player_id)
+
+    @event.listens_for(session, 'after_commit')
+    def refresh(session):
+        if touched:
+            player_ids = list(touched)
+            touched.clear()
+            with session.bind.connect() as conn:
+                index.update_players(player_ids, session=conn)
+
+    @event.listens_for(session, 'after_rollback')
+    def discard(session):
+        touched.clear()
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    index = SimilarityIndex().build()
+    if len(sys.argv) > 1:
+        player_id = int(sys.argv[1])
+        names = dict(default_session.query(Player.player_id, Player.name).all())
+        start = time.perf_counter()
+        results = index.similar(player_id, k=10)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Players most similar to {names.get(player_id, player_id)} ({elapsed:.3f}ms):")
+        for other_id, score in results:
+            print(f"  {names.get(other_id, other_id)} (ID: {other_id}): {score:.3f}")
@@ -0,0 +1,106 @@
+# single_flight.py
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ----------------------- Single Flight -----------------------
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    # Concurrent calls with the same key share one execution and its result (or exception).
+    # Nothing is kept after the call finishes, so a later call fetches fresh data.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            self.requests += 1
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    def wrap(self, fn, key=None):
+        # fn(*args) with calls coalesced on key(*args), or on the first argument
+        key = key or (lambda *args, **kwargs: args[0])
+        return lambda *args, **kwargs: self.do(key(*args, **kwargs), fn, *args, **kwargs)
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "executions": self.executions, "coalesced": self.coalesced,
+                    "errors": self.errors, "max_waiters": self.max_waiters, "in_flight": len(self.calls)}
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    # Many workers asking for the same few pages at once, as team and player pages would be if their lookups ran on
+    # the crawl's worker threads (today they run on the handler thread, so a crawl coalesces nothing)
+    parser = argparse.ArgumentParser(description="Measure request coalescing against the replay server.")
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--urls', type=int, default=20, help="Distinct team pages requested")
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    import requests
+    from replay_server import SyntheticSite, ReplayConfig, start_server
+
+    for label, coalesce in (("Direct", False), ("Single flight", True)):
+        server, base, stats = start_server(ReplayConfig(site=SyntheticSite(), latency_ms=args.latency_ms))
+        urls = [f"{base}/team/{i % 64 + 1}/team-{i % 64 + 1}" for i in range(args.urls)]
+        flights = SingleFlight()
+        http = threading.local()
+
+        def get(url):
+            if not hasattr(http, 'session'):
+                http.session = requests.Session()
+            return http.session.get(url)
+
+        fetch = flights.wrap(get) if coalesce else get
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            sizes = list(executor.map(lambda i: len(fetch(urls[i % len(urls)]).content), range(args.requests)))
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        print(f"{label}: {args.requests} fetches in {elapsed:.2f}s, {stats.snapshot()['requests']} reached the site"
+              + (f", {flights.snapshot()['coalesced']} coalesced" if coalesce else ''))
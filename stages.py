@@ -0,0 +1,46 @@
+# stages.py
+
+import functools
+import threading
+from contextlib import contextmanager
+
+# ----------------------- Stage Hooks -----------------------
+
+class StageTracker:
+    # Named stages of a crawl (tour, split, match, parse, ...). Observers such as memory_tracking.MemoryObserver
+    # are told when each stage starts and ends; with none attached a stage costs one attribute check.
+
+    def __init__(self):
+        self.observers = []
+
+    def add(self, observer):
+        self.observers.append(observer)
+        return observer
+
+    @contextmanager
+    def stage(self, name):
+        # Only the main thread is observed: fetch workers would interleave with its stages
+        if not self.observers or threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        for observer in self.observers:
+            observer.enter(name)
+        try:
+            yield
+        finally:
+            for observer in reversed(self.observers):
+                observer.exit(name)
+
+    def track(self, name):
+        # Decorator form of stage()
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.observers:
+                    return fn(*args, **kwargs)
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+stages = StageTracker()
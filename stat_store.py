@@ -0,0 +1,332 @@
+# stat_store.py
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from sqlalchemy import event, select, func
+
+from models import engine, Match, Game, GamePlayer
+from aggregates import lookup_game, NO_SPLIT
+from stats_engine import STAT_COLUMNS
+
+# ----------------------- Configuration -----------------------
+
+# When set, the ingestion pipeline appends every committed GamePlayer row here
+STAT_STORE_DIR = os.getenv('STAT_STORE_DIR')
+
+FORMAT_VERSION = 2
+
+# One int32 row per GamePlayer; side_data is stored as 0/1
+ID_COLUMNS = ['game_id', 'player_id', 'team_id', 'agent', 'map_id', 'tour_split_id', 'side_data']
+INDEXED_COLUMNS = ['player_id', 'team_id', 'map_id', 'agent', 'tour_split_id']
+
+# ID_COLUMNS that identify a row, so re-scraped GamePlayers overwrite theirs
+KEY_COLUMNS = ['game_id', 'player_id']
+
+# Appended rows are scanned linearly until the unindexed tail grows past this
+REINDEX_MIN_TAIL = 10000
+
+STATS_FILE = 'stats.f32'
+IDS_FILE = 'ids.i32'
+META_FILE = 'meta.json'
+INDEX_PARTS = ['keys', 'offsets', 'order']
+
+# ----------------------- Helpers -----------------------
+
+def _read_meta(store_dir):
+    path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(path):
+        return {"version": FORMAT_VERSION, "rows": 0, "indexed_rows": 0, "index_generation": 0,
+                "stat_columns": STAT_COLUMNS, "id_columns": ID_COLUMNS}
+    with open(path) as f:
+        meta = json.load(f)
+    if meta["version"] != FORMAT_VERSION or meta["stat_columns"] != STAT_COLUMNS:
+        raise ValueError(f"Stat store at {store_dir} has an incompatible layout; rebuild it.")
+    return meta
+
+def _write_meta(store_dir, meta):
+    # Readers size their maps from meta.json, so it is only replaced after the data is on disk
+    path = os.path.join(store_dir, META_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def _map(path, dtype, rows, width):
+    if rows == 0:
+        return np.zeros((0, width), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(rows, width))
+
+def _index_paths(store_dir, column, generation):
+    # Every rebuild writes a new generation, so the files a meta.json names are never rewritten under a reader
+    return (os.path.join(store_dir, f"{column}.keys.{generation}.i32"),
+            os.path.join(store_dir, f"{column}.offsets.{generation}.i64"),
+            os.path.join(store_dir, f"{column}.order.{generation}.i32"))
+
+def _index_generation(name):
+    # Generation of an index file name such as player_id.keys.3.i32, else None
+    parts = name.split('.')
+    if len(parts) == 4 and parts[0] in INDEXED_COLUMNS and parts[1] in INDEX_PARTS and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+def _store_files(store_dir):
+    # Files this module writes in store_dir, leftover .tmp files included; anything else is not ours to touch
+    names = os.listdir(store_dir) if os.path.isdir(store_dir) else []
+    for name in names:
+        base = name[:-len('.tmp')] if name.endswith('.tmp') else name
+        if base in (STATS_FILE, IDS_FILE, META_FILE) or _index_generation(base) is not None:
+            yield name
+
+def _build_indexes(store_dir, ids, rows, generation):
+    # Per key column: sorted distinct keys, offsets into `order`, and row numbers grouped by key
+    for column in INDEXED_COLUMNS:
+        values = np.asarray(ids[:rows, ID_COLUMNS.index(column)])
+        order = np.argsort(values, kind='stable').astype(np.int32)
+        keys, offsets = np.unique(values[order], return_index=True)
+        offsets = np.append(offsets, rows).astype(np.int64)
+        keys_path, offsets_path, order_path = _index_paths(store_dir, column, generation)
+        for path, array in ((keys_path, keys.astype(np.int32)), (offsets_path, offsets), (order_path, order)):
+            array.tofile(path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+def _remove_old_indexes(store_dir, generation):
+    # Keeps the previous generation for readers that read meta.json just before it was replaced
+    for name in list(_store_files(store_dir)):
+        old = _index_generation(name)
+        if old is not None and old < generation - 1:
+            os.remove(os.path.join(store_dir, name))
+
+# ----------------------- Store -----------------------
+
+class StatStore:
+    # Read-only, zero-copy view of the store; several processes can open it at once
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        for attempt in range(3):
+            try:
+                self._open(_read_meta(store_dir))
+                break
+            except FileNotFoundError:
+                # Two reindexes went by between reading meta.json and opening its index files
+                if attempt == 2:
+                    raise
+
+    def _open(self, meta):
+        self.rows = meta["rows"]
+        self.indexed_rows = meta["indexed_rows"]
+        self.stats = _map(os.path.join(self.store_dir, STATS_FILE), np.float32, self.rows, len(STAT_COLUMNS))
+        self.ids = _map(os.path.join(self.store_dir, IDS_FILE), np.int32, self.rows, len(ID_COLUMNS))
+
+        self.indexes = {}
+        if self.indexed_rows:
+            for column in INDEXED_COLUMNS:
+                keys_path, offsets_path, order_path = _index_paths(self.store_dir, column, meta["index_generation"])
+                self.indexes[column] = (np.fromfile(keys_path, dtype=np.int32),
+                                        np.fromfile(offsets_path, dtype=np.int64),
+                                        np.memmap(order_path, dtype=np.int32, mode='r'))
+
+    def column(self, name):
+        if name in ID_COLUMNS:
+            return self.ids[:, ID_COLUMNS.index(name)]
+        return self.stats[:, STAT_COLUMNS.index(name)]
+
+    def rows_for(self, column, value):
+        # Row numbers whose `column` equals `value`: the on-disk index covers the first
+        # indexed_rows rows and anything appended since is scanned
+        if column not in self.indexes:
+            return np.flatnonzero(self.column(column) == value)
+        keys, offsets, order = self.indexes[column]
+        i = np.searchsorted(keys, value)
+        indexed = order[offsets[i]:offsets[i + 1]] if i < len(keys) and keys[i] == value else np.array([], dtype=np.int32)
+        if self.indexed_rows == self.rows:
+            return indexed
+        tail = np.flatnonzero(self.column(column)[self.indexed_rows:] == value) + self.indexed_rows
+        return np.concatenate((indexed, tail.astype(np.int32)))
+
+    def select(self, **filters):
+        # Intersection of index lookups, e.g. select(player_id=9, map_id=3)
+        rows = None
+        for column, value in filters.items():
+            matched = self.rows_for(column, value)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        if rows is None:
+            return np.arange(self.rows)
+        return np.sort(rows)
+
+class StatStoreWriter:
+    # Appends rows and rewrites re-scraped ones in place; data and index files are written first and meta.json is
+    # swapped in last
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.meta = _read_meta(store_dir)
+        if self.meta["rows"] == 0:
+            _write_meta(store_dir, self.meta)
+
+    def append(self, id_rows, stat_rows, reindex=None):
+        ids = np.asarray(id_rows, dtype=np.int32).reshape(-1, len(ID_COLUMNS))
+        stats = np.asarray(stat_rows, dtype=np.float32).reshape(-1, len(STAT_COLUMNS))
+        if len(ids) == 0:
+            return 0
+
+        for name, array in ((IDS_FILE, ids), (STATS_FILE, stats)):
+            path = os.path.join(self.store_dir, name)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                # Truncate anything a crashed writer left past the last committed row
+                f.truncate(self.meta["rows"] * array.shape[1] * array.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.meta["rows"] += len(ids)
+        if reindex is None:
+            tail = self.meta["rows"] - self.meta["indexed_rows"]
+            reindex = tail > max(REINDEX_MIN_TAIL, self.meta["rows"] // 10)
+        if reindex:
+            self.reindex()
+        else:
+            _write_meta(self.store_dir, self.meta)
+        return len(ids)
+
+    def rewrite(self, id_rows, stat_rows):
+        # Overwrite the rows with the same KEY_COLUMNS in place and append the ones the store does not have yet.
+        # A reader with the store open can see a row half rewritten until it reopens.
+        ids = np.asarray(id_rows, dtype=np.int32).reshape(-1, len(ID_COLUMNS))
+        stats = np.asarray(stat_rows, dtype=np.float32).reshape(-1, len(STAT_COLUMNS))
+        if len(ids) == 0:
+            return 0
+        store = StatStore(self.store_dir)
+        keys = [ID_COLUMNS.index(column) for column in KEY_COLUMNS]
+        indexed = [ID_COLUMNS.index(column) for column in INDEXED_COLUMNS]
+        found, missing, reindex = [], [], False
+        for i, row in enumerate(ids):
+            matches = np.flatnonzero(np.all(store.ids[:, keys] == row[keys], axis=1))
+            if len(matches) == 0:
+                missing.append(i)
+                continue
+            at = int(matches[0])
+            found.append((at, i))
+            # A changed key column moves the row to another index bucket
+            if at < store.indexed_rows and np.any(store.ids[at, indexed] != row[indexed]):
+                reindex = True
+        del store
+
+        for name, array in ((IDS_FILE, ids), (STATS_FILE, stats)) if found else ():
+            row_bytes = array.shape[1] * array.itemsize
+            with open(os.path.join(self.store_dir, name), 'r+b') as f:
+                for at, i in found:
+                    f.seek(at * row_bytes)
+                    f.write(array[i].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        if missing:
+            self.append(ids[missing], stats[missing], reindex=reindex or None)
+        elif reindex:
+            self.reindex()
+        return len(found)
+
+    def reindex(self):
+        # Index every row under a new generation, then point meta.json at it
+        generation = self.meta.get("index_generation", 0) + 1
+        store_ids = np.memmap(os.path.join(self.store_dir, IDS_FILE), dtype=np.int32, mode='r',
+                              shape=(self.meta["rows"], len(ID_COLUMNS))) if self.meta["rows"] else \
+            np.zeros((0, len(ID_COLUMNS)), dtype=np.int32)
+        _build_indexes(self.store_dir, store_ids, self.meta["rows"], generation)
+        self.meta["indexed_rows"] = self.meta["rows"]
+        self.meta["index_generation"] = generation
+        _write_meta(self.store_dir, self.meta)
+        _remove_old_indexes(self.store_dir, generation)
+
+# ----------------------- Build and Ingestion Hook -----------------------
+
+def build_store(store_dir, chunk_size=50000):
+    # Full export of game_players from the database into a fresh store
+    for name in list(_store_files(store_dir)):
+        os.remove(os.path.join(store_dir, name))
+    writer = StatStoreWriter(store_dir)
+
+    query = select(
+        GamePlayer.game_id, GamePlayer.player_id, GamePlayer.team_id, GamePlayer.agent,
+        Game.map_id, func.coalesce(Match.tour_split_id, NO_SPLIT), GamePlayer.ct_and_t_data,
+        *[func.coalesce(GamePlayer.__table__.c[col], 0) for col in STAT_COLUMNS]
+    ).join(Game, Game.game_id == GamePlayer.game_id).join(Match, Match.match_id == Game.match_id)
+
+    start = time.perf_counter()
+    width = len(ID_COLUMNS)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for chunk in result.partitions():
+            ids = [[v or 0 for v in row[:width - 1]] + [1 if row[width - 1] else 0] for row in chunk]
+            stats = [row[width:] for row in chunk]
+            writer.append(ids, stats, reindex=False)
+
+    writer.reindex()
+    print(f"Built stat store with {writer.meta['rows']} rows in {time.perf_counter() - start:.1f}s ({store_dir}).")
+
+def attach_to_ingestion(session, store_dir):
+    # Buffer rows as GamePlayers are flushed, then append new ones and rewrite re-scraped ones once the
+    # transaction commits
+    writer = StatStoreWriter(store_dir)
+    inserted = []
+    updated = []
+
+    def store_row(connection, target):
+        row = lookup_game(connection, target.game_id)
+        if row is None:
+            return None
+        tour_split_id = row.tour_split_id if row.tour_split_id is not None else NO_SPLIT
+        return (
+            [int(target.game_id), target.player_id, target.team_id or 0, target.agent or 0,
+             row.map_id or 0, tour_split_id, 1 if target.ct_and_t_data else 0],
+            [getattr(target, col) or 0 for col in STAT_COLUMNS]
+        )
+
+    @event.listens_for(GamePlayer, 'after_insert')
+    def collect_insert(mapper, connection, target):
+        row = store_row(connection, target)
+        if row is not None:
+            inserted.append(row)
+
+    @event.listens_for(GamePlayer, 'after_update')
+    def collect_update(mapper, connection, target):
+        row = store_row(connection, target)
+        if row is not None:
+            updated.append(row)
+
+    @event.listens_for(session, 'after_commit')
+    def flush_pending(session):
+        # Inserts first, so a row inserted and updated in one transaction is there to rewrite
+        if inserted:
+            writer.append([ids for ids, _ in inserted], [stats for _, stats in inserted])
+            inserted.clear()
+        if updated:
+            writer.rewrite([ids for ids, _ in updated], [stats for _, stats in updated])
+            updated.clear()
+
+    @event.listens_for(session, 'after_rollback')
+    def discard_pending(session):
+        inserted.clear()
+        updated.clear()
+
+    return writer
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the memory-mapped stat store.")
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--dir', default=STAT_STORE_DIR or 'exports/stat_store')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_store(args.dir)
+    else:
+        start = time.perf_counter()
+        store = StatStore(args.dir)
+        print(f"Opened {store.rows} rows in {(time.perf_counter() - start) * 1000:.2f}ms.")
+        print(f"Indexed columns: {', '.join(store.indexes) or 'none'}")
@@ -0,0 +1,231 @@
+# stat_tables.py
+
+import sys
+import time
+import numpy as np
+from bs4 import BeautifulSoup, Tag
+
+# ----------------------- Column Layout -----------------------
+
+# Same stat and side order as stats_engine.py
+STATS = ['kills', 'deaths', 'assists', 'acs', 'kast', 'adr', 'hs', 'first_kills', 'first_deaths']
+SIDES = ['ct', 't', 'both']
+
+# Column of each stat in a mod-overview row: player, agents, rating, acs, k, d, a, +/-, kast, adr, hs, fk, fd, +/-
+STAT_TDS = {3: 'acs', 4: 'kills', 5: 'deaths', 6: 'assists', 8: 'kast', 9: 'adr', 10: 'hs', 11: 'first_kills', 12: 'first_deaths'}
+STAT_INDEX = {stat: i for i, stat in enumerate(STATS)}
+TD_STAT_INDEX = {td: STAT_INDEX[stat] for td, stat in STAT_TDS.items()}
+SIDE_CLASSES = {'mod-ct': 0, 'mod-t': 1, 'mod-both': 2}
+
+# ----------------------- Per-Cell Parsing -----------------------
+
+def extract_player_id_from_url(player_url):
+
+    url_parts = player_url.strip('/').split('/')
+    try:
+        idx = url_parts.index('player')
+        player_id = int(url_parts[idx + 1])
+        return player_id
+    except (ValueError, IndexError):
+        return None  # Unable to extract player_id
+
+def parse_stat(stat_text):
+    stat_text = stat_text.replace('\xa0', '').replace('&nbsp;', '').strip()
+    stat_values = stat_text.strip().replace('%', '').split('\n')
+    float_values = []
+    for val in stat_values:
+        val = val.strip()
+        if val == '/' or not val:
+            continue
+        try:
+            float_values.append(float(val))
+        except ValueError:
+            continue
+    if len(float_values) == 1:
+        return float_values[0]
+    elif len(float_values) > 1:
+        return sum(float_values) / len(float_values)
+    else:
+        return 0
+
+def parse_sides_stat(stat_td):
+
+    t = stat_td.find('span', class_="mod-t")
+    ct = stat_td.find('span', class_="mod-ct")
+    both = stat_td.find('span', class_="mod-both")
+
+    t_side = 0
+    ct_side = 0
+    both_side = 0
+    side_data = False
+
+    if t and ct:
+        t_side = parse_stat(t.text)
+        ct_side = parse_stat(ct.text)
+        side_data = True
+
+
+    if both:
+        both_side = parse_stat(both.text)
+
+    return {"t": t_side, "ct": ct_side, "both": both_side, "side_data": side_data }
+
+# ----------------------- Table Fast Path -----------------------
+
+class StatTable:
+    # One mod-overview table: values[player, STATS, SIDES] plus per-player id columns
+
+    def __init__(self, player_ids, player_hrefs, player_names, agents, values, side_data):
+        self.player_ids = player_ids
+        self.player_hrefs = player_hrefs
+        self.player_names = player_names
+        self.agents = agents
+        self.values = values
+        self.side_data = side_data
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    def sides(self, row, stat):
+        # Same shape as parse_sides_stat's result for one cell
+        s = STAT_INDEX[stat]
+        ct, t, both = self.values[row, s].tolist()
+        return {"t": t, "ct": ct, "both": both, "side_data": bool(self.side_data[row, s])}
+
+def _stat_value(text):
+    # parse_stat for the single value a side span holds
+    text = text.replace('\xa0', '').strip().replace('%', '')
+    try:
+        return float(text)
+    except ValueError:
+        return parse_stat(text)
+
+def extract_stat_table(table):
+    # One walk over each row's cells, skipping the columns that hold no stored stat,
+    # instead of find/find_all per row and three finds per cell
+    rows = []
+    body = table.find('tbody') or table
+    for tr in body.children:
+        if type(tr) is not Tag or tr.name != 'tr':
+            continue
+        # [href, name, agent, cells{(stat, side): value}]
+        row = [None, None, None, {}]
+        rows.append(row)
+        cells = row[3]
+        td_index = -1
+        for td in tr.children:
+            if type(td) is not Tag or td.name != 'td':
+                continue
+            td_index += 1
+            if td_index == 0:
+                for node in td.descendants:
+                    if type(node) is not Tag:
+                        continue
+                    if node.name == 'a' and row[0] is None:
+                        row[0] = node.get('href')
+                    elif node.name == 'div' and row[1] is None and 'text-of' in (node.get('class') or ()):
+                        row[1] = node.get_text().strip()
+                continue
+            if td_index == 1:
+                for node in td.descendants:
+                    if type(node) is Tag and node.name == 'img':
+                        row[2] = node.get('title')
+                        break
+                continue
+            stat = TD_STAT_INDEX.get(td_index)
+            if stat is None:
+                continue
+            for node in td.descendants:
+                if type(node) is not Tag or node.name != 'span':
+                    continue
+                for cls in node.attrs.get('class') or ():
+                    side = SIDE_CLASSES.get(cls)
+                    # Keep the first span per side, like find() in parse_sides_stat
+                    if side is not None and (stat, side) not in cells:
+                        text = node.string
+                        cells[stat, side] = _stat_value(text if text is not None else node.get_text())
+
+    return build_stat_table(rows)
+
+def build_stat_table(rows):
+    # rows: [href, name, agent, {(stat index, side index): value}] per <tr>, in page order
+    rows = [row for row in rows if row[0] and extract_player_id_from_url(row[0])]
+    values = np.zeros((len(rows), len(STATS), len(SIDES)), dtype=np.float64)
+    side_data = np.zeros((len(rows), len(STATS)), dtype=bool)
+    for i, (_, _, _, cells) in enumerate(rows):
+        for (stat, side), value in cells.items():
+            values[i, stat, side] = value
+    for i, (_, _, _, cells) in enumerate(rows):
+        for stat in range(len(STATS)):
+            # Side values only count when both are present, as in parse_sides_stat
+            if (stat, 0) in cells and (stat, 1) in cells:
+                side_data[i, stat] = True
+            else:
+                values[i, stat, :2] = 0
+
+    return StatTable(
+        player_ids=np.array([extract_player_id_from_url(row[0]) for row in rows], dtype=np.int64),
+        player_hrefs=[row[0] for row in rows],
+        player_names=[row[1] for row in rows],
+        agents=[row[2] for row in rows],
+        values=values,
+        side_data=side_data,
+    )
+
+# ----------------------- DOM Path (reference) -----------------------
+
+def extract_stat_table_dom(table):
+    # The per-row, per-cell lookups tour_split_scrape.py used; kept as the reference the fast path is checked against
+    hrefs, names, agents, values, side_data = [], [], [], [], []
+    tbody = table.find('tbody')
+    for row in tbody.find_all('tr') if tbody else []:
+        player_td = row.find('td', class_='mod-player')
+        agents_td = row.find('td', class_='mod-agents')
+        player_name_div = player_td.find('div', class_='text-of') if player_td else None
+        player_href = player_td.find('a')['href'] if player_td else None
+        if not extract_player_id_from_url(player_href):
+            continue
+        stats_tds = row.find_all('td')
+        cells = {stat: parse_sides_stat(stats_tds[td]) for td, stat in STAT_TDS.items()}
+        hrefs.append(player_href)
+        names.append(player_name_div.text.strip() if player_name_div else None)
+        agents.append(agents_td.find_all('span')[0].find('img')['title'])
+        values.append([[cells[stat][side] for side in SIDES] for stat in STATS])
+        side_data.append([cells[stat]["side_data"] for stat in STATS])
+    return StatTable(
+        player_ids=np.array([extract_player_id_from_url(href) for href in hrefs], dtype=np.int64),
+        player_hrefs=hrefs, player_names=names, agents=agents,
+        values=np.array(values, dtype=np.float64).reshape(len(hrefs), len(STATS), len(SIDES)),
+        side_data=np.array(side_data, dtype=bool).reshape(len(hrefs), len(STATS)),
+    )
+
+def same_table(a, b):
+    return (np.array_equal(a.player_ids, b.player_ids) and a.player_hrefs == b.player_hrefs
+            and a.player_names == b.player_names and a.agents == b.agents
+            and np.array_equal(a.values, b.values) and np.array_equal(a.side_data, b.side_data))
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    # python stat_tables.py [page.html] [repeat]: checks both paths agree, then times them
+    path = sys.argv[1] if len(sys.argv) > 1 else 'test.html'
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with open(path, encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    tables = soup.find_all('table', class_='wf-table-inset mod-overview')
+
+    for table in tables:
+        if not same_table(extract_stat_table(table), extract_stat_table_dom(table)):
+            print("Fast path and DOM path disagree.")
+            sys.exit(1)
+    print(f"{len(tables)} tables, {sum(len(extract_stat_table(table)) for table in tables)} player rows: both paths agree.")
+
+    timings = {}
+    for label, extract in (("DOM path", extract_stat_table_dom), ("Fast path", extract_stat_table)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for table in tables:
+                extract(table)
+        timings[label] = (time.perf_counter() - start) / repeat
+        print(f"{label}: {timings[label] * 1000:.2f}ms per page")
+    print(f"Speedup: {timings['DOM path'] / timings['Fast path']:.1f}x")
@@ -0,0 +1,169 @@
+# stats_engine.py
+
+import sys
+import time
+import numpy as np
+from sqlalchemy import select, func
+
+from models import engine, Match, Game, GamePlayer
+
+# ----------------------- Column Layout -----------------------
+
+STATS = ['kills', 'deaths', 'assists', 'acs', 'kast', 'adr', 'hs', 'first_kills', 'first_deaths']
+SIDES = ['ct', 't', 'both']
+
+ID_COLUMNS = ['game_id', 'player_id', 'team_id', 'agent', 'map_id', 'tour_split_id']
+STAT_COLUMNS = [f"{side}_{stat}" for side in SIDES for stat in STATS]
+
+# ----------------------- Stats Engine -----------------------
+
+class StatsEngine:
+    # game_players held as one NumPy array per column, sorted by player then date,
+    # with the player/team group indexes computed once at load time
+
+    def __init__(self, columns):
+        order = np.lexsort((columns['game_id'], columns['date_played'], columns['player_id']))
+        self.columns = {name: values[order] for name, values in columns.items()}
+        self.size = len(order)
+
+        self.player_ids, self.player_index = np.unique(self.columns['player_id'], return_inverse=True)
+        self.team_ids, self.team_index = np.unique(self.columns['team_id'], return_inverse=True)
+
+        # Rows are contiguous per player, so each row knows where its player's block starts
+        starts = np.searchsorted(self.columns['player_id'], self.player_ids)
+        self.group_start = starts[self.player_index]
+
+    @classmethod
+    def load(cls, connection=None):
+        query = select(
+            GamePlayer.game_id, GamePlayer.player_id, GamePlayer.team_id, GamePlayer.agent,
+            Game.map_id, func.coalesce(Match.tour_split_id, 0), Match.date_played,
+            GamePlayer.ct_and_t_data,
+            *[func.coalesce(GamePlayer.__table__.c[col], 0) for col in STAT_COLUMNS]
+        ).join(Game, Game.game_id == GamePlayer.game_id).join(Match, Match.match_id == Game.match_id)
+
+        start = time.perf_counter()
+        if connection is None:
+            with engine.connect() as conn:
+                rows = conn.execute(query).all()
+        else:
+            rows = connection.execute(query).all()
+
+        names = ID_COLUMNS + ['date_played', 'side_data'] + STAT_COLUMNS
+        values = list(zip(*rows)) if rows else [()] * len(names)
+        columns = {}
+        for name, column in zip(names, values):
+            if name in ID_COLUMNS:
+                columns[name] = np.array(column, dtype=np.int64)
+            elif name == 'date_played':
+                columns[name] = np.array(column, dtype='datetime64[D]')
+            elif name == 'side_data':
+                columns[name] = np.array([bool(v) for v in column], dtype=bool)
+            else:
+                columns[name] = np.array(column, dtype=np.float64)
+        print(f"Loaded {len(rows)} game_players rows in {time.perf_counter() - start:.2f}s.")
+        return cls(columns)
+
+    # ----------------------- Filtering -----------------------
+
+    def mask(self, tour_split_id=None, map_id=None, agent_id=None, team_id=None, since=None, side_data=None):
+        mask = np.ones(self.size, dtype=bool)
+        if tour_split_id is not None:
+            mask &= np.isin(self.columns['tour_split_id'], np.atleast_1d(tour_split_id))
+        if map_id is not None:
+            mask &= np.isin(self.columns['map_id'], np.atleast_1d(map_id))
+        if agent_id is not None:
+            mask &= np.isin(self.columns['agent'], np.atleast_1d(agent_id))
+        if team_id is not None:
+            mask &= np.isin(self.columns['team_id'], np.atleast_1d(team_id))
+        if since is not None:
+            mask &= self.columns['date_played'] >= np.datetime64(since, 'D')
+        if side_data is not None:
+            mask &= self.columns['side_data'] == side_data
+        return mask
+
+    # ----------------------- Group-by Aggregates -----------------------
+
+    def _group(self, group_ids, group_index, stats, mask, how):
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        index = group_index[mask]
+        counts = np.bincount(index, minlength=len(group_ids))
+        present = counts > 0
+
+        result = {"games": counts[present]}
+        for col in stats:
+            sums = np.bincount(index, weights=self.columns[col][mask], minlength=len(group_ids))
+            if how == 'sum':
+                result[col] = sums[present]
+            else:
+                result[col] = sums[present] / counts[present]
+        return group_ids[present], result
+
+    def player_aggregates(self, stats=None, mask=None, how='mean'):
+        return self._group(self.player_ids, self.player_index, stats or STAT_COLUMNS, mask, how)
+
+    def team_aggregates(self, stats=None, mask=None, how='sum'):
+        return self._group(self.team_ids, self.team_index, stats or STAT_COLUMNS, mask, how)
+
+    def side_split(self, stat, mask=None):
+        # CT vs T per-game means, only over games where vlr.gg reported side data
+        side_mask = self.columns['side_data'] if mask is None else mask & self.columns['side_data']
+        ids, result = self.player_aggregates([f"ct_{stat}", f"t_{stat}"], side_mask)
+        return ids, result[f"ct_{stat}"], result[f"t_{stat}"]
+
+    def kd(self, mask=None, by='player'):
+        group = self.player_aggregates if by == 'player' else self.team_aggregates
+        ids, result = group(['both_kills', 'both_deaths'], mask, how='sum')
+        deaths = result['both_deaths']
+        return ids, np.divide(result['both_kills'], deaths, out=np.zeros_like(deaths), where=deaths > 0)
+
+    # ----------------------- Rolling Windows -----------------------
+
+    def rolling_mean(self, stat, window):
+        # Mean of the last `window` games per row, never crossing into another player's games
+        values = self.columns[stat]
+        csum = np.concatenate(([0.0], np.cumsum(values)))
+        positions = np.arange(self.size)
+        start = np.maximum(self.group_start, positions - window + 1)
+        return (csum[positions + 1] - csum[start]) / (positions + 1 - start)
+
+    def player_form(self, player_id, stat, window=5):
+        # Rolling mean series for one player, in date order
+        idx = np.searchsorted(self.player_ids, player_id)
+        if idx >= len(self.player_ids) or self.player_ids[idx] != player_id:
+            return np.array([], dtype='datetime64[D]'), np.array([])
+        rows = self.player_index == idx
+        return self.columns['date_played'][rows], self.rolling_mean(stat, window)[rows]
+
+    # ----------------------- Percentiles -----------------------
+
+    def percentiles(self, stat, q=(10, 25, 50, 75, 90), mask=None, min_games=1):
+        _, result = self.player_aggregates([stat], mask)
+        values = result[stat][result['games'] >= min_games]
+        if len(values) == 0:
+            return dict.fromkeys(q, 0.0)
+        return dict(zip(q, np.percentile(values, q)))
+
+    def percentile_rank(self, player_id, stat, mask=None, min_games=1):
+        ids, result = self.player_aggregates([stat], mask)
+        eligible = result['games'] >= min_games
+        position = np.flatnonzero(ids == player_id)
+        if len(position) == 0 or not eligible[position[0]]:
+            return None
+        values = result[stat][eligible]
+        return 100.0 * np.count_nonzero(values <= result[stat][position[0]]) / len(values)
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    stats_engine = StatsEngine.load()
+    stat = sys.argv[1] if len(sys.argv) > 1 else 'both_acs'
+
+    start = time.perf_counter()
+    ids, result = stats_engine.player_aggregates()
+    print(f"Player aggregates for {len(ids)} players in {(time.perf_counter() - start) * 1000:.2f}ms.")
+
+    start = time.perf_counter()
+    print(f"{stat} percentiles: {stats_engine.percentiles(stat, min_games=5)}")
+    print(f"Percentiles in {(time.perf_counter() - start) * 1000:.2f}ms.")
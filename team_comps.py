@@ -0,0 +1,181 @@
+# team_comps.py
+
+import sys
+import time
+import numpy as np
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Index, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import engine, session, Base, Agent, Match, Game, GamePlayer
+from aggregates import NO_SPLIT
+# Re-exported for scrape_team_comp_data.py
+from match_pages import parse_game_scores
+
+# ----------------------- Composition Table -----------------------
+
+class TeamGameComp(Base):
+    __tablename__ = 'team_game_comps'
+    game_id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, primary_key=True)
+    match_id = Column(Integer)
+    map_id = Column(Integer)
+    tour_split_id = Column(Integer)
+    # Bit (agent_id - 1) is set for each agent played; agents is the sorted id tuple as text
+    agent_mask = Column(BigInteger)
+    agents = Column(String(100))
+    rounds_won = Column(Integer, nullable=True)
+    rounds_lost = Column(Integer, nullable=True)
+    won = Column(Boolean, nullable=True)
+
+    __table_args__ = (
+        Index('ix_team_game_comps_map_split', 'map_id', 'tour_split_id'),
+        Index('ix_team_game_comps_mask', 'agent_mask'),
+    )
+
+# ----------------------- Encoding -----------------------
+
+def comp_mask(agent_ids):
+    mask = 0
+    for agent_id in agent_ids:
+        if agent_id and agent_id > 0:
+            mask |= 1 << (agent_id - 1)
+    return mask
+
+def comp_key(agent_ids):
+    return '-'.join(str(agent_id) for agent_id in sorted(agent_ids))
+
+def mask_agents(mask):
+    return [bit + 1 for bit in range(64) if mask >> bit & 1]
+
+# ----------------------- Ingestion -----------------------
+
+def record_team_comp(game_id, team_id, match_id, map_id, tour_split_id, agent_ids,
+                     rounds_won=None, rounds_lost=None, session=session):
+    # Upsert one team's composition for a game; re-scrapes overwrite scores and agents. Runs in the caller's
+    # transaction, which commits it with the rest of the game
+    if len(agent_ids) != 5 or any(agent_id is None or agent_id < 1 for agent_id in agent_ids):
+        print(f"Skipping composition for team {team_id} in game {game_id}: agents {agent_ids}.")
+        return
+    won = None
+    if rounds_won is not None and rounds_lost is not None:
+        won = rounds_won > rounds_lost
+    values = {
+        "game_id": int(game_id), "team_id": team_id, "match_id": match_id, "map_id": map_id,
+        "tour_split_id": tour_split_id if tour_split_id is not None else NO_SPLIT,
+        "agent_mask": comp_mask(agent_ids), "agents": comp_key(agent_ids),
+        "rounds_won": rounds_won, "rounds_lost": rounds_lost, "won": won,
+    }
+    dialect = postgresql if session.bind.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(TeamGameComp.__table__).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['game_id', 'team_id'],
+        set_={key: stmt.excluded[key] for key in values if key not in ('game_id', 'team_id')}
+    )
+    session.execute(stmt)
+
+def backfill_from_game_players():
+    # Rebuild compositions for games ingested before this table existed (no round scores)
+    Base.metadata.create_all(engine)
+    query = select(
+        GamePlayer.game_id, GamePlayer.team_id, Game.match_id, Game.map_id, Match.tour_split_id, GamePlayer.agent
+    ).join(Game, Game.game_id == GamePlayer.game_id).join(Match, Match.match_id == Game.match_id).order_by(GamePlayer.game_id, GamePlayer.team_id)
+
+    comps = {}
+    with engine.connect() as conn:
+        for game_id, team_id, match_id, map_id, tour_split_id, agent in conn.execute(query):
+            comp = comps.setdefault((game_id, team_id), {"match_id": match_id, "map_id": map_id,
+                                                          "tour_split_id": tour_split_id, "agents": []})
+            comp["agents"].append(agent)
+
+    rows = []
+    for (game_id, team_id), comp in comps.items():
+        if len(comp["agents"]) != 5:
+            continue
+        rows.append({
+            "game_id": game_id, "team_id": team_id, "match_id": comp["match_id"], "map_id": comp["map_id"],
+            "tour_split_id": comp["tour_split_id"] if comp["tour_split_id"] is not None else NO_SPLIT,
+            "agent_mask": comp_mask(comp["agents"]), "agents": comp_key(comp["agents"]),
+            "rounds_won": None, "rounds_lost": None, "won": None,
+        })
+
+    # Keep rows scraped with round scores; only fill in the games that are missing
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(TeamGameComp.game_id, TeamGameComp.team_id)).all())
+        missing = [row for row in rows if (row["game_id"], row["team_id"]) not in existing]
+        if missing:
+            conn.execute(TeamGameComp.__table__.insert(), missing)
+    print(f"Backfilled {len(missing)} team compositions from game_players.")
+
+# ----------------------- Composition Index -----------------------
+
+class CompIndex:
+    # All team-game compositions as parallel NumPy arrays; queries are masked counts
+
+    def __init__(self):
+        self.agent_names = {}
+        self.mask = np.array([], dtype=np.int64)
+        self.map_id = np.array([], dtype=np.int64)
+        self.tour_split_id = np.array([], dtype=np.int64)
+        self.won = np.array([], dtype=np.int8)
+
+    def load(self, connection=None):
+        start = time.perf_counter()
+        query = select(TeamGameComp.agent_mask, TeamGameComp.map_id, TeamGameComp.tour_split_id, TeamGameComp.won)
+        if connection is None:
+            with engine.connect() as conn:
+                rows = conn.execute(query).all()
+                self.agent_names = dict(conn.execute(select(Agent.agent_id, Agent.agent_name)).all())
+        else:
+            rows = connection.execute(query).all()
+            self.agent_names = dict(connection.execute(select(Agent.agent_id, Agent.agent_name)).all())
+
+        self.mask = np.array([row[0] for row in rows], dtype=np.int64)
+        self.map_id = np.array([row[1] or 0 for row in rows], dtype=np.int64)
+        self.tour_split_id = np.array([row[2] or 0 for row in rows], dtype=np.int64)
+        # 1 = won, 0 = lost, -1 = unknown
+        self.won = np.array([-1 if row[3] is None else int(row[3]) for row in rows], dtype=np.int8)
+        print(f"Loaded {len(rows)} team compositions in {(time.perf_counter() - start) * 1000:.1f}ms.")
+        return self
+
+    def _filter(self, map_id=None, tour_split_id=None, includes=None):
+        selected = np.ones(len(self.mask), dtype=bool)
+        if map_id is not None:
+            selected &= self.map_id == map_id
+        if tour_split_id is not None:
+            selected &= np.isin(self.tour_split_id, np.atleast_1d(tour_split_id))
+        if includes:
+            required = comp_mask(includes)
+            selected &= (self.mask & required) == required
+        return selected
+
+    def most_played(self, map_id=None, tour_split_id=None, includes=None, limit=10):
+        # Most played comps, optionally only those containing every agent in `includes`
+        selected = self._filter(map_id, tour_split_id, includes)
+        masks, inverse, counts = np.unique(self.mask[selected], return_inverse=True, return_counts=True)
+        won = self.won[selected]
+        wins = np.bincount(inverse, weights=won == 1, minlength=len(masks))
+        decided = np.bincount(inverse, weights=won >= 0, minlength=len(masks))
+        order = np.argsort(-counts, kind='stable')[:limit]
+        return [{
+            "agents": [self.agent_names.get(agent_id, agent_id) for agent_id in mask_agents(int(masks[i]))],
+            "games": int(counts[i]),
+            "win_rate": float(wins[i] / decided[i]) if decided[i] else None,
+        } for i in order]
+
+    def win_rate(self, agent_ids, map_id=None, tour_split_id=None):
+        selected = self._filter(map_id, tour_split_id) & (self.mask == comp_mask(agent_ids))
+        won = self.won[selected]
+        decided = np.count_nonzero(won >= 0)
+        return {"games": int(np.count_nonzero(selected)),
+                "win_rate": float(np.count_nonzero(won == 1) / decided) if decided else None}
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        backfill_from_game_players()
+    else:
+        index = CompIndex().load()
+        map_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+        for comp in index.most_played(map_id=map_id):
+            print(f"{comp['games']:5d}  {comp['win_rate']}  {', '.join(map(str, comp['agents']))}")
@@ -1,10 +1,90 @@
 import os
 import sys
+import time
+import argparse
+import statistics
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {value}")
+    return number
+
+def report(label, timings):
+    if not timings:
+        print(f"{label}: skipped (0 samples)")
+        return
+    ms = [t * 1000 for t in timings]
+    print(f"{label}: p50 {percentile(ms, 50):.2f}ms, p99 {percentile(ms, 99):.2f}ms, "
+          f"min {min(ms):.2f}ms, max {max(ms):.2f}ms over {len(ms)} samples")
+
+def measure_connect(database_url, samples):
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        conn = psycopg2.connect(database_url)
+        timings.append(time.perf_counter() - start)
+        conn.close()
+    report("Connect time", timings)
+
+def measure_pings(conn, samples):
+    cursor = conn.cursor()
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        cursor.execute("SELECT 1;")
+        cursor.fetchone()
+        timings.append(time.perf_counter() - start)
+    cursor.close()
+    report("Round trip (SELECT 1)", timings)
+
+def measure_inserts(conn, rows):
+    # Scratch table lives only for this session, so nothing is left behind
+    cursor = conn.cursor()
+    table = sql.Identifier('connection_probe_scratch')
+    cursor.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} (id INTEGER, value DOUBLE PRECISION, label TEXT)").format(table))
+    conn.commit()
+    data = [(i, i * 0.5, f"row {i}") for i in range(rows)]
+
+    # One row and one commit per statement, like the ORM write path in tour_split_scrape.py
+    start = time.perf_counter()
+    for row in data:
+        cursor.execute(sql.SQL("INSERT INTO {} VALUES (%s, %s, %s)").format(table), row)
+        conn.commit()
+    single = time.perf_counter() - start
+    print(f"Single-row inserts: {rows / single:.0f} rows/s ({single / rows * 1000:.2f}ms per row)")
+
+    cursor.execute(sql.SQL("TRUNCATE {}").format(table))
+    conn.commit()
+
+    # Multi-row VALUES in pages, one commit
+    start = time.perf_counter()
+    execute_values(cursor, sql.SQL("INSERT INTO {} VALUES %s").format(table).as_string(conn), data, page_size=1000)
+    conn.commit()
+    batched = time.perf_counter() - start
+    print(f"Batched inserts: {rows / batched:.0f} rows/s ({batched / single * 100:.1f}% of single-row time)")
+
+    cursor.execute(sql.SQL("DROP TABLE {}").format(table))
+    conn.commit()
+    cursor.close()
+
 def main():
+    parser = argparse.ArgumentParser(description="Check connectivity and latency to the PostgreSQL database.")
+    parser.add_argument('--pings', type=non_negative_int, default=200, help="Number of SELECT 1 round trips (0 to skip)")
+    parser.add_argument('--connects', type=non_negative_int, default=5, help="Number of fresh connections to time (0 to skip)")
+    parser.add_argument('--rows', type=non_negative_int, default=500, help="Rows for the insert throughput test (0 to skip)")
+    parser.add_argument('--warm-pool', action='store_true', help="Also open the shared SQLAlchemy pool")
+    args = parser.parse_args()
+
     # Load environment variables from .env file
     load_dotenv()
 
@@ -17,19 +97,31 @@ def main():
 
     try:
         # Connect to the PostgreSQL database
+        start = time.perf_counter()
         conn = psycopg2.connect(DATABASE_URL)
-        print("Connection to PostgreSQL DB successful.")
+        print(f"Connection to PostgreSQL DB successful ({(time.perf_counter() - start) * 1000:.1f}ms).")
 
         # Optionally, execute a simple query
         cursor = conn.cursor()
         cursor.execute("SELECT version();")
         record = cursor.fetchone()
         print("PostgreSQL database version:", record[0])
-
-        # Close the cursor and connection
         cursor.close()
+
+        measure_connect(DATABASE_URL, args.connects)
+        measure_pings(conn, args.pings)
+        if args.rows:
+            measure_inserts(conn, args.rows)
+
+        # Close the connection
         conn.close()
 
+        if args.warm_pool:
+            from models import engine, warm_pool
+            start = time.perf_counter()
+            opened = warm_pool(engine)
+            print(f"Warmed {opened} pooled connections in {(time.perf_counter() - start) * 1000:.1f}ms.")
+
     except psycopg2.Error as e:
         print("Error connecting to PostgreSQL database:")
         print(e)
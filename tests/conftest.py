@@ -0,0 +1,114 @@
+# tests/conftest.py
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# models.py and tour_split_scrape.py read these on import, and load_dotenv() never overrides a variable that is
+# already set, so no test can reach a real database, MongoDB, S3 or vlr.gg. Modules imported in-process share
+# one scratch SQLite database; crawls run in subprocesses with a database of their own.
+SCRATCH = tempfile.mkdtemp(prefix='vlr_tests_')
+ISOLATED_ENV = {
+    'DATABASE_URL': f"sqlite:///{SCRATCH}/shared.db",
+    'VLR_BASE_URL': 'http://127.0.0.1:9',
+    'MONGODB_URI': '',
+    'ARCHIVE_BUCKET': '',
+    'STAT_STORE_DIR': '',
+    'PAGE_ARCHIVE_DIR': '',
+    'REPLAY_ARCHIVE_DIR': '',
+    'QUEUE_DATABASE_URL': '',
+    'MEMORY_BOUNDED': '',
+    'SIMILARITY_LIVE': '',
+    'MATCH_PARSER': 'dom',
+    'SKIP_UNCHANGED': '1',
+}
+os.environ.update(ISOLATED_ENV)
+
+# ----------------------- Replay Site -----------------------
+
+@pytest.fixture
+def replay_site():
+    # Factory: replay_site(tours=1, splits_per_tour=1, matches_per_split=5, config=dict(...)) -> (base_url, stats, site)
+    from replay_server import SyntheticSite, ReplayConfig, start_server
+    servers = []
+
+    def start(config=None, site=None, **site_kwargs):
+        site = site or SyntheticSite(**{"tours": 1, "splits_per_tour": 1, "matches_per_split": 5, **site_kwargs})
+        server, base_url, stats = start_server(ReplayConfig(site=site, **(config or {})))
+        servers.append(server)
+        return base_url, stats, site
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+# ----------------------- PostgreSQL -----------------------
+
+@pytest.fixture
+def postgres_url():
+    # A fresh database on the server named by TEST_POSTGRES_URL, dropped afterwards; skipped without a server
+    import uuid
+    from sqlalchemy.engine import make_url
+    server_url = os.getenv('TEST_POSTGRES_URL')
+    if not server_url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    admin = create_engine(server_url, isolation_level='AUTOCOMMIT')
+    try:
+        admin.connect().close()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL at TEST_POSTGRES_URL is not reachable: {e}")
+    name = f"vlr_test_{uuid.uuid4().hex[:8]}"
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    yield make_url(server_url).set(database=name).render_as_string(hide_password=False)
+    with admin.connect() as conn:
+        conn.execute(text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                          "WHERE datname = :name AND pid <> pg_backend_pid()"), {"name": name})
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+    admin.dispose()
+
+# ----------------------- Subprocess Runs -----------------------
+
+@pytest.fixture
+def scraper_env(tmp_path):
+    # Factory: environment for a scraper subprocess with its own SQLite database under tmp_path
+    def build(base_url, name='crawl', **extra):
+        env = dict(os.environ, **ISOLATED_ENV)
+        env.update(DATABASE_URL=f"sqlite:///{tmp_path}/{name}.db", VLR_BASE_URL=base_url)
+        env.update({key: str(value) for key, value in extra.items()})
+        return env
+    return build
+
+def run_python(args, env, check=True, timeout=300):
+    # python <args> from the repository root; returns the CompletedProcess with text output
+    result = subprocess.run([sys.executable] + list(args), cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=timeout)
+    if check and result.returncode != 0:
+        raise AssertionError(f"{' '.join(args)} exited {result.returncode}:\n{result.stdout[-3000:]}\n{result.stderr[-3000:]}")
+    return result
+
+def crawl_tour(env, tour_url, mode='sequential'):
+    # One tour through tour_split_scrape, recursively or through the frontier
+    call = f"scrape_tour_data({tour_url!r})" if mode == 'sequential' else f"crawl([{tour_url!r}], workers=4)"
+    return run_python(['-c', f"import tour_split_scrape as t; t.{call}"], env)
+
+def db_totals(database_url):
+    # (matches, game player rows, summed kills, stored fingerprints) of a scraper database
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        counts = tuple(conn.execute(text(sql)).scalar() or 0 for sql in (
+            "SELECT count(*) FROM matches",
+            "SELECT count(*) FROM game_players",
+            "SELECT sum(both_kills) FROM game_players",
+            "SELECT count(*) FROM page_fingerprints",
+        ))
+    engine.dispose()
+    return counts
@@ -0,0 +1,82 @@
+# tests/test_aggregates.py
+
+import json
+import re
+
+from sqlalchemy import create_engine, text
+
+from conftest import run_python, crawl_tour
+from replay_server import SyntheticSite
+
+SIDE_SPAN = re.compile(r'<span class="side mod-side mod-t">[^<]*</span>')
+KILLS_CELL = re.compile(r'(mod-vlr-kills"><span class="stats-sq"><span class="side mod-side mod-both">)(\d+)')
+
+class RescrapedSite(SyntheticSite):
+    # The first player of every match reports no side data; once `bumped`, the first match's kills change
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.bumped = False
+
+    def match_page(self, match_id):
+        page = super().match_page(match_id)
+        if page is None:
+            return None
+        head, row, rest = page.partition('<tr><td class="mod-player">')
+        page = head + row + SIDE_SPAN.sub('', rest.split('</tr>', 1)[0]) + '</tr>' + rest.split('</tr>', 1)[1]
+        if self.bumped and match_id % 10000 == 0:
+            page = KILLS_CELL.sub(lambda m: m.group(1) + str(int(m.group(2)) + 7), page, count=3)
+        return page
+
+def aggregate_rows(database_url):
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = {table: sorted(tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                              for row in conn.execute(text(f"SELECT * FROM {table}")))
+                for table in ('player_split_stats', 'team_split_stats')}
+    engine.dispose()
+    return rows
+
+def test_incremental_aggregates_match_a_rebuild(replay_site, scraper_env):
+    site = RescrapedSite(tours=1, splits_per_tour=1, matches_per_split=4)
+    base_url, _, _ = replay_site(site=site)
+    env = scraper_env(base_url)
+    tour_url = site.tour_urls(base_url)[0]
+    crawl_tour(env, tour_url)
+    before = aggregate_rows(env['DATABASE_URL'])
+
+    # A forced re-scrape updates every game_players row in place; only the first match's kills changed
+    site.bumped = True
+    crawl_tour(dict(env, SKIP_UNCHANGED='0'), tour_url)
+    incremental = aggregate_rows(env['DATABASE_URL'])
+    assert incremental != before
+
+    run_python(['aggregates.py', 'rebuild'], env)
+    assert aggregate_rows(env['DATABASE_URL']) == incremental
+
+def test_side_averages_use_games_with_side_data(replay_site, scraper_env):
+    site = RescrapedSite(tours=1, splits_per_tour=1, matches_per_split=4)
+    base_url, _, _ = replay_site(site=site)
+    env = scraper_env(base_url)
+    crawl_tour(env, site.tour_urls(base_url)[0])
+
+    engine = create_engine(env['DATABASE_URL'])
+    with engine.connect() as conn:
+        # A player with games both with and without side data
+        player_id, games, side_games, ct_kills, both_kills = conn.execute(text(
+            "SELECT player_id, count(*), sum(ct_and_t_data), sum(ct_kills), sum(both_kills) FROM game_players "
+            "GROUP BY player_id HAVING sum(ct_and_t_data) BETWEEN 1 AND count(*) - 1 ORDER BY player_id")).first()
+        team_id = conn.execute(text("SELECT team_id FROM game_players WHERE player_id = :p"), {"p": player_id}).scalar()
+        team_side, team_ct_kills = conn.execute(text(
+            "SELECT sum(ct_and_t_data), sum(ct_kills) FROM game_players WHERE team_id = :t"), {"t": team_id}).first()
+    engine.dispose()
+
+    result = run_python(['-c', "import json, aggregates, read_api; from models import engine; conn = engine.connect(); "
+                               f"print(json.dumps([aggregates.get_player_stats({player_id}), aggregates.get_team_stats({team_id}), "
+                               f"read_api.player_stats(conn, {player_id}, {{}})]))"], env)
+    player, team, served = json.loads(result.stdout.splitlines()[-1])
+    # read_api serves the same averages
+    assert served['ct_kills'] == player['ct_kills']
+    assert (player['games'], player['side_games']) == (games, side_games)
+    assert player['ct_kills'] == ct_kills / side_games
+    assert player['both_kills'] == both_kills / games
+    assert team['ct_kills'] == team_ct_kills / team_side
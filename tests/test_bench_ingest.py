@@ -0,0 +1,29 @@
+# tests/test_bench_ingest.py
+
+import json
+import os
+
+from conftest import run_python, ISOLATED_ENV
+
+def test_reused_database_is_reset_between_runs(tmp_path):
+    env = dict(os.environ, **ISOLATED_ENV)
+    database_url = f"sqlite:///{tmp_path}/bench.db"
+    results = []
+    for run in range(2):
+        path = tmp_path / f"run{run}.json"
+        run_python(['bench_ingest.py', '--tours', '1', '--splits', '1', '--matches', '4',
+                    '--database-url', database_url, '--destructive', '--json', str(path)], env)
+        results.append(json.loads(path.read_text()))
+    # Row counts are totals, so compare the work done: a run that found the previous run's fingerprints
+    # would only fetch the tour page
+    assert results[0]["matches"] == results[1]["matches"] == 4
+    assert results[1]["http_requests_per_match"] == results[0]["http_requests_per_match"]
+    assert results[1]["commits_per_match"] == results[0]["commits_per_match"]
+
+def test_database_url_needs_destructive(tmp_path):
+    env = dict(os.environ, **ISOLATED_ENV)
+    database = tmp_path / 'keep.db'
+    result = run_python(['bench_ingest.py', '--matches', '2', '--database-url', f"sqlite:///{database}"], env, check=False)
+    assert result.returncode == 2
+    assert '--destructive' in result.stderr
+    assert not database.exists()
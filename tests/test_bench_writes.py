@@ -0,0 +1,50 @@
+# tests/test_bench_writes.py
+
+import json
+import os
+
+from sqlalchemy import create_engine, text
+
+from conftest import ISOLATED_ENV, run_python
+from bench_writes import generate_rows
+
+def benchmark(env, *args):
+    call = f"import bench_writes, json; print(json.dumps(bench_writes.run_benchmark(5{''.join(', ' + a for a in args)})))"
+    return json.loads(run_python(['-c', call], env).stdout.splitlines()[-1])
+
+def test_every_strategy_writes_the_generated_rows():
+    total = sum(len(rows) for _, rows in generate_rows(5))
+    dialect, results = benchmark(dict(os.environ, **ISOLATED_ENV))
+    assert dialect == 'sqlite'
+    assert [result["strategy"] for result in results] == ['orm_per_row', 'orm_batch', 'core_bulk']
+    assert {result["rows"] for result in results} == {total}
+    # One commit per object against one for the batch; core_bulk adds the rebuild's
+    assert results[0]["transactions"] >= total and results[1]["transactions"] == 1
+    # Every strategy pays for the aggregates: the ORM through the listeners, core_bulk with a rebuild
+    assert [result["aggregates"] for result in results] == ['per row', 'per row', 'rebuild']
+
+def test_refuses_a_database_without_destructive(tmp_path):
+    url = f"sqlite:///{tmp_path}/keep.db"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE players (player_id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO players VALUES (1, 'keep')"))
+
+    env = dict(os.environ, **ISOLATED_ENV)
+    result = run_python(['bench_writes.py', '--matches', '5', '--database-url', url], env, check=False)
+    assert result.returncode == 2 and '--destructive' in result.stderr
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM players")).scalars().all() == ['keep']
+
+    run_python(['bench_writes.py', '--matches', '5', '--database-url', url, '--destructive'], env)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM players")).scalar() == 64 * 5
+    engine.dispose()
+
+def test_copy_on_postgres(postgres_url):
+    total = sum(len(rows) for _, rows in generate_rows(5))
+    dialect, results = benchmark(dict(os.environ, **ISOLATED_ENV), repr(None), repr(postgres_url), '0', 'True')
+    assert dialect == 'postgresql'
+    assert [result["strategy"] for result in results] == ['orm_per_row', 'orm_batch', 'core_bulk', 'copy']
+    assert {result["rows"] for result in results} == {total}
+    assert results[-1]["aggregates"] == 'rebuild'
@@ -0,0 +1,47 @@
+# tests/test_cleandb.py
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from conftest import run_python, crawl_tour, db_totals
+
+def table_rows(database_url, table):
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        count = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+    engine.dispose()
+    return count
+
+def test_reset_clears_fingerprints_so_the_next_crawl_ingests_again(replay_site, scraper_env):
+    base_url, _, site = replay_site(matches_per_split=5)
+    env = scraper_env(base_url)
+    tour_url = site.tour_urls(base_url)[0]
+
+    crawl_tour(env, tour_url)
+    assert db_totals(env['DATABASE_URL'])[0] == 5
+
+    engine = create_engine(env['DATABASE_URL'])
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO live_matches (match_id, url, status, next_poll, finished) "
+                          "VALUES (1, '/1/a-vs-b', 'live', :now, 0)"), {"now": datetime.utcnow()})
+    engine.dispose()
+    run_python(['work_queue.py', 'seed', tour_url], env)
+
+    run_python(['cleanDB.py', 'reset', '--skip-mongo'], env)
+    assert db_totals(env['DATABASE_URL']) == (0, 0, 0, 0)
+    assert table_rows(env['DATABASE_URL'], 'live_matches') == 0
+    assert table_rows(env['DATABASE_URL'], 'crawl_queue') == 0
+
+    crawl_tour(env, tour_url)
+    assert db_totals(env['DATABASE_URL'])[0] == 5
+
+def test_reset_clears_a_separate_queue_database(tmp_path, replay_site, scraper_env):
+    base_url, _, site = replay_site()
+    queue_url = f"sqlite:///{tmp_path}/queue.db"
+    env = scraper_env(base_url, QUEUE_DATABASE_URL=queue_url)
+    run_python(['work_queue.py', 'seed', site.tour_urls(base_url)[0]], env)
+    assert table_rows(queue_url, 'crawl_queue') == 1
+
+    run_python(['cleanDB.py', 'reset', '--skip-mongo'], env)
+    assert table_rows(queue_url, 'crawl_queue') == 0
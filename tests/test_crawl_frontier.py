@@ -0,0 +1,50 @@
+# tests/test_crawl_frontier.py
+
+from collections import Counter
+
+from conftest import run_python, crawl_tour, db_totals
+
+SITE_KWARGS = {"splits_per_tour": 2, "matches_per_split": 6}
+
+def record_paths(site):
+    # Every path the site renders, in arrival order
+    paths = []
+    render = site.render
+
+    def recording_render(path):
+        paths.append(path)
+        return render(path)
+
+    site.render = recording_render
+    return paths
+
+def test_frontier_crawl_matches_the_sequential_crawl(replay_site, scraper_env):
+    base_url, _, site = replay_site(**SITE_KWARGS)
+    env = scraper_env(base_url, name='sequential')
+    crawl_tour(env, site.tour_urls(base_url)[0])
+    expected = db_totals(env['DATABASE_URL'])
+    assert expected[0] == 12
+
+    base_url, _, site = replay_site(**SITE_KWARGS)
+    paths = record_paths(site)
+    env = scraper_env(base_url, name='frontier')
+    # The same tour queued twice is admitted once
+    tour_url = site.tour_urls(base_url)[0]
+    result = run_python(['-c', f"import tour_split_scrape as t; t.crawl([{tour_url!r}, {tour_url!r}], workers=4)"], env)
+
+    assert db_totals(env['DATABASE_URL']) == expected
+    frontier_pages = Counter(path for path in paths if not path.startswith(('/team/', '/player/')))
+    assert frontier_pages and max(frontier_pages.values()) == 1
+    assert '1 duplicate URLs skipped, 0 failed.' in result.stdout
+
+def test_unchanged_pages_are_not_crawled_again(replay_site, scraper_env):
+    base_url, _, site = replay_site(**SITE_KWARGS)
+    env = scraper_env(base_url)
+    crawl_tour(env, site.tour_urls(base_url)[0], mode='frontier')
+    expected = db_totals(env['DATABASE_URL'])
+
+    paths = record_paths(site)
+    crawl_tour(env, site.tour_urls(base_url)[0], mode='frontier')
+    assert db_totals(env['DATABASE_URL']) == expected
+    # Only the tour page is fetched; its fingerprint is unchanged, so no split or match is queued
+    assert [path for path in paths if not path.startswith(('/team/', '/player/'))] == [site.tour_urls('')[0]]
@@ -0,0 +1,85 @@
+# tests/test_export_parquet.py
+
+import os
+from decimal import Decimal
+
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, update
+
+from conftest import ISOLATED_ENV, run_python
+from models import Base, Tour, Tour_Split, Match, Game, GamePlayer
+
+def add_match(conn, match_id, split_id):
+    conn.execute(Match.__table__.insert(), [{"match_id": match_id, "tour_split_id": split_id}])
+    conn.execute(Game.__table__.insert(), [{"game_id": match_id * 10, "match_id": match_id, "map_id": 1}])
+    conn.execute(GamePlayer.__table__.insert(), [{"game_id": match_id * 10, "player_id": p, "both_kills": 10}
+                                                 for p in range(1, 11)])
+
+def exported(out, table, column='match_id'):
+    # (split id, column) of every exported row, from the partition directories
+    rows = []
+    for root, _, files in os.walk(os.path.join(out, table)):
+        for name in files:
+            if name.endswith('.parquet'):
+                split_id = int(root.rsplit('tour_split_id=', 1)[1])
+                rows += [(split_id, value) for value in pq.read_table(os.path.join(root, name))[column].to_pylist()]
+    return sorted(rows)
+
+def test_incremental_export_picks_up_grown_splits(tmp_path):
+    url = f"sqlite:///{tmp_path}/export.db"
+    out = str(tmp_path / 'parquet')
+    env = dict(os.environ, **{**ISOLATED_ENV, "DATABASE_URL": url})
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Tour.__table__.insert(), [{"tour_id": 1, "name": "Tour"}])
+        conn.execute(Tour_Split.__table__.insert(), [{"external_split_id": s, "tour_id": 1, "prize_pool": Decimal('2250000.00')}
+                                                     for s in (1, 2)])
+        for match_id, split_id in ((101, 1), (201, 2), (901, None)):
+            add_match(conn, match_id, split_id)
+
+    run_python(['export_parquet.py', '--out', out, '--incremental'], env)
+    assert exported(out, 'matches') == [(0, 901), (1, 101), (2, 201)]
+    splits = pq.read_table(os.path.join(out, 'tour_splits', 'part-0.parquet'))
+    assert splits['prize_pool'].to_pylist() == [Decimal('2250000.00')] * 2
+    split_2 = os.path.join(out, 'matches', 'tour_id=1', 'tour_split_id=2', 'part-0.parquet')
+    written = os.stat(split_2).st_mtime_ns
+
+    # Split 1 and the matches without a split grow; split 2 does not
+    with engine.begin() as conn:
+        add_match(conn, 102, 1)
+        add_match(conn, 902, None)
+    result = run_python(['export_parquet.py', '--out', out, '--incremental'], env)
+
+    assert exported(out, 'matches') == [(0, 901), (0, 902), (1, 101), (1, 102), (2, 201)]
+    assert len(exported(out, 'game_players', 'game_id')) == 50
+    assert os.stat(split_2).st_mtime_ns == written
+    # Changed splits are rewritten whole
+    assert "Exported 4 rows from matches across 2 splits." in result.stdout
+
+    result = run_python(['export_parquet.py', '--out', out, '--incremental'], env)
+    assert "No changed splits in matches." in result.stdout
+    engine.dispose()
+
+def test_incremental_export_picks_up_rows_rewritten_in_place(tmp_path):
+    url = f"sqlite:///{tmp_path}/export.db"
+    out = str(tmp_path / 'parquet')
+    env = dict(os.environ, **{**ISOLATED_ENV, "DATABASE_URL": url})
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Tour.__table__.insert(), [{"tour_id": 1, "name": "Tour"}])
+        conn.execute(Tour_Split.__table__.insert(), [{"external_split_id": s, "tour_id": 1} for s in (1, 2)])
+        add_match(conn, 101, 1)
+        add_match(conn, 201, 2)
+    run_python(['export_parquet.py', '--out', out, '--incremental'], env)
+
+    # A re-scrape upserts split 1's stats: same row count, same matches
+    with engine.begin() as conn:
+        conn.execute(update(GamePlayer).where(GamePlayer.game_id == 1010, GamePlayer.player_id == 3).values(both_kills=25))
+    result = run_python(['export_parquet.py', '--out', out, '--incremental'], env)
+
+    assert "Exported 10 rows from game_players across 1 splits." in result.stdout
+    assert "No changed splits in matches." in result.stdout
+    assert sorted(exported(out, 'game_players', 'both_kills')) == [(1, 10)] * 9 + [(1, 25)] + [(2, 10)] * 10
+    engine.dispose()
@@ -0,0 +1,107 @@
+# tests/test_live_matches.py
+
+from datetime import datetime
+
+import requests
+from sqlalchemy import create_engine, text
+
+from conftest import run_python, crawl_tour
+from replay_server import SyntheticSite
+
+def test_failing_polls_back_off_and_give_up():
+    import live_matches
+    from models import engine, session, Base
+    Base.metadata.create_all(engine)
+
+    def failing_fetch(url, headers=None):
+        raise requests.ConnectionError("connection refused")
+
+    match_id = 990001
+    live_matches.track(match_id, f"/{match_id}/a-vs-b", 1, live_matches.LIVE_STATUS)
+    for attempt in range(1, live_matches.MAX_FAILURES + 1):
+        live = session.get(live_matches.LiveMatch, match_id)
+        live.next_poll = datetime.utcnow()
+        session.commit()
+        assert live_matches.poll_due(failing_fetch, 'http://127.0.0.1:9', lambda *args, **kwargs: None) == 1
+        live = session.get(live_matches.LiveMatch, match_id)
+        assert live.failures == attempt
+        # The failed match is not due again straight away
+        assert live.next_poll > datetime.utcnow()
+        assert live.interval == min(live_matches.MAX_INTERVAL, live_matches.LIVE_INTERVAL * 2 ** attempt)
+    assert live.finished
+    assert live_matches.poll_due(failing_fetch, 'http://127.0.0.1:9', lambda *args, **kwargs: None) == 0
+
+class LiveSite(SyntheticSite):
+    def __init__(self, live_match, **kwargs):
+        super().__init__(**kwargs)
+        self.live_match = live_match
+        self.status = 'live'
+
+    def match_status(self, match_id):
+        return self.status if match_id == self.live_match else 'final'
+
+def test_live_match_is_polled_until_final(replay_site, scraper_env):
+    live_match = SyntheticSite().split_id(0, 0) * 10000 + 2
+    site = LiveSite(live_match, tours=1, splits_per_tour=1, matches_per_split=4)
+    base_url, stats, _ = replay_site(site=site)
+    env = scraper_env(base_url)
+    crawl_tour(env, site.tour_urls(base_url)[0])
+
+    engine = create_engine(env['DATABASE_URL'])
+
+    def poll_once():
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE live_matches SET next_poll = :now"), {"now": datetime.utcnow()})
+        run_python(['live_matches.py', '--once'], env)
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT match_id, status, finished, polls FROM live_matches")).one()
+
+    assert poll_once()[:3] == (live_match, 'live', False)
+    # Unchanged page: answered 304 from its ETag
+    poll_once()
+    assert stats.snapshot()['statuses'].get(304) == 1
+    site.status = 'final'
+    assert poll_once() == (live_match, 'final', True, 3)
+    engine.dispose()
+
+def test_throttled_poll_waits_as_asked():
+    import live_matches
+    from models import engine, session, Base
+    Base.metadata.create_all(engine)
+
+    def throttled_fetch(url, headers=None):
+        # What tour_split_scrape.fetch raises for a 429
+        response = requests.Response()
+        response.status_code = 429
+        response.headers['Retry-After'] = '90'
+        raise requests.HTTPError("429 fetching " + url, response=response)
+
+    match_id = 990002
+    live_matches.track(match_id, f"/{match_id}/a-vs-b", 1, live_matches.LIVE_STATUS)
+    live = session.get(live_matches.LiveMatch, match_id)
+    live.next_poll = datetime.utcnow()
+    session.commit()
+    assert live_matches.poll_due(throttled_fetch, 'http://127.0.0.1:9', lambda *args, **kwargs: None) == 1
+    live = session.get(live_matches.LiveMatch, match_id)
+    assert (live.interval, live.failures or 0, live.polls) == (90, 0, 1)
+    live.finished = True
+    session.commit()
+
+def test_polls_go_through_the_shared_fetch(replay_site, scraper_env, tmp_path):
+    live_match = SyntheticSite().split_id(0, 0) * 10000 + 1
+    site = LiveSite(live_match, tours=1, splits_per_tour=1, matches_per_split=3)
+    base_url, stats, _ = replay_site(site=site)
+    archive_dir = str(tmp_path / 'archive')
+    env = scraper_env(base_url, PAGE_ARCHIVE_DIR=archive_dir)
+    crawl_tour(env, site.tour_urls(base_url)[0])
+
+    # Replaying the archive: the poll is answered from it, not by the site
+    engine = create_engine(env['DATABASE_URL'])
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE live_matches SET next_poll = :now"), {"now": datetime.utcnow()})
+    requests_before = stats.snapshot()['requests']
+    run_python(['live_matches.py', '--once'], dict(env, PAGE_ARCHIVE_DIR='', REPLAY_ARCHIVE_DIR=archive_dir))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT polls, failures FROM live_matches")).one() == (1, 0)
+    engine.dispose()
+    assert stats.snapshot()['requests'] == requests_before
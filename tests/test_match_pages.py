@@ -0,0 +1,68 @@
+# tests/test_match_pages.py
+
+import os
+
+import pytest
+
+import match_pages
+from conftest import ROOT
+from match_pages import parse_match_dom, parse_match_lexer, record_json, diff_records, match_status
+from replay_server import SyntheticSite
+
+SITE = SyntheticSite(matches_per_split=6)
+MATCH_IDS = [SITE.split_id(0, 0) * 10000 + m for m in range(6)]
+
+def synthetic_page(match_id=MATCH_IDS[0]):
+    return SITE.match_page(match_id)
+
+def with_comments(page):
+    # Stale markup left in comments: a header, a game block, a stat row and a comment inside a team name
+    stale_header = ('<!-- <div class="match-header-vs"><a class="match-header-link" href="/team/999/old">'
+                    '<div class="match-header-link-name mod-1"><div class="wf-title-med">Old</div></div></a>'
+                    '<div class="match-header-vs-score"><div class="match-header-vs-note">live</div></div></div> -->')
+    stale_game = '<!-- <div class="vm-stats-game" data-game-id="42"><div class="map"><span>Old</span></div></div> -->'
+    page = page.replace('<body>', '<body>' + stale_header, 1)
+    page = page.replace('<div class="vm-stats">', '<div class="vm-stats">' + stale_game, 1)
+    page = page.replace('<tbody>', '<tbody><!-- <tr><td><a href="/player/1/old"></a></td></tr> -->', 1)
+    return page.replace('>Team ', '>Team <!-- renamed -->', 1)
+
+def assert_same(page):
+    diffs = diff_records(record_json(parse_match_dom(page)), record_json(parse_match_lexer(page)))
+    assert diffs == []
+
+def test_parsers_agree_on_the_recorded_page():
+    with open(os.path.join(ROOT, 'test.html'), 'rb') as f:
+        page = f.read()
+    assert len(parse_match_lexer(page)["games"]) > 0
+    assert_same(page)
+
+@pytest.mark.parametrize('match_id', MATCH_IDS)
+def test_parsers_agree_on_synthetic_pages(match_id):
+    assert_same(synthetic_page(match_id))
+
+@pytest.mark.parametrize('match_id', MATCH_IDS[:2])
+def test_lexer_skips_comments(match_id):
+    page = with_comments(synthetic_page(match_id))
+    assert_same(page)
+    record = parse_match_lexer(page)
+    assert record_json(record) == record_json(parse_match_lexer(synthetic_page(match_id)))
+    assert '42' not in [game["game_id"] for game in record["games"]]
+    assert match_status(page) == match_status(synthetic_page(match_id))
+
+def test_team_links_are_searched_from_the_header(monkeypatch):
+    # Navigation links before the header are not candidates for the team links' enclosing <a>
+    nav = '<div class="nav">' + ''.join(f'<a href="/nav/{i}">{i}</a>' for i in range(500)) + '</div>'
+    page = synthetic_page().replace('<body>', '<body>' + nav, 1)
+    close = match_pages._close
+    closed = []
+
+    def counting_close(page, tag, open_end, end):
+        closed.append(tag)
+        return close(page, tag, open_end, end)
+
+    monkeypatch.setattr(match_pages, '_close', counting_close)
+    record = parse_match_lexer(page)
+    assert record["team_links"][0].startswith('/team/')
+    assert closed.count('a') <= 4
+    monkeypatch.undo()
+    assert_same(page)
@@ -0,0 +1,30 @@
+# tests/test_memory_bounded.py
+
+from conftest import run_python, crawl_tour, db_totals
+
+SITE_KWARGS = {"tours": 3, "matches_per_split": 3}
+
+def sequential_totals(replay_site, scraper_env):
+    base_url, _, site = replay_site(**SITE_KWARGS)
+    env = scraper_env(base_url, name='sequential')
+    run_python(['-c', f"import tour_split_scrape as t; [t.scrape_tour_data(url) for url in {site.tour_urls(base_url)!r}]"], env)
+    return db_totals(env['DATABASE_URL'])
+
+def test_bounded_crawls_store_the_same_data(replay_site, scraper_env):
+    expected = sequential_totals(replay_site, scraper_env)
+    assert expected[0] == 9
+
+    # MEMORY_BOUNDED=1 on the recursive crawl
+    base_url, _, site = replay_site(**SITE_KWARGS)
+    env = scraper_env(base_url, name='env', MEMORY_BOUNDED=1, SESSION_BATCH=2)
+    output = ''.join(crawl_tour(env, url).stdout for url in site.tour_urls(base_url))
+    assert db_totals(env['DATABASE_URL']) == expected
+    assert 'Recycled the session after 2 matches' in output
+
+    # --bounded on the frontier crawl of the command line, over the same tours under their vlr.gg names
+    base_url, _, _ = replay_site(**SITE_KWARGS)
+    env = scraper_env(base_url, name='flag', SESSION_BATCH=2)
+    result = run_python(['tour_split_scrape.py', '--bounded', '--workers', '4', '--track-memory'], env)
+    assert db_totals(env['DATABASE_URL']) == expected
+    assert 'Recycled the session after 8 matches' in result.stdout
+    assert 'An error occurred' not in result.stdout
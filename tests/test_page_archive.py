@@ -0,0 +1,44 @@
+# tests/test_page_archive.py
+
+import pytest
+
+from conftest import run_python, crawl_tour, db_totals
+
+def test_reingest_reproduces_the_crawl_without_the_site(replay_site, scraper_env, tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    base_url, stats, site = replay_site()
+    tour_url = site.tour_urls(base_url)[0]
+    env = scraper_env(base_url, PAGE_ARCHIVE_DIR=archive_dir)
+    crawl_tour(env, tour_url)
+    expected = db_totals(env['DATABASE_URL'])
+    requests = stats.snapshot()['requests']
+
+    # A fresh database and no reachable site: every page comes from the archive
+    env = scraper_env('http://127.0.0.1:9', name='reingest')
+    run_python(['page_archive.py', 'reingest', tour_url, '--dir', archive_dir], env)
+
+    assert db_totals(env['DATABASE_URL']) == expected
+    assert stats.snapshot()['requests'] == requests
+
+def test_reingest_cleans_up_when_the_scrape_fails(monkeypatch, tmp_path):
+    import fingerprints
+    import page_archive
+    import tour_split_scrape
+    closed = []
+
+    class Sink:
+        def close(self):
+            closed.append('sink')
+
+    def failing_scrape(tour_url):
+        raise RuntimeError("parser bug")
+
+    monkeypatch.setattr(tour_split_scrape, 'games_sink', Sink())
+    monkeypatch.setattr(tour_split_scrape, 'close_archives', lambda: closed.append('archives'))
+    monkeypatch.setattr(tour_split_scrape, 'scrape_tour_data', failing_scrape)
+    with pytest.raises(RuntimeError):
+        page_archive.reingest(str(tmp_path), ['http://127.0.0.1:9/event/1'])
+
+    assert closed == ['sink', 'archives']
+    assert tour_split_scrape.replay_archive is None
+    assert fingerprints.ENABLED
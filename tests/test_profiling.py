@@ -0,0 +1,24 @@
+# tests/test_profiling.py
+
+import json
+import pstats
+
+from conftest import run_python
+
+def test_profile_run_writes_stats_and_summary(replay_site, scraper_env, tmp_path):
+    base_url, stats, _ = replay_site()
+    path = tmp_path / 'profiles' / 'scrape'
+    result = run_python(['scrape.py', '--profile', str(path)], scraper_env(base_url))
+
+    assert 'An error occurred' not in result.stdout
+    assert stats.snapshot()['requests'] > 0
+    assert f"Profile written to {path}.prof" in result.stdout
+    assert pstats.Stats(f"{path}.prof").total_calls > 0
+    with open(f"{path}.json") as f:
+        summary = json.load(f)
+    assert summary['entry_point'] == 'scrape'
+    assert summary['wall_seconds'] > 0 and summary['top']
+
+    # The summary round-trips through the show command
+    shown = run_python(['profiling.py', 'show', f"{path}.json"], scraper_env(base_url))
+    assert shown.stdout.startswith('Profile of scrape')
@@ -0,0 +1,58 @@
+# tests/test_read_api.py
+
+from sqlalchemy import update
+
+import aggregates
+import cleanDB
+import read_api
+from models import Base, Session, engine, Match, Game, GamePlayer
+from read_api import ReadService
+
+PLAYER, TEAM, MATCH = 5501, 5502, 5503
+
+def test_unknown_ids_are_not_found():
+    Base.metadata.create_all(engine)
+    service = ReadService(engine=engine, version_check=0)
+    assert service.query('/players/999999/stats', {})[0] == 404
+    assert service.query('/players/999999/stats', {'by': 'map'})[0] == 404
+    assert service.query('/teams/999999/stats', {})[0] == 404
+    # A filter that matches nothing is an empty result, not an unknown id
+    status, result = service.query('/players/999999/stats', {'split': '3'})
+    assert status == 200 and result['games'] == 0
+
+def test_cache_follows_ingestion_rebuilds_and_resets():
+    Base.metadata.create_all(engine)
+    service = ReadService(engine=engine, version_check=0)
+    path = f'/players/{PLAYER}/stats'
+
+    # A scraper's session, as in tour_split_scrape and live_matches; the service only sees the database
+    session = Session()
+    read_api.attach_to_ingestion(session)
+    session.add_all([Match(match_id=MATCH), Game(game_id=MATCH, match_id=MATCH, map_id=1)])
+    session.commit()
+    player = GamePlayer(game_id=MATCH, player_id=PLAYER, team_id=TEAM, agent=1, both_kills=20, both_deaths=10)
+    session.add(player)
+    session.commit()
+    assert service.query(path, {})[1]['both_kills'] == 20
+    hits = service.cache.snapshot()['hits']
+    assert service.query(path, {})[1]['both_kills'] == 20
+    assert service.cache.snapshot()['hits'] == hits + 1
+
+    # Re-scraped: loaded and overwritten, as insert_or_get_game_player does
+    player = session.query(GamePlayer).filter_by(game_id=MATCH, player_id=PLAYER).first()
+    player.both_kills = 30
+    session.commit()
+    session.close()
+    assert service.query(path, {})[1]['both_kills'] == 30
+
+    # A manual edit is only picked up by the aggregates rebuild, which must also drop the cache
+    with engine.begin() as conn:
+        conn.execute(update(GamePlayer).where(GamePlayer.player_id == PLAYER).values(both_kills=40))
+    assert service.query(path, {})[1]['both_kills'] == 30
+    aggregates.rebuild_aggregates()
+    assert service.query(path, {})[1]['both_kills'] == 40
+    assert service.query(f'/teams/{TEAM}/stats', {})[1]['both_kills'] == 40
+
+    cleanDB.reset_postgres(engine)
+    assert service.query(path, {})[0] == 404
+    assert service.query(f'/teams/{TEAM}/stats', {})[0] == 404
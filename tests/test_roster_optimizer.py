@@ -0,0 +1,53 @@
+# tests/test_roster_optimizer.py
+
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from roster_optimizer import PlayerPool, ROLES, optimize_rosters, synthetic_pool
+
+def brute_force(pool, k=10, max_per_region=None, min_game_changers=0, exclude=()):
+    # Every five-player set covering all four roles, scored and ranked
+    players = [i for i in range(len(pool)) if int(pool.ids[i]) not in set(exclude)]
+    rosters = []
+    for five in combinations(players, 5):
+        if set(pool.roles[i] for i in five) != set(ROLES):
+            continue
+        regions = [pool.regions[i] for i in five]
+        if max_per_region is not None and max(regions.count(region) for region in regions) > max_per_region:
+            continue
+        if sum(pool.game_changers[i] for i in five) < min_game_changers:
+            continue
+        rosters.append((sum(pool.scores[i] for i in five), sorted(int(pool.ids[i]) for i in five)))
+    rosters.sort(key=lambda roster: -roster[0])
+    return rosters[:k]
+
+@pytest.mark.parametrize("constraints", [
+    {},
+    {"max_per_region": 2},
+    {"min_game_changers": 2},
+    {"max_per_region": 2, "min_game_changers": 1, "exclude": (3, 7, 11)},
+    {"k": 25, "max_per_region": 1},
+])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_unpruned_search_matches_brute_force(seed, constraints):
+    pool = synthetic_pool(28, seed=seed)
+    rosters, _ = optimize_rosters(pool, candidates_per_role=len(pool), **constraints)
+    expected = brute_force(pool, **constraints)
+    assert [roster["player_ids"] for roster in rosters] == [player_ids for _, player_ids in expected]
+    assert np.allclose([roster["score"] for roster in rosters], [score for score, _ in expected])
+
+def test_bucket_pruning_can_miss_the_optimum():
+    # The two best players of every role share a region, and only one player per region is allowed
+    scores, roles, regions = [], [], []
+    for r, role in enumerate(ROLES):
+        scores += [10 - r, 9 - r, 1 - r / 10]
+        roles += [role] * 3
+        regions += ['EMEA', 'EMEA', f"Region {r}"]
+    pool = PlayerPool(np.arange(1, len(scores) + 1), scores, roles, regions, [False] * len(scores))
+
+    best, _ = optimize_rosters(pool, k=1, max_per_region=1, candidates_per_role=len(pool))
+    pruned, _ = optimize_rosters(pool, k=1, max_per_region=1, candidates_per_role=2)
+    assert best[0]["score"] == brute_force(pool, k=1, max_per_region=1)[0][0]
+    assert not pruned or pruned[0]["score"] < best[0]["score"]
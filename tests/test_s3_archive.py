@@ -0,0 +1,77 @@
+# tests/test_s3_archive.py
+
+import threading
+
+import boto3
+import pytest
+
+from s3_archive import S3PageArchive
+
+# moto is a test-only dependency; without it these tests skip
+moto = pytest.importorskip('moto')
+
+BUCKET = 'vlr-test-archive'
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+def page(i):
+    return f"<html><body>page {i} {'x' * (i % 50)}</body></html>"
+
+def test_pages_round_trip_through_the_archive(s3_client):
+    archive = S3PageArchive(s3_client, BUCKET, batch_bytes=300)
+    for i in range(40):
+        archive.add(f"https://www.vlr.gg/{i}", page(i))
+    archive.close()
+
+    reader = S3PageArchive(s3_client, BUCKET)
+    manifest = reader.load_manifest()
+    assert len(manifest) == 40
+    assert all(reader.get(f"https://www.vlr.gg/{i}", manifest) == page(i).encode('utf-8') for i in range(40))
+    snapshot = archive.snapshot()
+    assert snapshot["batches"] > 1 and snapshot["failed_batches"] == 0
+
+def test_concurrent_adds_upload_each_page_once(s3_client):
+    # Every page fills a batch, so threads hand off and submit batches concurrently
+    archive = S3PageArchive(s3_client, BUCKET, batch_bytes=1)
+
+    def add_pages(worker):
+        for i in range(worker * 25, worker * 25 + 25):
+            archive.add(f"https://www.vlr.gg/{i}", page(i))
+
+    threads = [threading.Thread(target=add_pages, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    archive.close()
+
+    lines = []
+    for obj in s3_client.list_objects_v2(Bucket=BUCKET, Prefix='vlr/pages/manifests/')['Contents']:
+        lines += s3_client.get_object(Bucket=BUCKET, Key=obj['Key'])['Body'].read().decode('utf-8').splitlines()
+    assert len(lines) == 200
+    assert len(S3PageArchive(s3_client, BUCKET).load_manifest()) == 200
+    assert archive.snapshot()["batches"] == archive.sequence
+
+class FailingClient:
+    # Every upload fails, as when the bucket is unreachable
+    def upload_fileobj(self, *args, **kwargs):
+        raise ConnectionError("endpoint unreachable")
+
+def test_failed_uploads_are_recorded_not_raised():
+    archive = S3PageArchive(FailingClient(), BUCKET, batch_bytes=100)
+    # More full batches than upload workers, so add() waits on failed uploads
+    for i in range(20):
+        archive.add(f"https://www.vlr.gg/{i}", page(i))
+    archive.close()
+    assert archive.snapshot()["failed_batches"] == len(archive.failed) == archive.sequence
+    assert sorted(url for batch in archive.failed for url in batch["urls"]) == \
+        sorted(f"https://www.vlr.gg/{i}" for i in range(20))
+    assert 'endpoint unreachable' in archive.failed[0]["error"]
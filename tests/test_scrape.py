@@ -0,0 +1,48 @@
+# tests/test_scrape.py
+
+import importlib
+import sys
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+@pytest.fixture
+def scrape(tmp_path, monkeypatch):
+    # scrape.py creates its own tables and MongoDB sink on import; both go to scratch stores here
+    import mongo_sink
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path}/scrape.db")
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://mongomock.test')
+    monkeypatch.setattr(mongo_sink, 'MongoClient', mongomock.MongoClient)
+    sys.modules.pop('scrape', None)
+    module = importlib.import_module('scrape')
+    yield module
+    module.session.close()
+    module.engine.dispose()
+    sys.modules.pop('scrape', None)
+
+def test_import_without_mongodb(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path}/scrape.db")
+    monkeypatch.setenv('MONGODB_URI', '')
+    sys.modules.pop('scrape', None)
+    module = importlib.import_module('scrape')
+    assert module.games_sink is None
+    module.engine.dispose()
+    sys.modules.pop('scrape', None)
+
+def test_games_are_bulk_written_to_mongodb(scrape):
+    sink = scrape.games_sink
+    collection = sink.collection
+    sink.batch_size = 2
+    assert not sink.seen('game_1')
+
+    sink.add({"game_id": 'game_1', "map": 'Ascent'})
+    assert sink.seen('game_1')
+    sink.add({"game_id": 'game_2', "map": 'Bind'})
+    # The second document filled the batch
+    assert sink.batches == 1 and sink.written == 2
+    sink.add({"game_id": 'game_1', "map": 'Haven'})
+    sink.close()
+
+    assert sink.batches == 2 and sink.written == 3
+    assert {doc['game_id']: doc['map'] for doc in collection.find()} == {'game_1': 'Haven', 'game_2': 'Bind'}
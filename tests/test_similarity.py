@@ -0,0 +1,47 @@
+# tests/test_similarity.py
+
+import numpy as np
+
+import similarity
+from stats_engine import STAT_COLUMNS
+
+from conftest import run_python
+
+def test_live_index_follows_inserts_and_rescrapes():
+    from models import Base, Session, engine, Match, Game, GamePlayer
+    Base.metadata.create_all(engine)
+    index = similarity.SimilarityIndex(min_games=1).build()
+    session = Session()
+    similarity.attach_to_ingestion(session, index)
+
+    session.add_all([Match(match_id=990001, tour_split_id=None), Game(game_id=990001, match_id=990001, map_id=2)])
+    session.commit()
+    player = GamePlayer(game_id=990001, player_id=99001, team_id=1, agent=3, ct_and_t_data=True,
+                        **{col: 1 for col in STAT_COLUMNS})
+    session.add(player)
+    session.commit()
+    assert 99001 in index.ids
+
+    # A re-scrape loads the row and updates it in place
+    player = session.query(GamePlayer).filter_by(game_id=990001, player_id=99001).one()
+    player.both_kills = 30
+    session.commit()
+    session.close()
+    fresh = similarity.SimilarityIndex(min_games=1).build()
+    i = np.searchsorted(index.ids, 99001)
+    assert index.raw[i, similarity.FEATURES.index('both_kills')] == 30
+    assert np.array_equal(index.raw[i], fresh.raw[np.searchsorted(fresh.ids, 99001)])
+
+def test_scraper_keeps_the_live_index_current(replay_site, scraper_env):
+    base_url, _, site = replay_site()
+    env = scraper_env(base_url, SIMILARITY_LIVE=1)
+    # Tables exist, so the index starts empty and only ingestion fills it
+    run_python(['-c', 'import tour_split_scrape'], env)
+    result = run_python(['-c', "import numpy as np, similarity, tour_split_scrape as t; "
+                               f"t.scrape_tour_data({site.tour_urls(base_url)[0]!r}); "
+                               "live, fresh = similarity.live_index, similarity.SimilarityIndex().build(); "
+                               "print('live', len(live.ids), np.array_equal(live.ids, fresh.ids), "
+                               "np.allclose(live.raw, fresh.raw))"], env)
+    assert 'Built similarity index for 0 players' in result.stdout
+    live = [line.split() for line in result.stdout.splitlines() if line.startswith('live ')][-1]
+    assert int(live[1]) > 0 and live[2:] == ['True', 'True']
@@ -0,0 +1,51 @@
+# tests/test_single_flight.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    executions = []
+    release = threading.Event()
+
+    def slow(key):
+        executions.append(key)
+        release.wait(5)
+        return f"page {key}"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flights.do, 'a', slow, 'a') for _ in range(8)]
+        while flights.snapshot()['requests'] < 8:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ['page a'] * 8
+    assert executions == ['a']
+    snapshot = flights.snapshot()
+    assert (snapshot['executions'], snapshot['coalesced'], snapshot['in_flight']) == (1, 7, 0)
+    # Nothing is kept once the call finished
+    assert flights.do('a', slow, 'a') == 'page a' and executions == ['a', 'a']
+
+def test_waiters_share_the_error():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flights.do, 'k', failing) for _ in range(4)]
+        while flights.snapshot()['requests'] < 4:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert flights.snapshot()['errors'] == 1
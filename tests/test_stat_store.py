@@ -0,0 +1,95 @@
+# tests/test_stat_store.py
+
+import json
+import os
+
+import pytest
+
+import stat_store
+from stat_store import StatStore, StatStoreWriter, ID_COLUMNS
+from stats_engine import STAT_COLUMNS
+
+@pytest.fixture(autouse=True)
+def shared_tables():
+    # build_store and the ingestion hook read the shared scratch database
+    from models import Base, engine
+    Base.metadata.create_all(engine)
+
+def store_rows(count, start=0):
+    # (ids, stats) for `count` rows with distinct game ids, spread over a few players and maps
+    ids = [[start + i, (start + i) % 7, 1, 2, (start + i) % 3, 5, 1] for i in range(count)]
+    stats = [[float(start + i)] * len(STAT_COLUMNS) for i in range(count)]
+    return ids, stats
+
+def test_reader_of_the_previous_meta_survives_a_reindex(tmp_path):
+    store_dir = str(tmp_path)
+    writer = StatStoreWriter(store_dir)
+    writer.append(*store_rows(100), reindex=True)
+    with open(os.path.join(store_dir, stat_store.META_FILE)) as f:
+        old_meta = json.load(f)
+
+    # A reader that read meta.json just before the writer grew and reindexed the store
+    writer.append(*store_rows(50, start=100), reindex=True)
+    reader = StatStore.__new__(StatStore)
+    reader.store_dir = store_dir
+    reader._open(old_meta)
+
+    rows = reader.select(player_id=3)
+    assert len(rows) and rows.max() < reader.rows
+    assert sorted(reader.column('game_id')[rows]) == [g for g in range(100) if g % 7 == 3]
+    assert set(StatStore(store_dir).column('game_id')[StatStore(store_dir).select(player_id=3)]) == \
+        {g for g in range(150) if g % 7 == 3}
+
+def test_build_store_only_removes_its_own_files(tmp_path):
+    store_dir = tmp_path / 'store'
+    (store_dir / 'notes').mkdir(parents=True)
+    (store_dir / 'README.txt').write_text('keep me')
+    writer = StatStoreWriter(str(store_dir))
+    writer.append(*store_rows(10), reindex=True)
+    writer.append(*store_rows(10, start=10), reindex=True)
+
+    stat_store.build_store(str(store_dir))
+
+    assert (store_dir / 'notes').is_dir()
+    assert (store_dir / 'README.txt').read_text() == 'keep me'
+    leftovers = [name for name in os.listdir(store_dir) if stat_store._index_generation(name) not in (None, 1)]
+    assert leftovers == []
+
+def test_rewrite_overwrites_rows_in_place(tmp_path):
+    store_dir = str(tmp_path)
+    writer = StatStoreWriter(store_dir)
+    writer.append(*store_rows(20), reindex=True)
+
+    ids, stats = store_rows(1, start=4)
+    ids[0][ID_COLUMNS.index('map_id')] = 9
+    stats[0] = [100.0] * len(STAT_COLUMNS)
+    new_ids, new_stats = store_rows(1, start=20)
+    assert writer.rewrite(ids + new_ids, stats + new_stats) == 1
+
+    store = StatStore(store_dir)
+    assert store.rows == 21
+    row = store.select(game_id=4, player_id=4)
+    assert list(store.stats[row[0]]) == [100.0] * len(STAT_COLUMNS)
+    # The map changed, so the index was rebuilt
+    assert store.indexed_rows == 21
+    assert list(store.column('game_id')[store.select(map_id=9)]) == [4]
+    assert 4 not in store.column('game_id')[store.select(map_id=1)]
+
+def test_ingestion_rewrites_updated_game_players(tmp_path):
+    from models import Session, Match, Game, GamePlayer
+    session = Session()
+    stat_store.attach_to_ingestion(session, str(tmp_path))
+
+    session.add_all([Match(match_id=880001, tour_split_id=None), Game(game_id=880001, match_id=880001, map_id=2)])
+    session.commit()
+    player = GamePlayer(game_id=880001, player_id=77, team_id=1, agent=3, ct_and_t_data=True,
+                        **{col: 1 for col in STAT_COLUMNS})
+    session.add(player)
+    session.commit()
+    player.both_kills = 30
+    session.commit()
+    session.close()
+
+    store = StatStore(str(tmp_path))
+    assert store.rows == 1
+    assert store.column('both_kills')[0] == 30
@@ -0,0 +1,41 @@
+# tests/test_stat_tables.py
+
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import ROOT
+from replay_server import SyntheticSite
+from stat_tables import extract_stat_table, extract_stat_table_dom, same_table
+
+SITE = SyntheticSite(matches_per_split=6)
+MATCH_IDS = [SITE.split_id(0, 0) * 10000 + m for m in range(6)]
+
+def stat_tables(page):
+    soup = BeautifulSoup(page, 'html.parser')
+    return soup.find_all('table', class_='wf-table-inset mod-overview')
+
+def assert_paths_agree(page):
+    tables = stat_tables(page)
+    assert tables
+    for table in tables:
+        assert same_table(extract_stat_table(table), extract_stat_table_dom(table))
+
+def test_paths_agree_on_the_recorded_page():
+    with open(os.path.join(ROOT, 'test.html'), encoding='utf-8') as f:
+        page = f.read()
+    assert sum(len(extract_stat_table(table)) for table in stat_tables(page)) > 0
+    assert_paths_agree(page)
+
+@pytest.mark.parametrize('match_id', MATCH_IDS)
+def test_paths_agree_on_synthetic_pages(match_id):
+    assert_paths_agree(SITE.match_page(match_id))
+
+def test_paths_agree_when_side_values_are_missing():
+    # A cell with only its both-sides span, and a row with no player link
+    page = SITE.match_page(MATCH_IDS[0])
+    assert '<span class="side mod-side mod-t">' in page
+    page = page.replace('<span class="side mod-side mod-t">', '<span class="side mod-side">', 3)
+    page = page.replace('<tbody>', '<tbody><tr><td class="mod-player"><a href="/team/1/x"></a></td></tr>', 1)
+    assert_paths_agree(page)
@@ -0,0 +1,47 @@
+# tests/test_team_comps.py
+
+from sqlalchemy import create_engine, select, text
+
+from conftest import run_python, crawl_tour
+
+def comps(database_url):
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT game_id, team_id, agent_mask, rounds_won, rounds_lost, won "
+                                 "FROM team_game_comps ORDER BY game_id, team_id")).all()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+def test_comp_scraper_matches_the_crawl(replay_site, scraper_env):
+    base_url, stats, site = replay_site()
+    tour_url = site.tour_urls(base_url)[0]
+    env = scraper_env(base_url)
+    crawl_tour(env, tour_url)
+    expected = comps(env['DATABASE_URL'])
+    # Two teams per game
+    assert expected and len(expected) % 2 == 0
+
+    # Fetched through tour_split_scrape.fetch, so the replay site sees every request
+    env = scraper_env(base_url, name='comps')
+    requests = stats.snapshot()['requests']
+    run_python(['-c', "import scrape_team_comp_data as s; agents, maps = s.load_lookups(); "
+                      f"s.scrape_tour_data({tour_url!r}, agents, maps)"], env)
+    assert comps(env['DATABASE_URL']) == expected
+    assert stats.snapshot()['requests'] > requests
+
+def test_record_team_comp_joins_the_callers_transaction():
+    import team_comps
+    from models import Base, Session, engine
+    Base.metadata.create_all(engine)
+    session = Session()
+    team_comps.record_team_comp(770001, 1, 770000, 1, None, [1, 2, 3, 4, 5], 13, 7, session=session)
+    session.rollback()
+    with engine.connect() as conn:
+        assert conn.execute(select(team_comps.TeamGameComp).where(team_comps.TeamGameComp.game_id == 770001)).first() is None
+
+    team_comps.record_team_comp(770001, 1, 770000, 1, None, [1, 2, 3, 4, 5], 13, 7, session=session)
+    session.commit()
+    session.close()
+    with engine.connect() as conn:
+        row = conn.execute(select(team_comps.TeamGameComp.won).where(team_comps.TeamGameComp.game_id == 770001)).first()
+    assert row == (True,)
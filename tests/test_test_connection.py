@@ -0,0 +1,21 @@
+# tests/test_test_connection.py
+
+import os
+
+from sqlalchemy.engine import make_url
+
+from conftest import ISOLATED_ENV, run_python
+
+def test_negative_counts_are_rejected():
+    result = run_python(['test_connection.py', '--pings', '-1'], dict(os.environ, **ISOLATED_ENV), check=False)
+    assert result.returncode == 2
+    assert 'must be 0 or more' in result.stderr
+
+def test_zero_samples_skip_their_report(postgres_url):
+    # psycopg2 takes a plain libpq URL
+    url = make_url(postgres_url).set(drivername='postgresql').render_as_string(hide_password=False)
+    env = dict(os.environ, **{**ISOLATED_ENV, "DATABASE_URL": url})
+    result = run_python(['test_connection.py', '--pings', '0', '--connects', '0', '--rows', '0'], env)
+    assert 'Connect time: skipped (0 samples)' in result.stdout
+    assert 'Round trip (SELECT 1): skipped (0 samples)' in result.stdout
+    assert 'Single-row inserts' not in result.stdout
@@ -0,0 +1,206 @@
+# tests/test_work_queue.py
+
+import re
+import signal
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine, select, text
+
+from conftest import ROOT, run_python, crawl_tour, db_totals
+from replay_server import SyntheticSite
+
+def record_requests(site):
+    # Arrival time and path of every page the site renders
+    requests = []
+    render = site.render
+
+    def recording_render(path):
+        requests.append((time.time(), path))
+        return render(path)
+
+    site.render = recording_render
+    return requests
+
+def queue_statuses(database_url):
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT status, count(*) FROM crawl_queue GROUP BY status")).all())
+    engine.dispose()
+    return rows
+
+def sequential_totals(replay_site, scraper_env, **site_kwargs):
+    base_url, _, site = replay_site(**site_kwargs)
+    env = scraper_env(base_url, name='sequential')
+    crawl_tour(env, site.tour_urls(base_url)[0])
+    return db_totals(env['DATABASE_URL'])
+
+def test_host_budget_covers_every_fetch(replay_site, scraper_env):
+    site_kwargs = {"matches_per_split": 8}
+    expected = sequential_totals(replay_site, scraper_env, **site_kwargs)
+
+    base_url, _, site = replay_site(**site_kwargs)
+    requests = record_requests(site)
+    rate = 20
+    env = scraper_env(base_url, CRAWL_HOST_RATE=rate)
+    run_python(['work_queue.py', 'seed', site.tour_urls(base_url)[0]], env)
+    run_python(['work_queue.py', 'work', '--processes', '2'], env)
+
+    assert db_totals(env['DATABASE_URL']) == expected
+    assert queue_statuses(env['DATABASE_URL']) == {'done': 10}
+    # Team and player pages are fetched by the handlers, outside the queue, and must share the budget too
+    assert sum(path.startswith(('/team/', '/player/')) for _, path in requests) > 20
+    times = sorted(arrival for arrival, _ in requests)
+    busiest = max(sum(1 for later in times[i:] if later - start < 1.0) for i, start in enumerate(times))
+    assert busiest <= rate * 1.25
+
+def test_retries_server_errors(replay_site, scraper_env):
+    site_kwargs = {"matches_per_split": 6}
+    expected = sequential_totals(replay_site, scraper_env, **site_kwargs)
+
+    base_url, stats, site = replay_site(config={"error_rate": 0.15}, **site_kwargs)
+    env = scraper_env(base_url, CRAWL_HOST_RATE=0, QUEUE_RETRY_SECONDS=0.1, QUEUE_MAX_ATTEMPTS=20)
+    run_python(['work_queue.py', 'seed', site.tour_urls(base_url)[0]], env)
+    run_python(['work_queue.py', 'work', '--processes', '3'], env)
+
+    assert stats.snapshot()['statuses'].get(500, 0) > 0
+    assert db_totals(env['DATABASE_URL']) == expected
+    assert queue_statuses(env['DATABASE_URL']) == {'done': 8}
+
+def test_killed_worker_leases_are_taken_over(replay_site, scraper_env):
+    site_kwargs = {"matches_per_split": 10}
+    expected = sequential_totals(replay_site, scraper_env, **site_kwargs)
+
+    base_url, _, site = replay_site(config={"latency_ms": 20}, **site_kwargs)
+    env = scraper_env(base_url, CRAWL_HOST_RATE=0, QUEUE_LEASE_SECONDS=2)
+    run_python(['work_queue.py', 'seed', site.tour_urls(base_url)[0]], env)
+    # Creates the scraper's tables before two workers race to
+    run_python(['-c', 'import tour_split_scrape'], env)
+
+    workers = [subprocess.Popen([sys.executable, 'work_queue.py', 'work'], cwd=ROOT, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for _ in range(2)]
+    # Kill one worker once it holds leases
+    engine = create_engine(env['DATABASE_URL'])
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        with engine.connect() as conn:
+            owners = conn.execute(text("SELECT DISTINCT lease_owner FROM crawl_queue WHERE status = 'leased'")).scalars().all()
+        if any(owner.split(':')[1] == str(workers[0].pid) for owner in owners):
+            break
+        time.sleep(0.05)
+    workers[0].send_signal(signal.SIGKILL)
+    workers[0].wait()
+    assert workers[1].wait(timeout=300) == 0
+    engine.dispose()
+
+    assert db_totals(env['DATABASE_URL']) == expected
+    assert queue_statuses(env['DATABASE_URL']) == {'done': 12}
+
+class UnknownAgentSite(SyntheticSite):
+    # One match fields an agent the scraper does not know yet
+    def __init__(self, bad_match, **kwargs):
+        super().__init__(**kwargs)
+        self.bad_match = bad_match
+
+    def match_page(self, match_id):
+        page = super().match_page(match_id)
+        if page is not None and match_id == self.bad_match:
+            page = re.sub(r'alt="\w+" title="\w+"', 'alt="tejo" title="Tejo"', page, count=1)
+        return page
+
+def test_unknown_agent_fails_the_page_instead_of_waiting_for_input(replay_site, scraper_env):
+    bad_match = SyntheticSite().split_id(0, 0) * 10000 + 1
+    site = UnknownAgentSite(bad_match, tours=1, splits_per_tour=1, matches_per_split=3)
+    base_url, _, _ = replay_site(site=site)
+    env = scraper_env(base_url, CRAWL_HOST_RATE=0, QUEUE_RETRY_SECONDS=0.1, QUEUE_MAX_ATTEMPTS=2)
+    run_python(['work_queue.py', 'seed', site.tour_urls(base_url)[0]], env)
+    # stdin stays open, so a prompt would block until the timeout
+    worker = subprocess.Popen([sys.executable, 'work_queue.py', 'work'], cwd=ROOT, env=env, stdin=subprocess.PIPE,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        assert worker.wait(timeout=120) == 0
+    finally:
+        worker.kill()
+        worker.stdin.close()
+
+    engine = create_engine(env['DATABASE_URL'])
+    with engine.connect() as conn:
+        failed = conn.execute(text("SELECT url, last_error FROM crawl_queue WHERE kind = 'match' AND status = 'failed'")).all()
+    engine.dispose()
+    assert [url.rsplit('/', 2)[1] for url, _ in failed] == [str(bad_match)]
+    assert 'Unknown agent' in failed[0][1]
+    # The split and tour are not complete either, so their fingerprints are not saved and the next pass retries
+    assert queue_statuses(env['DATABASE_URL']) == {'done': 2, 'failed': 3}
+
+def test_heartbeat_stops_renewing_hung_pages(tmp_path):
+    import work_queue
+    queue = work_queue.WorkQueue(f"sqlite:///{tmp_path}/queue.db", lease=60, host_rate=0)
+    queue.create_tables()
+    queue.push('http://example.test/a', 'tour', 0)
+    queue.push('http://example.test/b', 'tour', 0)
+    tasks = queue.claim(2)
+    assert len(tasks) == 2
+
+    # Page a was claimed long ago: its handler is presumed hung and its lease is left to expire
+    queue.held['http://example.test/a'] -= work_queue.MAX_HANDLING_SECONDS + 1
+    expires_before = {task.url: task.lease_expires for task in tasks}
+    time.sleep(0.01)
+    queue.heartbeat()
+    with queue.Session() as s:
+        expires = dict(s.execute(select(work_queue.CrawlTask.url, work_queue.CrawlTask.lease_expires)).all())
+    assert expires['http://example.test/a'] == expires_before['http://example.test/a']
+    assert expires['http://example.test/b'] > expires_before['http://example.test/b']
+
+# ----------------------- PostgreSQL -----------------------
+
+def test_concurrent_claims_skip_locked_rows(postgres_url):
+    import threading
+    import work_queue
+    queue = work_queue.WorkQueue(postgres_url, host_rate=0)
+    queue.create_tables()
+    for page in range(200):
+        queue.push(f"http://example.test/{page}", 'match', page % 3)
+
+    claimed = []
+    lock = threading.Lock()
+
+    def claim_all():
+        worker = work_queue.WorkQueue(postgres_url, host_rate=0)
+        while True:
+            tasks = worker.claim(7)
+            if not tasks:
+                break
+            with lock:
+                claimed.extend(task.url for task in tasks)
+        worker.engine.dispose()
+
+    threads = [threading.Thread(target=claim_all) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.engine.dispose()
+    # Every page handed out exactly once
+    assert len(claimed) == len(set(claimed)) == 200
+
+def test_worker_processes_crawl_through_postgres(replay_site, scraper_env, postgres_url):
+    site_kwargs = {"matches_per_split": 8}
+    expected = sequential_totals(replay_site, scraper_env, **site_kwargs)
+
+    base_url, _, site = replay_site(**site_kwargs)
+    env = scraper_env(base_url, CRAWL_HOST_RATE=0)
+    env['DATABASE_URL'] = postgres_url
+    run_python(['work_queue.py', 'seed', site.tour_urls(base_url)[0]], env)
+    result = run_python(['work_queue.py', 'work', '--processes', '3'], env)
+
+    assert db_totals(postgres_url) == expected
+    assert queue_statuses(postgres_url) == {'done': 10}
+    handled = [int(line.split(' handled ')[1].split()[0]) for line in result.stdout.splitlines()
+               if line.startswith('Worker ')]
+    assert len(handled) == 3 and sum(handled) == 10
+    engine = create_engine(postgres_url)
+    with engine.connect() as conn:
+        # Nothing failed, so no page was claimed twice
+        assert conn.execute(text("SELECT max(attempts) FROM crawl_queue")).scalar() == 1
+    engine.dispose()
@@ -14,164 +14,91 @@ from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 from datetime import date
 import re
+import argparse
+import profiling
 
 # ----------------------- Configuration -----------------------
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Base URL of the website
-base_url = 'https://www.vlr.gg'
+# Base URL of the website; point VLR_BASE_URL at replay_server.py for offline load tests
+base_url = os.getenv('VLR_BASE_URL', 'https://www.vlr.gg')
 
 # PostgreSQL connection string
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-# MongoDB connection string
-# MONGODB_URI = os.getenv('MONGODB_URI')
+# MongoDB connection string; when set, parsed matches are also written to MongoDB
+MONGODB_URI = os.getenv('MONGODB_URI')
 
-all_tours = ['https://www.vlr.gg/vct-2024','https://www.vlr.gg/gc-2024',
-'https://www.vlr.gg/vcl-2024',
+# S3 bucket for the raw page archive; when set, every fetched page is also archived (s3_archive.py)
+ARCHIVE_BUCKET = os.getenv('ARCHIVE_BUCKET')
+
+# Page fetches running at once in a frontier crawl
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', '4'))
+
+# MEMORY_BOUNDED=1 (or --bounded): free parse trees per page and recycle the session every SESSION_BATCH matches
+MEMORY_BOUNDED = os.getenv('MEMORY_BOUNDED') == '1'
+SESSION_BATCH = int(os.getenv('SESSION_BATCH', '50'))
+
+all_tours = [base_url + '/vct-2024', base_url + '/gc-2024',
+base_url + '/vcl-2024',
 ]
 
 # ----------------------- Relational Database Setup (PostgreSQL) -----------------------
 
-# Create engine and session for PostgreSQL
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
-
-# Define models according to your schema
-
-class Parent_Region(Base):
-    __tablename__ = 'parent_regions'
-    parent_region_id = Column(Integer, primary_key=True)
-    parent_region_name = Column(String(100))
-
-class Region(Base):
-    __tablename__ = 'regions'
-    region_id = Column(Integer, primary_key=True)
-    region_name = Column(String(100))
-
-class Team(Base):
-    __tablename__ = 'teams'
-    team_id = Column(Integer, primary_key=True)
-    team_name = Column(String(100))
-    region_id = Column(Integer, ForeignKey('regions.region_id'))
-    team_img_url =  Column(String(100))
-    active = Column(Boolean, default=True)
-
-    region = relationship('Region')
-    
-class Player(Base):
-    __tablename__ = 'players'
-    player_id = Column(Integer, primary_key=True)
-    name = Column(String(100))
-    real_name = Column(String(100))
-    pp_url =  Column(String(300))
-    region_id = Column(Integer, ForeignKey('regions.region_id'))
-    
-class Map(Base):
-    __tablename__ = 'maps'
-    map_id = Column(Integer, primary_key=True)
-    map_name = Column(String(100))
-    active = Column(Boolean, default=True)
-    
-class Agent(Base):
-    __tablename__ = 'agents'
-    agent_id = Column(Integer, primary_key=True)
-    agent_name = Column(String(50))
-    role = Column(String(20)) 
-    notes = Column(String(300), nullable=True)
-    
-class Tour(Base):
-    __tablename__ = 'tours'
-    tour_id = Column(Integer, primary_key=True)
-    name = Column(String(1000))
-    link = Column(String(1000))
-    
-class Tour_Split(Base):
-    __tablename__ = 'tour_splits'
-    external_split_id = Column(Integer, primary_key=True)
-    tour_id = Column(Integer, ForeignKey('tours.tour_id'))
-    parent_region_id = Column(Integer, ForeignKey('parent_regions.parent_region_id'))
-    name = Column(String(1000))
-    link = Column(String(1000))
-    start_date = Column(Date)  # Correct Date type
-    end_date = Column(Date)    # Correct Date type
-    prize_pool = Column(Numeric(precision=10, scale=2))  # Correct Numeric type for money
-    location = Column(String(500))
-
-class Match(Base):
-    __tablename__ = 'matches'
-    match_id = Column(Integer, primary_key=True)
-    tour_split_id = Column(Integer, ForeignKey('tour_splits.external_split_id'))
-    team1_id = Column(Integer, ForeignKey('teams.team_id'))
-    team2_id = Column(Integer, ForeignKey('teams.team_id'))
-    date_played = Column(Date)
-    
-class Game(Base):
-    __tablename__ = 'games'
-    game_id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.match_id'))
-    map_id = Column(Integer, ForeignKey('maps.map_id'))
-
-class PlayerRole(Base):
-    __tablename__ = 'player_roles'
-    role_id = Column(Integer, primary_key=True)
-    role_name = Column(String(100))
-    
-class GamePlayer(Base):
-    __tablename__ = 'game_players'
-    game_id = Column(Integer, ForeignKey('games.game_id'))
-    player_id = Column(Integer, ForeignKey('players.player_id'))
-    team_id = Column(Integer, ForeignKey('teams.team_id'))
-    agent = Column(Integer, ForeignKey('agents.agent_id'))
-    player_role = Column(Integer, ForeignKey('player_roles.role_id'))
-    ct_and_t_data = Column(Boolean)
-    
-    # CT-side statistics
-    ct_kills = Column(Integer)
-    ct_assists = Column(Integer)
-    ct_deaths = Column(Integer)
-    ct_acs = Column(Float)
-    ct_kast = Column(Float)
-    ct_adr = Column(Float)
-    ct_hs = Column(Float)
-    ct_first_kills = Column(Integer)
-    ct_first_deaths = Column(Integer)
-
-    # T-side statistics
-    t_kills = Column(Integer)
-    t_assists = Column(Integer)
-    t_deaths = Column(Integer)
-    t_acs = Column(Float)
-    t_kast = Column(Float)
-    t_adr = Column(Float)
-    t_hs = Column(Float)
-    t_first_kills = Column(Integer)
-    t_first_deaths = Column(Integer)
-    
-    # both statistics
-    both_kills = Column(Integer)
-    both_assists = Column(Integer)
-    both_deaths = Column(Integer)
-    both_acs = Column(Float)
-    both_kast = Column(Float)
-    both_adr = Column(Float)
-    both_hs = Column(Float)
-    both_first_kills = Column(Integer)
-    both_first_deaths = Column(Integer)
-    
-    __table_args__ = (
-        PrimaryKeyConstraint('game_id', 'player_id'),
-    )
+from models import (engine, Session, session, Base, Parent_Region, Region, Team, Player, Map, Agent,
+                    Tour, Tour_Split, Match, Game, PlayerRole, GamePlayer, warm_pool)
+import aggregates
+import stat_store
+import similarity
+import read_api
+import match_pages
+from stat_tables import extract_player_id_from_url
+import team_comps
+import fingerprints
+import live_matches
+from page_archive import PageArchive, PAGE_ARCHIVE_DIR, REPLAY_ARCHIVE_DIR
+from single_flight import SingleFlight
+from crawl_frontier import (Frontier, Crawler, Pending, BloomFilter, PRIORITY_LIVE, PRIORITY_DISCOVERY,
+                            PRIORITY_RECENT, PRIORITY_BACKFILL)
+from stages import stages
+from memory_tracking import SessionRecycler, MemoryObserver, release
+
+session_recycler = SessionRecycler(session, SESSION_BATCH)
+
+def enable_memory_bounded():
+    global MEMORY_BOUNDED
+    MEMORY_BOUNDED = True
+    session_recycler.enabled = True
+    # The lexer builds no tree for match pages at all
+    match_pages.MATCH_PARSER = 'lexer'
+
+def release_soup(soup):
+    if MEMORY_BOUNDED:
+        release(soup)
+
+if MEMORY_BOUNDED:
+    enable_memory_bounded()
+
+if stat_store.STAT_STORE_DIR:
+    stat_store.attach_to_ingestion(session, stat_store.STAT_STORE_DIR)
+# A read_api.py server watching this database drops its cached results once new data commits
+read_api.attach_to_ingestion(session)
 
 # Create tables in the database
 Base.metadata.create_all(engine)
 
+if similarity.SIMILARITY_LIVE:
+    similarity.live_index = similarity.SimilarityIndex().build(session)
+    similarity.attach_to_ingestion(session, similarity.live_index)
+
 # Populate Maps
 def seed_maps(session):
+    # Already seeded by an earlier run or import
+    if session.query(Map).first() is not None:
+        return
+
     valorant_maps = [
         Map(map_name="Ascent", active=True),
         Map(map_name="Bind", active=True),
@@ -196,6 +123,10 @@ seed_maps(session)
 
 # Function to seed agents into the database
 def seed_agents(session):
+    # Already seeded by an earlier run or import
+    if session.query(Agent).first() is not None:
+        return
+
     valorant_agents = [
         Agent(agent_name="Brimstone", role="Controller"),
         Agent(agent_name="Viper", role="Controller"),
@@ -235,6 +166,10 @@ def seed_agents(session):
 seed_agents(session)
 
 def seed_regions(session):
+    # Already seeded by an earlier run or import
+    if session.query(Parent_Region).first() is not None:
+        return
+
     valorant_regions = [
         Parent_Region(parent_region_name="America"),
         Parent_Region(parent_region_name="EMEA"),
@@ -301,10 +236,69 @@ parent_regions = [
 
 # ----------------------- NoSQL Database Setup (MongoDB) -----------------------
 
-# Create MongoDB client and access database and collections
-# mongo_client = MongoClient(MONGODB_URI)
-# mongo_db = mongo_client['valorantdb']  # You can name the database as you prefer
-# games_collection = mongo_db['games']
+# Buffered sink over the games collection, fed from the same parsed records as PostgreSQL
+games_sink = None
+if MONGODB_URI:
+    from mongo_sink import MongoSink
+    games_sink = MongoSink.from_uri(MONGODB_URI, 'games', key='game_id')
+
+# ----------------------- Raw Page Archives -----------------------
+
+# S3: pages are batched into compressed objects and uploaded in the background
+page_archive = None
+if ARCHIVE_BUCKET:
+    from s3_archive import S3PageArchive
+    page_archive = S3PageArchive.from_env(ARCHIVE_BUCKET)
+
+# Local: append-only .warc.gz files with a URL index (page_archive.py)
+local_archive = None
+if PAGE_ARCHIVE_DIR:
+    local_archive = PageArchive(PAGE_ARCHIVE_DIR)
+
+# Re-ingesting from an archive: fetch() reads pages from it and never touches the network
+replay_archive = None
+if REPLAY_ARCHIVE_DIR:
+    replay_archive = PageArchive(REPLAY_ARCHIVE_DIR)
+
+def archive_page(url, content):
+    for archive in (page_archive, local_archive):
+        if archive is not None:
+            archive.add(url, content)
+
+def close_archives():
+    for archive in (page_archive, local_archive):
+        if archive is not None:
+            archive.close()
+
+# Optional shared request budget, e.g. work_queue.WorkQueue.reserve: called with the host before every download,
+# returns the seconds to wait. Covers every page a handler fetches (teams, players, match lists), not just the
+# pages a crawl queues.
+rate_limit = None
+
+def fetch_page(url, headers=None):
+    if replay_archive is not None:
+        return replay_archive.fetch(url)
+    if rate_limit is not None:
+        wait = rate_limit(urlparse(url).netloc)
+        if wait:
+            time.sleep(wait)
+    response = requests.get(url, headers=headers)
+    if response.status_code == 200:
+        archive_page(url, response.content)
+    return response
+
+# Concurrent fetches of the same URL share one download; the response is shared read-only. Scaffolding for now:
+# the crawl's workers only fetch frontier URLs, which are never duplicated, and team and player pages are fetched
+# by handlers on a single thread, so nothing is coalesced until those lookups run on the worker pool
+page_flights = SingleFlight()
+
+def fetch(url, headers=None):
+    # Conditional requests (live polls) are not shared: their answer depends on the caller's validators
+    response = fetch_page(url, headers) if headers else page_flights.do(url, fetch_page, url)
+    # Throttled and server-error pages must not be parsed or fingerprinted as content; the crawl retries them
+    if response.status_code == 429 or response.status_code >= 500:
+        raise requests.HTTPError(f"{response.status_code} fetching {url}", response=response)
+    return response
 
 # ----------------------- Helper Functions -----------------------
 
@@ -320,57 +314,6 @@ def valid_img_url(img_url):
     else:
         return ""    
 
-def extract_player_id_from_url(player_url):
-
-    url_parts = player_url.strip('/').split('/')
-    try:
-        idx = url_parts.index('player')
-        player_id = int(url_parts[idx + 1])
-        return player_id
-    except (ValueError, IndexError):
-        return None  # Unable to extract player_id
-
-def parse_stat(stat_text):
-    stat_text = stat_text.replace('\xa0', '').replace('&nbsp;', '').strip()
-    stat_values = stat_text.strip().replace('%', '').split('\n')
-    float_values = []
-    for val in stat_values:
-        val = val.strip()
-        if val == '/' or not val:
-            continue
-        try:
-            float_values.append(float(val))
-        except ValueError:
-            continue
-    if len(float_values) == 1:
-        return float_values[0]
-    elif len(float_values) > 1:
-        return sum(float_values) / len(float_values)
-    else:
-        return 0
-
-def parse_sides_stat(stat_td):
-    
-    t = stat_td.find('span', class_="mod-t") 
-    ct = stat_td.find('span', class_="mod-ct")
-    both = stat_td.find('span', class_="mod-both")
-    
-    t_side = 0
-    ct_side = 0
-    both_side = 0
-    side_data = False
-    
-    if t and ct:
-        t_side = parse_stat(t.text)
-        ct_side = parse_stat(ct.text)
-        side_data = True
-        
-        
-    if both:
-        both_side = parse_stat(both.text)
-    
-    return {"t": t_side, "ct": ct_side, "both": both_side, "side_data": side_data }
-
 def extract_event_details(event_header):
     event_desc_items = event_header.find_all('div', class_='event-desc-item')
     details = {}
@@ -447,7 +390,41 @@ def insert_or_get_game_player(game_id, player_id, team_id, agent, player_role,si
                               ct_acs=0.0, ct_kast=0.0, ct_adr=0.0, ct_first_kills=0, ct_first_deaths=0,
                               t_kills=0, t_assists=0, t_deaths=0, t_acs=0.0, t_kast=0.0, t_adr=0.0, 
                               t_first_kills=0, t_first_deaths=0, both_kills=0, both_assists=0, both_deaths=0, both_acs=0.0, both_kast=0.0, both_adr=0.0, 
-                              both_first_kills=0, both_first_deaths=0, t_hs=0, ct_hs=0, both_hs=0):
+                              both_first_kills=0, both_first_deaths=0, t_hs=0, ct_hs=0, both_hs=0, update_existing=False):
+    fields = dict(
+        team_id=team_id,
+        agent=agent,
+        player_role=player_role,
+        ct_and_t_data=side_data,
+        ct_kills=ct_kills,
+        ct_assists=ct_assists,
+        ct_deaths=ct_deaths,
+        ct_acs=ct_acs,
+        ct_kast=ct_kast,
+        ct_adr=ct_adr,
+        ct_first_kills=ct_first_kills,
+        ct_first_deaths=ct_first_deaths,
+        t_kills=t_kills,
+        t_assists=t_assists,
+        t_deaths=t_deaths,
+        t_acs=t_acs,
+        t_kast=t_kast,
+        t_adr=t_adr,
+        t_first_kills=t_first_kills,
+        t_first_deaths=t_first_deaths,
+        both_kills=both_kills,
+        both_assists=both_assists,
+        both_deaths=both_deaths,
+        both_acs=both_acs,
+        both_kast=both_kast,
+        both_adr=both_adr,
+        both_first_kills=both_first_kills,
+        both_first_deaths=both_first_deaths,
+        ct_hs=ct_hs,
+        t_hs=t_hs,
+        both_hs=both_hs
+    )
+
     # Check if the GamePlayer already exists
     existing_game_player = session.query(GamePlayer).filter_by(game_id=game_id, player_id=player_id).first()
     
@@ -455,41 +432,7 @@ def insert_or_get_game_player(game_id, player_id, team_id, agent, player_role,si
         # Insert the GamePlayer into the database
         try:
         
-            new_game_player = GamePlayer(
-                game_id=game_id,
-                player_id=player_id,
-                team_id=team_id,
-                agent=agent,
-                player_role=player_role,
-                ct_and_t_data=side_data,
-                ct_kills=ct_kills,
-                ct_assists=ct_assists,
-                ct_deaths=ct_deaths,
-                ct_acs=ct_acs,
-                ct_kast=ct_kast,
-                ct_adr=ct_adr,
-                ct_first_kills=ct_first_kills,
-                ct_first_deaths=ct_first_deaths,
-                t_kills=t_kills,
-                t_assists=t_assists,
-                t_deaths=t_deaths,
-                t_acs=t_acs,
-                t_kast=t_kast,
-                t_adr=t_adr,
-                t_first_kills=t_first_kills,
-                t_first_deaths=t_first_deaths,
-                both_kills=both_kills,
-                both_assists=both_assists,
-                both_deaths=both_deaths,
-                both_acs=both_acs,
-                both_kast=both_kast,
-                both_adr=both_adr,
-                both_first_kills=both_first_kills,
-                both_first_deaths=both_first_deaths,
-                ct_hs=ct_hs,
-                t_hs=t_hs,
-                both_hs=both_hs
-            )
+            new_game_player = GamePlayer(game_id=game_id, player_id=player_id, **fields)
             session.add(new_game_player)
             session.commit()
             print(f"Inserted new GamePlayer record for player_id {player_id} and game_id {game_id}.")
@@ -502,17 +445,29 @@ def insert_or_get_game_player(game_id, player_id, team_id, agent, player_role,si
             print(t_kills, t_assists, t_deaths, t_acs, t_kast, t_adr, 
                               t_first_kills, t_first_deaths)
             
+    elif update_existing:
+        # Re-scraped game: overwrite the stored stats in place (aggregates apply the difference)
+        for column, value in fields.items():
+            setattr(existing_game_player, column, value)
+        if session.dirty:
+            session.commit()
+            print(f"Updated GamePlayer record for player_id {player_id} and game_id {game_id}.")
     else:
         print(f"GamePlayer record for player_id {player_id} and game_id {game_id} already exists.")
         # input()
     
     return existing_game_player or new_game_player
 
-def insert_or_get_game(game_id, match_id, map_id):
+def insert_or_get_game(game_id, match_id, map_id, update_existing=False):
     # Check if the Game already exists
     existing_game = session.query(Game).filter_by(game_id=game_id).first()
     
-    if not existing_game:
+    if existing_game and update_existing and existing_game.map_id != map_id:
+        # A map decided after the first scrape; player aggregates under the old map need `aggregates.py rebuild`
+        existing_game.map_id = map_id
+        session.commit()
+        print(f"Updated map of Game {game_id} to {map_id}.")
+    elif not existing_game:
         # Insert the Game into the database
         new_game = Game(
             game_id=game_id,
@@ -561,12 +516,16 @@ def get_tour(tour_name, tour_link):
         # input()
         return None
 
+@stages.track('team')
 def get_team(team_link):
     # Extract the team ID from the link
     
     team_id = int(team_link.split('/')[2])
+    # Known teams are not re-downloaded; the page is only used to insert new ones
+    if session.get(Team, team_id) is not None:
+        return team_id
     team_url = base_url + team_link
-    team_res = requests.get(team_url)
+    team_res = fetch(team_url)
     team_soup = BeautifulSoup(team_res.content, 'html.parser')
 
     team_header = team_soup.find('div', class_='team-header')
@@ -588,56 +547,60 @@ def get_team(team_link):
         print(f"Inserted team {team_name} (ID: {team_id}) into PostgreSQL.")
     else:
         print(f"Team {team_name} (ID: {team_id}) already exists in PostgreSQL.")
+    release_soup(team_soup)
     return team_id
 
-def scrape_game_data(game_url,tour_split_id):
+@stages.track('match')
+def scrape_game_data(game_url,tour_split_id,content=None):
     # Extract match_id from URL
     match_id = int(game_url.split('/')[1])
 
     full_game_url = base_url + game_url
     print(f"Scraping game: {full_game_url}")
 
-    game_response = requests.get(full_game_url)
-    game_soup = BeautifulSoup(game_response.content, 'html.parser')
+    # live_matches.py passes the page it already fetched with a conditional GET
+    if content is None:
+        content = fetch(full_game_url).content
+
+    # A stored match is only re-ingested for the vm-stats-game blocks that changed since the last crawl
+    block_prints = fingerprints.match_fingerprints(content)
+    existing_match = session.query(Match).filter_by(match_id=match_id).first()
+    changed_games = None
+    if existing_match:
+        changed = fingerprints.changed_blocks(full_game_url, block_prints)
+        changed_games = changed - {"header"}
+        if not changed_games:
+            if changed:
+                fingerprints.save(full_game_url, block_prints)
+            session_recycler.match_done()
+            return
+        print(f"Re-ingesting changed games {sorted(changed_games)} of match {match_id}.")
+
+    # DOM or lexer parse, chosen by MATCH_PARSER; both give the same record
+    with stages.stage('parse'):
+        page = match_pages.parse_match(content)
+
+    # Matches that are not final yet are re-polled by live_matches.py until they are
+    if page["status"] != live_matches.FINAL_STATUS:
+        live_matches.track(match_id, game_url, tour_split_id, page["status"])
 
     # Extract match details
-    match_header_super = game_soup.find('div', class_='match-header-super')
-    event_link = match_header_super.find('a', class_='match-header-event')['href']
-    
-    date_div = match_header_super.find('div', {'data-utc-ts': True})
-    # pdb.set_trace()
-    date_played = date_div['data-utc-ts'] if date_div else None
-    tournament_div = match_header_super.find('div', style='font-weight: 700;')
-    event_name = tournament_div.text.strip() if tournament_div else None
-    patch_div = match_header_super.find('div', style='font-style: italic;')
-    patch = patch_div.text.strip() if patch_div else None
+    event_link = page["event_link"]
+    date_played = page["date_played"]
+    event_name = page["event_name"]
+    patch = page["patch"]
 
     # Extract team information
-    match_header_vs = game_soup.find('div', class_='match-header-vs')
-    team1_div = match_header_vs.find('div', class_='match-header-link-name mod-1')
-    team2_div = match_header_vs.find('div', class_='match-header-link-name mod-2')
-    team1_name = team1_div.find('div', class_='wf-title-med').text.strip()
-    team2_name = team2_div.find('div', class_='wf-title-med').text.strip()
-    team1_link = team1_div.find_parent('a')['href']
-    team2_link = team2_div.find_parent('a')['href']
+    team1_name, team2_name = page["team_names"]
+    team1_link, team2_link = page["team_links"]
     team1_id = get_team(team1_link)
     team2_id = get_team(team2_link)
 
     # Extract scores
-    scores_div = match_header_vs.find('div', class_='match-header-vs-score')
-    scores = scores_div.find_all('span') if scores_div else []
-    team1_score = int(scores[0].text.strip()) if scores else None
-    team2_score = int(scores[-1].text.strip()) if scores else None
-
-    # Insert match data into PostgreSQL
-    existing_match = session.query(Match).filter_by(match_id=match_id).first()
-    if existing_match:
-        return 
+    team1_score, team2_score = page["scores"]
 
-    # Process each team's player statistics
-    vm_stats_games = game_soup.find_all('div', class_='vm-stats-game')
-    
     match = {
+        "game_id": f"game_{match_id}",
         "match_id": match_id,
         "teams": [team1_id,team2_id],
         "event": {
@@ -648,48 +611,47 @@ def scrape_game_data(game_url,tour_split_id):
         "games":[]
     }
     
-    new_match = Match(
-            match_id=match_id,
-            team1_id=team1_id,
-            team2_id=team2_id,
-            tour_split_id=tour_split_id,
-
-            date_played=date_played
-        )
-    
-    session.add(new_match)
-    session.commit()
-    print(f"Inserted game data for match {match_id} into post.")
+    # Insert match data into PostgreSQL
+    if not existing_match:
+        new_match = Match(
+                match_id=match_id,
+                team1_id=team1_id,
+                team2_id=team2_id,
+                tour_split_id=tour_split_id,
+
+                # Parsed here so non-PostgreSQL backends (SQLite) accept it too
+                date_played=datetime.strptime(date_played, '%Y-%m-%d %H:%M:%S').date() if date_played else None
+            )
+        
+        session.add(new_match)
+        session.commit()
+        print(f"Inserted game data for match {match_id} into post.")
 
-    for game_div in vm_stats_games:
+    for game in page["games"]:
         
-        game_id = game_div.get('data-game-id')
-        if game_id == 'all': continue
+        game_id = game["game_id"]
+        # Unchanged games of a stored match are still added to the MongoDB document, but not rewritten
+        ingest = changed_games is None or game_id in changed_games
         
         game_data = {
             "game_id": game_id,
-            "map": "Unknown",
+            "map": game["map"],
             "teams": []
         }
         
-        # Extract map name
-        map_name_div = game_div.find('div', class_='map')
-        map_name_span = map_name_div.find('span') if map_name_div else None
-        map_name = map_name_span.text.strip() if map_name_span else None
-        if map_name:
-            game_data['map'] = ''.join(str(map_name).split()).replace("PICK", "")
-        
         map_id = 11
         if game_data['map'] in valorant_maps:
             map_id = valorant_maps.index(game_data['map']) + 1
             
-        insert_or_get_game(game_id, match_id, map_id)
+        if ingest:
+            insert_or_get_game(game_id, match_id, map_id, update_existing=existing_match is not None)
+        game_scores = game["scores"]
         
-        player_tables = game_div.find_all('table', class_='wf-table-inset mod-overview')
         team_ids = [team1_id, team2_id]
         team_names = [team1_name, team2_name]
+        game_comps = []
 
-        for idx, table in enumerate(player_tables):
+        for idx, stat_table in enumerate(game["tables"]):
             team_id = team_ids[idx]
             team_name = team_names[idx]
             team_data = {
@@ -697,52 +659,37 @@ def scrape_game_data(game_url,tour_split_id):
                 "team_name": team_name,
                 "players": []
             }
+            team_agents = []
             
-            tbody = table.find('tbody')
-            rows = tbody.find_all('tr') if tbody else []
-            
-            for row in rows:
-                player_td = row.find('td', class_='mod-player')
-                agents_td = row.find('td', class_='mod-agents')
-                player_name_div = player_td.find('div', class_='text-of') if player_td else None
-                player_name = player_name_div.text.strip() if player_name_div else None
-                player_href = player_td.find('a')['href'] if player_td else None
-                player_id = extract_player_id_from_url(player_href)
+            for row in range(len(stat_table)):
+                player_href = stat_table.player_hrefs[row]
+                player_id = int(stat_table.player_ids[row])
 
                 if player_id:
                     # Check if player exists in the database
-                    existing_player = session.query(Player).filter_by(player_id=player_id).first()
-                    if not existing_player:
+                    if ingest and not session.query(Player).filter_by(player_id=player_id).first():
                         # Scrape player details
                         scrape_player_page(player_href)
-                    # Extract player stats
-                    stats_tds = row.find_all('td')
 
                     # Agents
-                    agents = []
-                    
-                    agents_spans = agents_td.find_all('span')
-                    
-                    for agent in agents_spans:
-                        agents.append(agent.find('img')['title'])
-                    
                     agent_id = -1
-                    if agents[0] in agent_names:
-                        agent_id = agent_names.index(agents[0]) + 1
+                    if stat_table.agents[row] in agent_names:
+                        agent_id = agent_names.index(stat_table.agents[row]) + 1
                     else:
-                        print(agents[0])
-                        input()
+                        # Unattended crawls must not wait on a prompt; the match is retried once the agent is added
+                        raise ValueError(f"Unknown agent {stat_table.agents[row]!r} in {full_game_url}: "
+                                         f"add it to agent_names and seed_agents")
                     
                     # Statistics
-                    kills = parse_sides_stat(stats_tds[4])
-                    deaths = parse_sides_stat(stats_tds[5])
-                    assists = parse_sides_stat(stats_tds[6])
-                    acs = parse_sides_stat(stats_tds[3])
-                    kast = parse_sides_stat(stats_tds[8])
-                    adr = parse_sides_stat(stats_tds[9])
-                    hs = parse_sides_stat(stats_tds[10])
-                    first_kills = parse_sides_stat(stats_tds[11])
-                    first_deaths = parse_sides_stat(stats_tds[12])
+                    kills = stat_table.sides(row, 'kills')
+                    deaths = stat_table.sides(row, 'deaths')
+                    assists = stat_table.sides(row, 'assists')
+                    acs = stat_table.sides(row, 'acs')
+                    kast = stat_table.sides(row, 'kast')
+                    adr = stat_table.sides(row, 'adr')
+                    hs = stat_table.sides(row, 'hs')
+                    first_kills = stat_table.sides(row, 'first_kills')
+                    first_deaths = stat_table.sides(row, 'first_deaths')
 
                     # Prepare player data for MongoDB
                     player_data = {
@@ -779,47 +726,68 @@ def scrape_game_data(game_url,tour_split_id):
                     }
                     
                     
-                    game_player = insert_or_get_game_player(
-                        game_id=game_id,
-                        player_id=player_id,
-                        team_id=team_id,
-                        agent=agent_id,
-                        player_role=player_data.get("player_role", None), 
-                        side_data=player_data.get("side_data", None), 
-                        ct_kills=player_data.get("ct_kills", 0),
-                        t_kills=player_data.get("t_kills", 0),
-                        both_kills=player_data.get("both_kills", 0),
-                        ct_assists=player_data.get("ct_assists", 0),
-                        t_assists=player_data.get("t_assists", 0),
-                        both_assists=player_data.get("both_assists", 0),
-                        ct_deaths=player_data.get("ct_deaths", 0),
-                        t_deaths=player_data.get("t_deaths", 0),
-                        both_deaths=player_data.get("both_deaths", 0),
-                        ct_acs=player_data.get("ct_acs", 0.0),
-                        t_acs=player_data.get("t_acs", 0.0),
-                        both_acs=player_data.get("both_acs", 0.0),
-                        ct_kast=float(player_data.get("ct_kast", "0").strip('%')),  
-                        t_kast=float(player_data.get("t_kast", "0").strip('%')), 
-                        both_kast=float(player_data.get("both_kast", "0").strip('%')),
-                        ct_adr=player_data.get("ct_adr", 0.0),
-                        t_adr=player_data.get("t_adr", 0.0),
-                        both_adr=player_data.get("both_adr", 0.0),
-                        ct_hs=player_data.get("ct_hs", 0.0),
-                        t_hs=player_data.get("t_hs", 0.0),
-                        both_hs=player_data.get("both_hs", 0.0),
-                        ct_first_kills=player_data.get("ct_first_kills", 0),
-                        t_first_kills=player_data.get("t_first_kills", 0),
-                        both_first_kills=player_data.get("both_first_kills", 0),
-                        ct_first_deaths=player_data.get("ct_first_deaths", 0),
-                        t_first_deaths=player_data.get("t_first_deaths", 0),
-                        both_first_deaths=player_data.get("both_first_deaths", 0)
-                    )
+                    if ingest:
+                        game_player = insert_or_get_game_player(
+                            game_id=game_id,
+                            player_id=player_id,
+                            team_id=team_id,
+                            agent=agent_id,
+                            player_role=player_data.get("player_role", None), 
+                            side_data=player_data.get("side_data", None), 
+                            ct_kills=player_data.get("ct_kills", 0),
+                            t_kills=player_data.get("t_kills", 0),
+                            both_kills=player_data.get("both_kills", 0),
+                            ct_assists=player_data.get("ct_assists", 0),
+                            t_assists=player_data.get("t_assists", 0),
+                            both_assists=player_data.get("both_assists", 0),
+                            ct_deaths=player_data.get("ct_deaths", 0),
+                            t_deaths=player_data.get("t_deaths", 0),
+                            both_deaths=player_data.get("both_deaths", 0),
+                            ct_acs=player_data.get("ct_acs", 0.0),
+                            t_acs=player_data.get("t_acs", 0.0),
+                            both_acs=player_data.get("both_acs", 0.0),
+                            ct_kast=float(player_data.get("ct_kast", "0").strip('%')),  
+                            t_kast=float(player_data.get("t_kast", "0").strip('%')), 
+                            both_kast=float(player_data.get("both_kast", "0").strip('%')),
+                            ct_adr=player_data.get("ct_adr", 0.0),
+                            t_adr=player_data.get("t_adr", 0.0),
+                            both_adr=player_data.get("both_adr", 0.0),
+                            ct_hs=player_data.get("ct_hs", 0.0),
+                            t_hs=player_data.get("t_hs", 0.0),
+                            both_hs=player_data.get("both_hs", 0.0),
+                            ct_first_kills=player_data.get("ct_first_kills", 0),
+                            t_first_kills=player_data.get("t_first_kills", 0),
+                            both_first_kills=player_data.get("both_first_kills", 0),
+                            ct_first_deaths=player_data.get("ct_first_deaths", 0),
+                            t_first_deaths=player_data.get("t_first_deaths", 0),
+                            both_first_deaths=player_data.get("both_first_deaths", 0),
+                            update_existing=existing_match is not None
+                        )
                     
-                    team_data["players"].append(player_data)
+                    # The MongoDB document is only built when there is a sink to stream it to
+                    if games_sink is not None:
+                        team_data["players"].append(player_data)
+                    team_agents.append(agent_id)
+
+            if ingest:
+                game_comps.append((team_id, team_agents, game_scores[idx], game_scores[1 - idx]))
+            if games_sink is not None:
+                game_data["teams"].append(team_data)
+
+        # Both comps in one transaction once every player page is fetched, so no write is held open across a fetch
+        for team_id, team_agents, rounds_won, rounds_lost in game_comps:
+            team_comps.record_team_comp(game_id, team_id, match_id, map_id, tour_split_id, team_agents,
+                                        rounds_won=rounds_won, rounds_lost=rounds_lost)
+        if game_comps:
+            session.commit()
 
-            game_data["teams"].append(team_data)
-        
-        match["games"].append(game_data)
+        if games_sink is not None:
+            match["games"].append(game_data)
+
+    if games_sink is not None:
+        games_sink.add(match)
+    fingerprints.save(full_game_url, block_prints)
+    session_recycler.match_done()
     
             
 def get_tour_split(external_split_id, tour_id, name, link, start_date, end_date, prize_pool, location, parent_region_id):
@@ -853,6 +821,7 @@ def get_tour_split(external_split_id, tour_id, name, link, start_date, end_date,
         # input()
         return None
 
+@stages.track('player')
 def scrape_player_page(player_url):
     player_id = extract_player_id_from_url(player_url)
     if not player_id:
@@ -865,7 +834,7 @@ def scrape_player_page(player_url):
         print(f"Player {existing_player.name} (ID: {player_id}) already exists in PostgreSQL.")
         return
 
-    internal_response = requests.get(base_url + player_url)
+    internal_response = fetch(base_url + player_url)
     internal_soup = BeautifulSoup(internal_response.content, 'html.parser')
 
     # Extract player details
@@ -895,92 +864,150 @@ def scrape_player_page(player_url):
     session.add(new_player)
     session.commit()
     print(f"Inserted player {player_name} (ID: {player_id}) into PostgreSQL.")
+    release_soup(internal_soup)
 
-def scrape_split(split_url, tour_id):
-    try:
-        response = requests.get(split_url)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        nav_bar = soup.find('div', class_='wf-nav')
-        
-        nav_items = nav_bar.find_all('a', class_='wf-nav-item')
-        
-        # Extract the external_split_id from the URL
-        parsed_url = urlparse(split_url)
-        path_parts = parsed_url.path.strip('/').split('/')
-        print(path_parts[1])
-        external_split_id = int(path_parts[1]) if len(path_parts) > 1 else None
+def store_split_page(response, split_url, tour_id):
+    # Parse a split page, store the split and its teams; returns (split_id, matches tab href)
+    soup = BeautifulSoup(response.content, 'html.parser')
+    nav_bar = soup.find('div', class_='wf-nav')
+    
+    nav_items = nav_bar.find_all('a', class_='wf-nav-item')
+    
+    # Extract the external_split_id from the URL
+    parsed_url = urlparse(split_url)
+    path_parts = parsed_url.path.strip('/').split('/')
+    print(path_parts[1])
+    external_split_id = int(path_parts[1]) if len(path_parts) > 1 else None
+    
+    # Find the event header
+    event_header = soup.find('div', class_='event-header')
+    if event_header is None:
+        print("Error: 'event-header' div not found.")
+        return None, None
+
+    # Extract split details
+    split_name_div = event_header.find('h1', class_='wf-title')
+    if split_name_div:
+        split_name = split_name_div.text.strip()
+    else:
+        split_name = 'Unknown Split'
+
+    # Extract additional details
+    details = extract_event_details(event_header)
+    start_date = details.get('start_date')
+    end_date = details.get('end_date')
+    prize_pool = details.get('prize_pool')
+    location = details.get('location')
+
+    parent_region_id = None
+    split_name = split_name.lower()
+    for index, word in enumerate(parent_regions):
+        if word in split_name:
+            parent_region_id = index + 1
+
+    # Get or create the tour split
+    split_id = get_tour_split(
+        external_split_id=external_split_id,
+        tour_id=tour_id,
+        name=split_name,
+        link=split_url,
+        start_date=start_date,
+        end_date=end_date,
+        prize_pool=prize_pool,
+        location=location,
+        parent_region_id=parent_region_id
+    )
+    
+    matches_in_split = nav_items[1]['href']
+    # Extract series_id from the URL
+    
+    team_container = soup.find('div', class_='event-teams-container')
+    teams = team_container.find_all('div', class_='wf-card event-team')
+    
+    for team in teams:
+        team_link_tag = team.find('a', class_='event-team-name')
+        if not team_link_tag:
+            print("Team link not found.")
+            continue
         
-        # Find the event header
-        event_header = soup.find('div', class_='event-header')
-        if event_header is None:
-            print("Error: 'event-header' div not found.")
-            return
+        team_link = team_link_tag.get('href', '')
+        team_name = team_link_tag.text.strip()
+        print(f"Team Name: {team_name}, Team Link: {team_link}")
+        team_id = get_team(team_link)
+
+    release_soup(soup)
+    return split_id, matches_in_split
 
-        # Extract split details
-        split_name_div = event_header.find('h1', class_='wf-title')
-        if split_name_div:
-            split_name = split_name_div.text.strip()
+def save_fingerprints(saves):
+    for url, prints in saves:
+        fingerprints.save(url, prints)
+
+def fingerprint_pending(saves, parent):
+    # Saves the pages' (url, fingerprint) pairs once everything queued from them has been ingested
+    return Pending(lambda: save_fingerprints(saves), parent, saves)
+
+@stages.track('split')
+def scrape_split(split_url, tour_id, response=None, frontier=None, priority=PRIORITY_BACKFILL, parent=None):
+    # With a frontier, match pages are queued instead of scraped here and their Pending is returned
+    try:
+        if response is None:
+            response = fetch(split_url)
+        split_print = fingerprints.split_fingerprint(response.content)
+        external_split_id = int(urlparse(split_url).path.strip('/').split('/')[1])
+
+        if fingerprints.unchanged(split_url, split_print) and session.get(Tour_Split, external_split_id):
+            # Split details and teams were stored by an earlier run; only the match list can have moved on
+            print(f"Split page unchanged since last run: {split_url}")
+            split_id = external_split_id
+            matches_in_split = fingerprints.split_matches_link(response.content)
         else:
-            split_name = 'Unknown Split'
-
-        # Extract additional details
-        details = extract_event_details(event_header)
-        start_date = details.get('start_date')
-        end_date = details.get('end_date')
-        prize_pool = details.get('prize_pool')
-        location = details.get('location')
-
-        parent_region_id = None
-        split_name = split_name.lower()
-        for index, word in enumerate(parent_regions):
-            if word in split_name:
-                parent_region_id = index + 1
-
-        # Get or create the tour split
-        split_id = get_tour_split(
-            external_split_id=external_split_id,
-            tour_id=tour_id,
-            name=split_name,
-            link=split_url,
-            start_date=start_date,
-            end_date=end_date,
-            prize_pool=prize_pool,
-            location=location,
-            parent_region_id=parent_region_id
-        )
-        
-        matches_in_split = nav_items[1]['href']
-        # Extract series_id from the URL
-        
-        team_container = soup.find('div', class_='event-teams-container')
-        teams = team_container.find_all('div', class_='wf-card event-team')
-        
-        for team in teams:
-            team_link_tag = team.find('a', class_='event-team-name')
-            if not team_link_tag:
-                print("Team link not found.")
-                continue
-            
-            team_link = team_link_tag.get('href', '')
-            team_name = team_link_tag.text.strip()
-            print(f"Team Name: {team_name}, Team Link: {team_link}")
-            team_id = get_team(team_link)
+            split_id, matches_in_split = store_split_page(response, split_url, tour_id)
+            if matches_in_split is None:
+                return
         
         # scrape matches
-        response2 = requests.get(base_url + matches_in_split)
-        print(base_url + matches_in_split)
-        soup_matches = BeautifulSoup(response2.content, 'html.parser')
-        matches = soup_matches.find_all('a', class_='wf-module-item')
-        
-        for match in matches:
-            match_link = match['href'] 
-            scrape_game_data(match_link,split_id)
+        matches_url = base_url + matches_in_split
+        response2 = fetch(matches_url)
+        print(matches_url)
+        matches_print = fingerprints.match_list_fingerprint(response2.content)
+        if fingerprints.unchanged(matches_url, matches_print):
+            print(f"Match list unchanged since last run: {matches_url}")
+        else:
+            soup_matches = BeautifulSoup(response2.content, 'html.parser')
+            matches = soup_matches.find_all('a', class_='wf-module-item')
+
+            if frontier is not None:
+                pending = fingerprint_pending([(matches_url, matches_print), (split_url, split_print)], parent)
+                for match in matches:
+                    frontier.push(base_url + match['href'], 'match', match_priority(match, priority),
+                                  match['href'], split_id, parent=pending)
+                release_soup(soup_matches)
+                return pending
+
+            match_links = [match['href'] for match in matches]
+            release_soup(soup_matches)
+            for match_link in match_links:
+                scrape_game_data(match_link,split_id)
+            fingerprints.save(matches_url, matches_print)
+        fingerprints.save(split_url, split_print)
     except Exception as e:
         print(e)
         # input()
-
-def scrape_tour_data(tour_url):
-    response = requests.get(tour_url)
+        if frontier is not None:
+            raise
+
+def event_status(event_card):
+    # 'completed', 'ongoing' or 'upcoming' from a tour page event card
+    status_div = event_card.find('div', class_='event-item-desc-item-status')
+    return status_div.text.strip().lower() if status_div else None
+
+@stages.track('tour')
+def scrape_tour_data(tour_url, response=None, frontier=None, parent=None):
+    # With a frontier, split pages are queued instead of scraped here and their Pending is returned
+    if response is None:
+        response = fetch(tour_url)
+    tour_print = fingerprints.tour_fingerprint(response.content)
+    tour_unchanged = fingerprints.unchanged(tour_url, tour_print)
     soup = BeautifulSoup(response.content, 'html.parser')
 
     # Find player links
@@ -991,29 +1018,92 @@ def scrape_tour_data(tour_url):
         
     event_divs = soup.find_all('div', class_='events-container-col')
     events = event_divs[1].find_all('a', class_='wf-card mod-flex event-item')
+    pending = fingerprint_pending([(tour_url, tour_print)], parent) if frontier is not None else None
 
     for row in events:
         try:
+            # A completed split listed on an unchanged tour page has nothing new to crawl
+            if tour_unchanged and event_status(row) == 'completed':
+                print(f"Skipping completed split {row['href']}: tour page unchanged.")
+                continue
             print("HREF",row['href'])
             split_link = base_url + row['href']
-            scrape_split(split_link, tour_id)
+            if frontier is not None:
+                # Ongoing and upcoming splits first; completed ones are backfill
+                priority = PRIORITY_BACKFILL if event_status(row) == 'completed' else PRIORITY_RECENT
+                frontier.push(split_link, 'split', priority, tour_id, parent=pending)
+            else:
+                scrape_split(split_link, tour_id)
         except Exception as e:
             print(e)
             # input()
+    release_soup(soup)
+    if pending is not None:
+        return pending
+    fingerprints.save(tour_url, tour_print)
+
+# ----------------------- Frontier Crawl -----------------------
+
+def match_priority(match_row, split_priority):
+    # Matches the list shows as live jump the queue
+    status = match_row.find('div', class_='ml-status')
+    return PRIORITY_LIVE if status and status.text.strip().lower() == 'live' else split_priority
+
+CRAWL_HANDLERS = {
+    'tour': lambda frontier, item, response: scrape_tour_data(item.url, response, frontier, item.parent),
+    'split': lambda frontier, item, response: scrape_split(item.url, *item.args, response=response, frontier=frontier,
+                                                           priority=item.priority, parent=item.parent),
+    'match': lambda frontier, item, response: scrape_game_data(*item.args, content=response.content),
+}
+
+def crawl(tour_urls, workers=CRAWL_WORKERS, seen=None):
+    # Tour pages first, then recent splits and matches, then backfill; no URL is fetched twice in a run
+    frontier = Frontier(seen)
+    for tour_url in tour_urls:
+        frontier.push(tour_url, 'tour', PRIORITY_DISCOVERY)
+    return Crawler(frontier, fetch, CRAWL_HANDLERS, workers).run()
 
 # ----------------------- Main Execution -----------------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl vlr.gg tours into the database.")
+    parser.add_argument('--workers', type=int, default=CRAWL_WORKERS, help="Concurrent page fetches")
+    parser.add_argument('--sequential', action='store_true', help="Depth-first crawl in page order, one fetch at a time")
+    parser.add_argument('--bloom', type=int, default=None, metavar='CAPACITY',
+                        help="De-duplicate URLs with a Bloom filter sized for CAPACITY URLs instead of a set")
+    parser.add_argument('--bounded', action='store_true', help="Memory-bounded mode (same as MEMORY_BOUNDED=1)")
+    parser.add_argument('--track-memory', action='store_true', help="Report tracemalloc peaks per stage at exit")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    if args.bounded:
+        enable_memory_bounded()
+    memory = stages.add(MemoryObserver()) if args.track_memory else None
+    # Started last so the profile covers the run, not the setup above
+    profiler = profiling.from_args(args, 'tour_split_scrape')
+
     try:
-        for tour_url in all_tours:
-            scrape_tour_data(tour_url)
+        # Open the pooled connections before the crawl instead of on the first inserts
+        warm_pool(engine)
+        if args.sequential:
+            for tour_url in all_tours:
+                scrape_tour_data(tour_url)
+        else:
+            crawl(all_tours, args.workers, BloomFilter(args.bloom) if args.bloom else None)
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
         # Close the session when done
         session.close()
-        # Close MongoDB connection
-        # mongo_client.close()
+        # Write any buffered documents and close the MongoDB connection
+        if games_sink is not None:
+            games_sink.close()
+        # Upload the last partial batch of archived pages and close the archive files
+        close_archives()
+        if memory is not None:
+            memory.report()
+        if profiler is not None:
+            profiler.stop()
 
 # Idea: Go through tours 
 # get all splits 
@@ -0,0 +1,390 @@
+# work_queue.py
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, Text, Index, select, update, delete, func, or_, and_, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from crawl_frontier import CrawlItem, Pending, PRIORITY_DISCOVERY
+
+load_dotenv()
+
+# ----------------------- Configuration -----------------------
+
+# The queue can live in its own database; by default it shares the scraper's
+QUEUE_DATABASE_URL = os.getenv('QUEUE_DATABASE_URL') or os.getenv('DATABASE_URL')
+# Seconds a claimed page stays reserved for its worker; heartbeats extend it while the worker is alive
+LEASE_SECONDS = int(os.getenv('QUEUE_LEASE_SECONDS', '120'))
+# Longest a worker may spend on one claimed page; after that its heartbeat stops renewing the lease, so a hung
+# handler's page goes to another worker
+MAX_HANDLING_SECONDS = float(os.getenv('QUEUE_MAX_HANDLING_SECONDS', '900'))
+# Claims (including ones lost with a dead worker) before a page is given up on
+MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', '5'))
+# Delay before the first retry, doubled for each one after
+RETRY_SECONDS = float(os.getenv('QUEUE_RETRY_SECONDS', '30'))
+# Requests per second to one host, shared by every worker on every machine (0: unlimited)
+HOST_RATE = float(os.getenv('CRAWL_HOST_RATE', '4'))
+# Pages a worker claims, and fetches concurrently, per round trip
+CLAIM_BATCH = int(os.getenv('CRAWL_WORKERS', '4'))
+IDLE_SECONDS = 2
+
+QUEUED = 'queued'
+LEASED = 'leased'
+# Handled; waiting for the pages it queued before its fingerprints are saved
+WAITING = 'waiting'
+DONE = 'done'
+FAILED = 'failed'
+
+# ----------------------- Queue Tables -----------------------
+
+# Separate metadata: the queue may be in a different database from the scraped data
+QueueBase = declarative_base()
+
+class CrawlTask(QueueBase):
+    __tablename__ = 'crawl_queue'
+    url = Column(String(500), primary_key=True)
+    kind = Column(String(20), nullable=False)
+    # JSON list of the handler arguments (tour id, match href, split id, ...)
+    args = Column(Text)
+    priority = Column(Integer, nullable=False)
+    queued_at = Column(Float, nullable=False)
+    status = Column(String(10), nullable=False, default=QUEUED)
+    # Not claimed before this (retry backoff)
+    available_at = Column(Float, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_owner = Column(String(100))
+    lease_expires = Column(Float)
+    # The page that queued this one; it completes once all of its children have
+    parent_url = Column(String(500))
+    # 1 while the handler runs, plus each child not finished yet
+    waiting = Column(Integer, nullable=False, default=0)
+    failed = Column(Boolean, nullable=False, default=False)
+    # JSON [(url, fingerprints)] saved once waiting drops to 0 without failures (Pending.saves)
+    saves = Column(Text)
+    last_error = Column(Text)
+    finished_at = Column(Float)
+
+    __table_args__ = (Index('ix_crawl_queue_claim', 'status', 'priority', 'available_at'),)
+
+class CrawlHost(QueueBase):
+    # Shared rate budget: each request reserves the next free slot on its host
+    __tablename__ = 'crawl_hosts'
+    host = Column(String(200), primary_key=True)
+    next_slot = Column(Float, nullable=False, default=0.0)
+
+# ----------------------- Work Queue -----------------------
+
+class WorkQueue:
+    # Workers on any number of machines claim pages with SELECT ... FOR UPDATE SKIP LOCKED, so each page is
+    # handled by one worker at a time. Times are epoch seconds from the workers' clocks; keep machines NTP-synced.
+
+    def __init__(self, database_url=QUEUE_DATABASE_URL, lease=LEASE_SECONDS, host_rate=HOST_RATE, owner=None):
+        self.engine = create_engine(database_url, pool_pre_ping=True)
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.dialect = postgresql if self.engine.dialect.name == 'postgresql' else sqlite
+        self.lease = lease
+        self.host_rate = host_rate
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.known_hosts = set()
+        # Leases this worker holds and when they were claimed, renewed by the heartbeat thread
+        self.held = {}
+        self.held_lock = threading.Lock()
+
+    def create_tables(self):
+        QueueBase.metadata.create_all(self.engine)
+
+    # ----------------------- Queueing -----------------------
+
+    def push(self, url, kind, priority, args=(), parent_url=None):
+        # False when the URL is already in the queue (in this pass, from any worker)
+        now = time.time()
+        with self.Session() as s, s.begin():
+            stmt = self.dialect.insert(CrawlTask.__table__).values(
+                url=url, kind=kind, args=json.dumps(list(args)), priority=priority, queued_at=now,
+                status=QUEUED, available_at=now, attempts=0, parent_url=parent_url, waiting=0, failed=False,
+            ).on_conflict_do_nothing(index_elements=['url'])
+            if s.execute(stmt).rowcount == 0:
+                return False
+            if parent_url is not None:
+                s.execute(update(CrawlTask).where(CrawlTask.url == parent_url)
+                          .values(waiting=CrawlTask.waiting + 1))
+            return True
+
+    def seed(self, urls, kind='tour', priority=PRIORITY_DISCOVERY):
+        # Starts a new pass: pages finished in the previous one may be crawled again
+        with self.Session() as s, s.begin():
+            cleared = s.execute(delete(CrawlTask).where(CrawlTask.status.in_([DONE, FAILED]))).rowcount
+        added = sum(self.push(url, kind, priority) for url in urls)
+        print(f"Seeded {added} {kind} pages; cleared {cleared} finished pages from the last pass.")
+        return added
+
+    # ----------------------- Leases -----------------------
+
+    def _claimable(self, now):
+        return or_(and_(CrawlTask.status == QUEUED, CrawlTask.available_at <= now),
+                   and_(CrawlTask.status == LEASED, CrawlTask.lease_expires < now))
+
+    def claim(self, limit):
+        # Most urgent pages that are queued, or whose worker stopped heartbeating; other workers' locked rows are skipped
+        now = time.time()
+        with self.Session() as s, s.begin():
+            urls = s.execute(
+                select(CrawlTask.url).where(self._claimable(now))
+                .order_by(CrawlTask.priority, CrawlTask.queued_at).limit(limit)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not urls:
+                return []
+            # Re-checked here for databases without row locks (SQLite), where two workers can select the same rows
+            s.execute(
+                update(CrawlTask).where(CrawlTask.url.in_(urls), self._claimable(now))
+                .values(status=LEASED, lease_owner=self.owner, lease_expires=now + self.lease,
+                        attempts=CrawlTask.attempts + 1,
+                        # An expired lease still holds the dead worker's count
+                        waiting=CrawlTask.waiting + case((CrawlTask.status == QUEUED, 1), else_=0))
+                .execution_options(synchronize_session=False)
+            )
+            tasks = s.execute(select(CrawlTask).where(CrawlTask.url.in_(urls), CrawlTask.lease_owner == self.owner,
+                                                      CrawlTask.status == LEASED)).scalars().all()
+        with self.held_lock:
+            self.held.update((task.url, now) for task in tasks)
+        return sorted(tasks, key=lambda task: (task.priority, task.queued_at))
+
+    def heartbeat(self):
+        now = time.time()
+        with self.held_lock:
+            urls = [url for url, claimed in self.held.items() if now - claimed < MAX_HANDLING_SECONDS]
+        if not urls:
+            return
+        with self.Session() as s, s.begin():
+            s.execute(update(CrawlTask).where(CrawlTask.url.in_(urls), CrawlTask.lease_owner == self.owner,
+                                              CrawlTask.status == LEASED)
+                      .values(lease_expires=now + self.lease)
+                      .execution_options(synchronize_session=False))
+
+    def start_heartbeat(self):
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease / 4):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"Heartbeat failed: {e}")
+
+        threading.Thread(target=beat, daemon=True).start()
+        return stop
+
+    # ----------------------- Completion -----------------------
+
+    def _release(self, task, values):
+        # Ends this worker's lease; False when it had already expired and another worker took the page
+        with self.held_lock:
+            self.held.pop(task.url, None)
+        with self.Session() as s, s.begin():
+            released = s.execute(
+                update(CrawlTask).where(CrawlTask.url == task.url, CrawlTask.lease_owner == task.lease_owner,
+                                        CrawlTask.status == LEASED)
+                .values(waiting=CrawlTask.waiting - 1, lease_owner=None, lease_expires=None, **values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not released:
+                print(f"Lease on {task.url} expired before it was released; another worker has it.")
+                return []
+            return self._settle(s, task.url) if values.get('status') == WAITING else []
+
+    def _settle(self, s, url):
+        # Completes the page and any ancestors left with nothing outstanding. Rows are always locked child before
+        # parent, so concurrent completions cannot deadlock. Returns the fingerprints to save.
+        saves = []
+        while url is not None:
+            task = s.execute(select(CrawlTask).where(CrawlTask.url == url)).scalar_one()
+            if task.status != WAITING or task.waiting > 0:
+                break
+            task.status = FAILED if task.failed else DONE
+            task.finished_at = time.time()
+            if not task.failed and task.saves:
+                saves.extend(json.loads(task.saves))
+            url = task.parent_url
+            if url is not None:
+                values = {"waiting": CrawlTask.waiting - 1}
+                if task.failed:
+                    values["failed"] = True
+                s.execute(update(CrawlTask).where(CrawlTask.url == url).values(**values)
+                          .execution_options(synchronize_session=False))
+            s.flush()
+        return saves
+
+    def finish(self, task, saves=None):
+        return self._release(task, {"status": WAITING, "saves": json.dumps(saves) if saves else None})
+
+    def fail(self, task, error):
+        if task.attempts < MAX_ATTEMPTS:
+            delay = RETRY_SECONDS * 2 ** (task.attempts - 1)
+            print(f"Retrying {task.url} in {delay:.0f}s (attempt {task.attempts} of {MAX_ATTEMPTS}): {error}")
+            return self._release(task, {"status": QUEUED, "available_at": time.time() + delay, "last_error": error})
+        print(f"Giving up on {task.url} after {task.attempts} attempts: {error}")
+        return self._release(task, {"status": WAITING, "failed": True, "last_error": error})
+
+    # ----------------------- Host Rate Budget -----------------------
+
+    def reserve(self, host):
+        # Seconds to wait before this worker may send its request to host
+        if not self.host_rate:
+            return 0.0
+        interval = 1.0 / self.host_rate
+        with self.Session() as s, s.begin():
+            if host not in self.known_hosts:
+                s.execute(self.dialect.insert(CrawlHost.__table__).values(host=host, next_slot=0.0)
+                          .on_conflict_do_nothing(index_elements=['host']))
+                self.known_hosts.add(host)
+            now = time.time()
+            s.execute(update(CrawlHost).where(CrawlHost.host == host)
+                      .values(next_slot=case((CrawlHost.next_slot < now, now), else_=CrawlHost.next_slot) + interval))
+            slot = s.execute(select(CrawlHost.next_slot).where(CrawlHost.host == host)).scalar_one() - interval
+        return max(0.0, slot - now)
+
+    # ----------------------- Status -----------------------
+
+    def active(self):
+        # Pages still to be handled; waiting pages only complete through them
+        with self.Session() as s:
+            return s.execute(select(func.count()).select_from(CrawlTask)
+                             .where(CrawlTask.status.in_([QUEUED, LEASED]))).scalar_one()
+
+    def snapshot(self):
+        with self.Session() as s:
+            rows = s.execute(select(CrawlTask.kind, CrawlTask.status, func.count())
+                             .group_by(CrawlTask.kind, CrawlTask.status)).all()
+            owners = s.execute(select(func.count(func.distinct(CrawlTask.lease_owner)))
+                               .where(CrawlTask.status == LEASED)).scalar_one()
+        counts = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return {"pages": counts, "workers": owners}
+
+# ----------------------- Workers -----------------------
+
+class QueueFrontier:
+    # The Frontier interface the crawl handlers push to; children are linked to the page being handled
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.current = None
+
+    def push(self, url, kind, priority, *args, parent=None):
+        return self.queue.push(url, kind, priority, args, self.current if parent is not None else None)
+
+class Worker:
+    # Fetches a claimed batch concurrently, then runs the handlers on this thread in priority order, like
+    # crawl_frontier.Crawler. The shared host budget is applied inside fetch, so it also covers the team, player
+    # and match-list pages the handlers download themselves.
+
+    def __init__(self, queue, handlers, fetch, save_fingerprints, rollback, batch=CLAIM_BATCH):
+        self.queue = queue
+        self.handlers = handlers
+        self.fetch = fetch
+        self.save_fingerprints = save_fingerprints
+        self.rollback = rollback
+        self.batch = batch
+        self.frontier = QueueFrontier(queue)
+        self.handled = {}
+        self.failed = 0
+
+    def handle(self, task, future):
+        try:
+            response = future.result()
+            self.frontier.current = task.url
+            item = CrawlItem(task.url, task.kind, task.priority, tuple(json.loads(task.args)), None)
+            result = self.handlers[task.kind](self.frontier, item, response)
+        except Exception as e:
+            # A half-done ingest (e.g. a team another worker inserted first) is rolled back and retried
+            self.rollback()
+            self.failed += 1
+            return self.queue.fail(task, str(e))
+        self.handled[task.kind] = self.handled.get(task.kind, 0) + 1
+        return self.queue.finish(task, result.saves if isinstance(result, Pending) else None)
+
+    def run(self, forever=False):
+        start = time.perf_counter()
+        stop = self.queue.start_heartbeat()
+        try:
+            with ThreadPoolExecutor(max_workers=self.batch) as executor:
+                while True:
+                    tasks = self.queue.claim(self.batch)
+                    if not tasks:
+                        if not forever and not self.queue.active():
+                            break
+                        time.sleep(IDLE_SECONDS)
+                        continue
+                    futures = [(task, executor.submit(self.fetch, task.url)) for task in tasks]
+                    for task, future in futures:
+                        saves = self.handle(task, future)
+                        if saves:
+                            self.save_fingerprints(saves)
+        finally:
+            stop.set()
+        print(f"Worker {self.queue.owner} handled {sum(self.handled.values())} pages "
+              f"({', '.join(f'{n} {kind}' for kind, n in self.handled.items())}) in {time.perf_counter() - start:.1f}s; "
+              f"{self.failed} failed attempts.")
+
+def run_worker(batch=CLAIM_BATCH, forever=False):
+    # Imported here: tour_split_scrape sets up the scraper's database, sinks and archives on import
+    import tour_split_scrape
+    from tour_split_scrape import CRAWL_HANDLERS, fetch, save_fingerprints, session, close_archives
+
+    queue = WorkQueue()
+    tour_split_scrape.rate_limit = queue.reserve
+    try:
+        Worker(queue, CRAWL_HANDLERS, fetch, save_fingerprints, session.rollback, batch).run(forever)
+    finally:
+        session.close()
+        close_archives()
+
+def run_processes(count, batch, forever):
+    # Several local workers, e.g. to test against one local Postgres. The scraper's tables are created here
+    # first, so the workers do not race to create them on import.
+    import tour_split_scrape
+    command = [sys.executable, os.path.abspath(__file__), 'work', '--batch', str(batch)] + (['--forever'] if forever else [])
+    workers = [subprocess.Popen(command) for _ in range(count)]
+    return max(worker.wait() for worker in workers)
+
+# ----------------------- Main Execution -----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed crawl: seed a shared queue, then start workers on any machine.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    seed_parser = subparsers.add_parser('seed', help="Start a new pass from tour pages")
+    seed_parser.add_argument('urls', nargs='*', help="Tour URLs (default: the tours in tour_split_scrape.py)")
+    work_parser = subparsers.add_parser('work', help="Claim and crawl pages until the queue is empty")
+    work_parser.add_argument('--batch', type=int, default=CLAIM_BATCH, help="Pages claimed and fetched at a time")
+    work_parser.add_argument('--processes', type=int, default=1, help="Worker processes to start on this machine")
+    work_parser.add_argument('--forever', action='store_true', help="Keep polling for new pages when the queue is empty")
+    subparsers.add_parser('status', help="Pages by kind and status")
+    args = parser.parse_args()
+
+    queue = WorkQueue()
+    queue.create_tables()
+    if args.command == 'seed':
+        urls = args.urls
+        if not urls:
+            from tour_split_scrape import all_tours
+            urls = all_tours
+        queue.seed(urls)
+    elif args.command == 'work':
+        if args.processes > 1:
+            sys.exit(run_processes(args.processes, args.batch, args.forever))
+        run_worker(args.batch, args.forever)
+    else:
+        print(json.dumps(queue.snapshot(), indent=2))